@@ -6,13 +6,19 @@ class FrozenLakeWorld:
     Independent of Gymnasium and any RL framework.
     """
 
-    def __init__(self, grid_map=None):
+    # Action order of precomputed transition tables (same ids as Gymnasium's FrozenLake)
+    TRANSITION_ACTIONS = ("LEFT", "DOWN", "RIGHT", "UP")
+
+    def __init__(self, grid_map=None, transitions=None):
         """
         Initialize the FrozenLake world.
         
         Args:
             grid_map (list[str], optional): The grid layout as a list of strings.
                                             Defaults to a standard 4x4 map.
+            transitions (optional): Precomputed next-state table, transitions[state][action_id]
+                                    with state = row * cols + col and action ids in
+                                    TRANSITION_ACTIONS order (e.g. from wrapper/curriculum.py).
         """
         if grid_map is None:
             self.grid_map = [
@@ -30,6 +36,8 @@ class FrozenLakeWorld:
         self.agent_pos = self.start_pos
         self.terminated = False
         self.outcome = "ongoing" # ongoing, hole, goal
+        self.transitions = transitions
+        self._action_ids = {action: i for i, action in enumerate(self.TRANSITION_ACTIONS)}
 
         # Define movement deltas (row, col)
         self.actions = {
@@ -78,15 +86,22 @@ class FrozenLakeWorld:
         if action not in self.actions:
             return self._get_observation(f"Invalid action: {action}. Please choose LEFT, RIGHT, UP, or DOWN.")
 
-        delta_r, delta_c = self.actions[action]
         current_r, current_c = self.agent_pos
         
         # Calculate tentative new position
-        new_r = current_r + delta_r
-        new_c = current_c + delta_c
+        if self.transitions is not None:
+            next_state = int(self.transitions[current_r * self.cols + current_c][self._action_ids[action]])
+            new_r, new_c = divmod(next_state, self.cols)
+            # A move into the wall maps back onto the same state
+            in_bounds = (new_r, new_c) != self.agent_pos
+        else:
+            delta_r, delta_c = self.actions[action]
+            new_r = current_r + delta_r
+            new_c = current_c + delta_c
+            in_bounds = 0 <= new_r < self.rows and 0 <= new_c < self.cols
 
         # Check boundaries
-        if 0 <= new_r < self.rows and 0 <= new_c < self.cols:
+        if in_bounds:
             self.agent_pos = (new_r, new_c)
             move_msg = f"You moved {action}."
         else:
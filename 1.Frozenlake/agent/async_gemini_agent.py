@@ -0,0 +1,208 @@
+import asyncio
+import os
+import random
+import time
+from typing import List, Dict, Any, Optional
+
+from agent.updated.instrumentation import METRICS
+
+
+class GeminiRequestError(RuntimeError):
+    """
+    Raised when a Gemini request still fails after all retries.
+    Replaces the silent "<action>RIGHT</action>" fallback of GeminiAgent.
+    """
+    def __init__(self, message: str, attempts: int, last_error: Exception):
+        super().__init__(message)
+        self.attempts = attempts
+        self.last_error = last_error
+
+
+# HTTP statuses worth retrying: request timeout, rate limit and server errors
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Whether a failed request may succeed on retry.
+    google.api_core exceptions carry the HTTP status as `code`; anything else
+    (bad request, auth, programming errors) fails the same way every time.
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS_CODES
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter.
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock=time.monotonic):
+        """
+        Args:
+            rate (float): Tokens added per second (e.g. 15 RPM -> 0.25).
+            capacity (float): Maximum burst size. Defaults to max(1, rate).
+            clock (callable): Monotonic time source (injectable for tests).
+        """
+        if rate <= 0:
+            raise ValueError("TokenBucket rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.last_refill = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    async def acquire(self, tokens: float = 1.0):
+        """
+        Waits until `tokens` are available, then consumes them.
+        The lock keeps waiters FIFO so no request starves.
+        """
+        if tokens > self.capacity:
+            raise ValueError("Requested more tokens than the bucket capacity.")
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class AsyncGeminiAgent:
+    """
+    Asyncio-based Gemini agent for running many episodes concurrently.
+    - A semaphore bounds the number of in-flight requests.
+    - A token bucket enforces the API rate limit (instead of time.sleep(10)).
+    - Transient failures (rate limit, 5xx, timeouts) are retried with exponential
+      backoff + full jitter and raised as GeminiRequestError once retries are
+      exhausted; any other error is raised immediately.
+    Keeps the same few-shot (ICL) update() semantics as GeminiAgent.
+    """
+    def __init__(self, model_name: str = "gemini-2.0-flash", api_key: str = None,
+                 model=None, max_concurrency: int = 4, requests_per_minute: float = 15.0,
+                 burst: Optional[float] = None, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 30.0, seed: Optional[int] = None):
+        """
+        Initialize the Async Gemini Agent.
+
+        Args:
+            model_name (str): The Gemini model to use.
+            api_key (str): Google API Key. If None, checks GOOGLE_API_KEY env var.
+            model: Optional pre-built model exposing `generate_content_async(prompt, generation_config=...)`.
+                   Pass a FakeGeminiModel (agent/mock_llm.py) to run without the real API.
+            max_concurrency (int): Maximum number of requests in flight at once.
+            requests_per_minute (float): Sustained rate allowed by the token bucket.
+            burst (float): Token bucket capacity. Defaults to max_concurrency.
+            max_retries (int): Retries after the first failed attempt.
+            base_delay (float): Initial backoff delay in seconds.
+            max_delay (float): Upper bound for a single backoff delay.
+            seed (int): Seed for the jitter RNG (reproducible backoff in tests).
+        """
+        if model is None:
+            import google.generativeai as genai
+
+            self.api_key = api_key or os.environ.get("GOOGLE_API_KEY")
+            if not self.api_key:
+                raise ValueError("GOOGLE_API_KEY not found. Please set it in environment or pass it to init.")
+            genai.configure(api_key=self.api_key)
+            model = genai.GenerativeModel(model_name)
+
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.generation_config = {"temperature": 0.1, "candidate_count": 1}
+
+        self.rate_limiter = TokenBucket(
+            rate=requests_per_minute / 60.0,
+            capacity=burst if burst is not None else max_concurrency
+        )
+        self._rng = random.Random(seed)
+        # Created lazily so the agent can be built outside a running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Buffer to store successful trajectories for Few-Shot Prompting
+        self.successful_examples: List[str] = []
+        self.max_examples = 3
+
+        # Counters for reporting
+        self.request_count = 0
+        self.retry_count = 0
+
+    def _augment(self, prompt: str) -> str:
+        """Prepends the few-shot examples to the prompt (same format as GeminiAgent)."""
+        if not self.successful_examples:
+            return prompt
+        examples_str = "\n\n--- SUCCESSFUL EXAMPLES ---\n" + "\n".join(self.successful_examples) + "\n---------------------------\n"
+        return examples_str + "\n" + prompt
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter: U(0, min(max_delay, base * 2^attempt))."""
+        return self._rng.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @METRICS.timed("agent.generate", agent="gemini")
+    async def generate(self, prompt: str) -> str:
+        """
+        Generates an action using the Gemini API.
+
+        Raises:
+            GeminiRequestError: If every attempt failed with a transient error.
+            Exception: The first non-transient error, unchanged.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        augmented_prompt = self._augment(prompt)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            try:
+                async with self._semaphore:
+                    self.request_count += 1
+                    response = await self.model.generate_content_async(
+                        augmented_prompt,
+                        generation_config=self.generation_config
+                    )
+                return response.text
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                last_error = e
+                if attempt == self.max_retries:
+                    break
+                self.retry_count += 1
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+        raise GeminiRequestError(
+            f"Gemini request failed after {self.max_retries + 1} attempts: {last_error}",
+            attempts=self.max_retries + 1,
+            last_error=last_error
+        )
+
+    def update(self, batch: List[Dict[str, Any]]):
+        """
+        'Trains' the agent by storing successful episodes as few-shot examples.
+
+        Args:
+            batch (list): A list of episode dictionaries containing:
+                          {'prompt': str, 'response': str, 'score': float, ...}
+        """
+        for episode in batch:
+            if episode.get('score', 0) >= 1.0:
+                example_text = f"User: ...\nAgent: {episode.get('response', '')}"
+                if len(self.successful_examples) >= self.max_examples:
+                    self.successful_examples.pop(0)
+                self.successful_examples.append(example_text)
+
+        print(f"Agent Updated: Now holds {len(self.successful_examples)} successful examples.")
@@ -0,0 +1,103 @@
+from collections import Counter, deque
+from typing import Optional
+
+
+def estimate_tokens(text: str, chars_per_token: int = 4) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text).
+    Good enough for budgeting; no tokenizer dependency.
+    """
+    return len(text) // chars_per_token + 1
+
+
+class ConversationBuffer:
+    """
+    Stores the episode transcript as a list of turns and renders the prompt lazily.
+
+    Replaces `current_prompt += ...` (quadratic in episode length) with:
+    - O(1) append per turn,
+    - a sliding window bounded by `max_turns` and/or `max_tokens`,
+    - a running summary of evicted turns (action counts, walls, invalid moves),
+      so the model keeps a compact record of what happened earlier.
+
+    With no limits set and nothing evicted, render() is identical to the old
+    concatenated prompt.
+    """
+    def __init__(self, header: str, max_turns: Optional[int] = None,
+                 max_tokens: Optional[int] = None, summarize: bool = True):
+        """
+        Args:
+            header (str): Fixed prefix (system prompt + initial observation). Never evicted.
+            max_turns (int): Keep at most this many recent turns verbatim.
+            max_tokens (int): Token budget for the verbatim turns (header excluded).
+            summarize (bool): Replace evicted turns with a one-line summary
+                              (False = plain sliding window).
+        """
+        self.header = header
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+
+        self.turns = deque()  # (text, tokens, action, hit_wall)
+        self.window_tokens = 0
+
+        # Summary of evicted turns
+        self.evicted = 0
+        self.evicted_actions = Counter()
+        self.evicted_walls = 0
+        self.evicted_invalid = 0
+
+        self._rendered: Optional[str] = None
+
+    def __len__(self):
+        return self.evicted + len(self.turns)
+
+    def add_turn(self, response: str, feedback: str, action: Optional[str] = None):
+        """
+        Appends one (agent response, environment feedback) turn.
+
+        Args:
+            response: Raw agent output.
+            feedback: Feedback shown to the agent.
+            action: Parsed action (None if the response was invalid). Used for the summary.
+        """
+        text = f"\n\nAction: {response}\nObservation: {feedback}"
+        tokens = estimate_tokens(text)
+        self.turns.append((text, tokens, action, "hit a wall" in feedback))
+        self.window_tokens += tokens
+        self._evict()
+        self._rendered = None
+
+    def _evict(self):
+        """Drops the oldest turns until the window fits. Always keeps the latest turn."""
+        while len(self.turns) > 1 and (
+            (self.max_turns is not None and len(self.turns) > self.max_turns) or
+            (self.max_tokens is not None and self.window_tokens > self.max_tokens)
+        ):
+            _, tokens, action, hit_wall = self.turns.popleft()
+            self.window_tokens -= tokens
+            self.evicted += 1
+            if action:
+                self.evicted_actions[action] += 1
+            else:
+                self.evicted_invalid += 1
+            if hit_wall:
+                self.evicted_walls += 1
+
+    def summary(self) -> str:
+        """One-line summary of the evicted turns ("" if nothing was evicted)."""
+        if not self.evicted or not self.summarize:
+            return ""
+        moves = ", ".join(f"{a} x{n}" for a, n in sorted(self.evicted_actions.items())) or "none"
+        return (f"\n\n[Earlier history summarized: {self.evicted} steps. "
+                f"Moves: {moves}. Walls hit: {self.evicted_walls}. Invalid outputs: {self.evicted_invalid}.]")
+
+    def render(self) -> str:
+        """Builds the prompt. Cached until the next add_turn()."""
+        if self._rendered is None:
+            self._rendered = self.header + self.summary() + "".join(text for text, _, _, _ in self.turns)
+        return self._rendered
+
+    def prompt_tokens(self) -> int:
+        """Estimated size of the rendered prompt."""
+        return estimate_tokens(self.render())
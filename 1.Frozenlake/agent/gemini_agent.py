@@ -3,6 +3,8 @@ import time
 import google.generativeai as genai
 from typing import List, Dict, Any
 
+from agent.updated.instrumentation import METRICS
+
 class GeminiAgent:
     """
     A real agent that uses Google's Gemini API to play FrozenLake.
@@ -28,6 +30,7 @@ class GeminiAgent:
         self.successful_examples: List[str] = []
         self.max_examples = 3
 
+    @METRICS.timed("agent.generate", agent="gemini-sync")
     def generate(self, prompt: str) -> str:
         """
         Generates an action using the Gemini API.
@@ -1,14 +1,32 @@
 import random
 
+from agent.updated.instrumentation import METRICS
+
 class MockLLMAgent:
     """
     A Mock Agent that simulates an LLM's behavior.
     It takes a text prompt and returns an XML-formatted action.
     """
-    def __init__(self, policy="random"):
+    def __init__(self, policy="random", rng=None):
+        """
+        Args:
+            policy (str): "random" or "fixed" (always RIGHT).
+            rng: random.Random for the random policy (default: the global `random` module).
+        """
         self.policy = policy
         self.actions = ["LEFT", "RIGHT", "UP", "DOWN"]
+        self.rng = rng if rng is not None else random
+
+    @property
+    def deterministic(self):
+        """Fixed policy: same episode every time (random only repeats when its RNG is seeded)."""
+        return self.policy != "random"
 
+    def cache_key(self):
+        """Identity for the evaluation cache (agent/updated/eval_cache.py)."""
+        return f"MockLLMAgent(policy={self.policy})"
+
+    @METRICS.timed("agent.generate", agent="mock")
     def generate(self, prompt: str) -> str:
         """
         Simulates the LLM generation process.
@@ -22,7 +40,7 @@ class MockLLMAgent:
         # In a real scenario, this would call OpenAI/Anthropic API or a local model.
         
         if self.policy == "random":
-            action = random.choice(self.actions)
+            action = self.rng.choice(self.actions)
         else:
             action = "RIGHT" # Fixed policy for testing
             
@@ -34,3 +52,54 @@ I will move {action}.
 <action>{action}</action>
 """
         return response
+
+
+class FakeResourceExhausted(RuntimeError):
+    """Simulated HTTP 429, shaped like google.api_core.exceptions.ResourceExhausted (`code` attribute)."""
+    code = 429
+
+
+class FakeGeminiResponse:
+    """Minimal stand-in for a google.generativeai response object."""
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    A local fake of genai.GenerativeModel for testing AsyncGeminiAgent.
+    Implements the same `generate_content_async` interface, with simulated
+    latency and transient failures, and records peak concurrency.
+    """
+    def __init__(self, latency=0.05, failure_rate=0.0, policy="random", seed=None):
+        """
+        Args:
+            latency (float): Simulated seconds per request.
+            failure_rate (float): Probability that a request raises an error.
+            policy (str): Action policy passed to MockLLMAgent.
+            seed (int): Seed for failures and actions.
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.agent = MockLLMAgent(policy=policy, rng=self.rng)
+
+        self.calls = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        import asyncio
+
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.rng.random() < self.failure_rate:
+                self.failures += 1
+                raise FakeResourceExhausted("429 Resource has been exhausted (simulated).")
+            return FakeGeminiResponse(self.agent.generate(prompt))
+        finally:
+            self.in_flight -= 1
@@ -1,12 +1,16 @@
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
 from typing import List, Dict, Any
 
+from agent.updated.instrumentation import METRICS
+
 class QwenAgent:
     """
     Agent using Qwen2.5-1.5B-Instruct via Hugging Face Transformers.
     """
     def __init__(self, model_name: str = "Qwen/Qwen2.5-3B-Instruct"):
+        # Imported here so selecting another agent never pays for torch/transformers
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
         print(f"Loading {model_name}...")
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModelForCausalLM.from_pretrained(
@@ -17,6 +21,7 @@ class QwenAgent:
         self.successful_examples: List[str] = []
         self.max_examples = 3
 
+    @METRICS.timed("agent.generate", agent="qwen")
     def generate(self, prompt: str) -> str:
         # Augment with ICL
         augmented_prompt = prompt
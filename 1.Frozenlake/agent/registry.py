@@ -0,0 +1,57 @@
+import importlib
+from typing import Any, Dict, Tuple
+
+# Agent name -> (module path, class name, default constructor kwargs).
+# Backends are imported only when selected, so heavy dependencies
+# (google.generativeai, torch, transformers) never load for the mock agent.
+AGENT_REGISTRY: Dict[str, Tuple[str, str, Dict[str, Any]]] = {
+    "mock": ("agent.mock_llm", "MockLLMAgent", {"policy": "random"}),
+    "gemini": ("agent.async_gemini_agent", "AsyncGeminiAgent", {}),
+    "gemini-sync": ("agent.gemini_agent", "GeminiAgent", {}),
+    "qwen": ("agent.qwen_agent", "QwenAgent", {}),
+    "qwen-updated": ("agent.updated.qwen_agent_updated", "QwenAgentUpdated", {}),
+}
+
+
+def register_agent(name: str, module_path: str, class_name: str, **default_kwargs):
+    """
+    Registers an agent backend without importing it.
+
+    Args:
+        name (str): CLI name of the agent.
+        module_path (str): Dotted module path (e.g. "agent.hf_agent").
+        class_name (str): Agent class inside that module.
+        **default_kwargs: Constructor defaults (overridable in create_agent).
+    """
+    AGENT_REGISTRY[name] = (module_path, class_name, default_kwargs)
+
+
+def available_agents():
+    """Returns the registered agent names."""
+    return list(AGENT_REGISTRY)
+
+
+def load_agent_class(name: str):
+    """
+    Imports and returns the agent class for `name`.
+
+    Raises:
+        ValueError: If the name is not registered.
+        ImportError: If the backend's dependencies are missing.
+    """
+    if name not in AGENT_REGISTRY:
+        raise ValueError(f"Unknown agent '{name}'. Available: {', '.join(AGENT_REGISTRY)}")
+    module_path, class_name, _ = AGENT_REGISTRY[name]
+    module = importlib.import_module(module_path)
+    return getattr(module, class_name)
+
+
+def create_agent(name: str, **kwargs):
+    """
+    Imports the selected backend and instantiates it.
+    Explicit kwargs override the registered defaults.
+    """
+    agent_cls = load_agent_class(name)
+    params = dict(AGENT_REGISTRY[name][2])
+    params.update(kwargs)
+    return agent_cls(**params)
@@ -1,22 +1,38 @@
 import argparse
+import asyncio
+import random
 import sys
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    # .env support is optional (the mock agent needs no keys)
+    pass
 
 # Ensure we can import the local packages
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from wrapper.frozenlake import load_environment
-from agent.mock_llm import MockLLMAgent
-from agent.gemini_agent import GeminiAgent
-from agent.qwen_agent import QwenAgent
+from agent.mock_llm import FakeGeminiModel
+from agent.registry import create_agent
+from agent.conversation_buffer import ConversationBuffer
+from agent.updated.instrumentation import METRICS
+from agent.updated.eval_cache import EvaluationCache, agent_cache_key
+from agent.updated.profiling import add_profile_arguments, run_with_profiling
 # from agent.hf_agent import HuggingFaceAgent
 
-def run_episode(env, agent, verbose=False):
+# Token budget for the verbatim action/observation history in the prompt
+DEFAULT_HISTORY_TOKENS = 1500
+
+def _episode_driver(env, verbose=False, history_turns=None, history_tokens=DEFAULT_HISTORY_TOKENS):
     """
-    Runs a single evaluation episode.
+    Generator holding the episode logic independently of how the agent is called.
+    Yields each prompt and expects the agent's response to be sent back.
+    Returns (score, episode_data) via StopIteration.
+    
+    history_turns / history_tokens bound the verbatim transcript kept in the prompt;
+    older turns are folded into a summary line (see ConversationBuffer).
     """
     # 1. Reset Environment
     observation = env.reset()
@@ -25,9 +41,8 @@ def run_episode(env, agent, verbose=False):
     episode_history = [] # For verifiers: now stores ACTION STRINGS
     
     # Initial Prompt
-    current_prompt = env.system_prompt + f"\n\nObservation: {observation['message']}"
-    
-    # TODO: Add prompt summarization here if context gets too long
+    initial_prompt = env.system_prompt + f"\n\nObservation: {observation['message']}"
+    conversation = ConversationBuffer(initial_prompt, max_turns=history_turns, max_tokens=history_tokens)
     
     step_count = 0
     max_steps = 20
@@ -36,7 +51,7 @@ def run_episode(env, agent, verbose=False):
     
     # Data for agent update (few-shot memory only)
     episode_data = {
-        'prompt': current_prompt,
+        'prompt': initial_prompt,
         'response': "",
         'score': 0.0,
         'outcome': "ongoing"
@@ -47,7 +62,7 @@ def run_episode(env, agent, verbose=False):
             print(f"--- Step {step_count} ---")
         
         # 2. Agent Generates Action
-        response = agent.generate(current_prompt)
+        response = yield conversation.render()
         text_history.append(response)
         
         episode_data['response'] = response 
@@ -66,7 +81,9 @@ def run_episode(env, agent, verbose=False):
             obs = {"message": feed_msg, "outcome": "ongoing", "terminated": False}
         else:
             # 4. Step Environment
-            obs = env.step(action_text)
+            with METRICS.timer("env.step", loop="frozenlake"):
+                obs = env.step(action_text)
+            METRICS.count("steps", loop="frozenlake")
             
             # CRITICAL: Store action string, NOT raw observation
             episode_history.append(action_text)
@@ -75,7 +92,7 @@ def run_episode(env, agent, verbose=False):
             
         # 5. Update Prompt
         feedback = env.feedback(obs)
-        current_prompt += f"\n\nAction: {response}\nObservation: {feedback}"
+        conversation.add_turn(response, feedback, action_text)
         
         if verbose:
             print(f"Env: {feedback}")
@@ -90,33 +107,111 @@ def run_episode(env, agent, verbose=False):
     
     episode_data['score'] = score
     episode_data['outcome'] = final_outcome
+    episode_data['steps'] = len(text_history)
     
     if verbose:
         print(f"\nEpisode Finished. Outcome: {final_outcome}. Score: {score}")
         
     return score, episode_data
 
-def run_evaluation(agent_type="mock", episodes=10):
+def run_episode(env, agent, verbose=False, history_turns=None, history_tokens=DEFAULT_HISTORY_TOKENS):
+    """
+    Runs a single evaluation episode.
+    """
+    driver = _episode_driver(env, verbose, history_turns, history_tokens)
+    with METRICS.timer("episode.run", loop="frozenlake"):
+        try:
+            prompt = next(driver)
+            while True:
+                prompt = driver.send(agent.generate(prompt))
+        except StopIteration as stop:
+            METRICS.count("episodes", loop="frozenlake")
+            return stop.value
+
+async def run_episode_async(env, agent, verbose=False, history_turns=None, history_tokens=DEFAULT_HISTORY_TOKENS):
+    """
+    Runs a single evaluation episode with an async agent (e.g. AsyncGeminiAgent).
+    """
+    driver = _episode_driver(env, verbose, history_turns, history_tokens)
+    with METRICS.timer("episode.run", loop="frozenlake"):
+        try:
+            prompt = next(driver)
+            while True:
+                prompt = driver.send(await agent.generate(prompt))
+        except StopIteration as stop:
+            METRICS.count("episodes", loop="frozenlake")
+            return stop.value
+
+async def run_evaluation_async(agent, episodes=10, concurrency=4, history_tokens=DEFAULT_HISTORY_TOKENS):
+    """
+    Runs episodes concurrently against an async agent.
+    Each episode gets its own environment (the World is stateful).
+    At most `concurrency` episodes run at once; the agent's own semaphore and
+    token bucket bound the in-flight requests and request rate.
+    
+    A failed episode does not stop the others.
+    
+    Returns:
+        list: (score, episode_data) per episode, in episode order, or the
+              exception that ended a failed episode.
+    """
+    episode_slots = asyncio.Semaphore(concurrency)
+    
+    async def _run(i):
+        async with episode_slots:
+            score, episode_info = await run_episode_async(load_environment(), agent, history_tokens=history_tokens)
+            print(f"=== Episode {i+1} === Outcome: {episode_info['outcome']}. Score: {score}")
+            # --- AGENT UPDATE (FEW-SHOT ONLY) ---
+            agent.update([episode_info])
+            return score, episode_info
+    
+    return await asyncio.gather(*(_run(i) for i in range(episodes)), return_exceptions=True)
+
+def run_evaluation(agent_type="mock", episodes=10, concurrency=4, requests_per_minute=15.0,
+                   history_tokens=DEFAULT_HISTORY_TOKENS, policy="random", seed=None,
+                   eval_cache=None, use_cache=True):
     """
     Runs the LLM evaluation loop.
     No gradient updates or backprop are performed here.
+    Gemini agents run asynchronously: `concurrency` bounds in-flight requests and
+    `requests_per_minute` feeds the token-bucket rate limiter.
+    `history_tokens` caps the verbatim transcript in each prompt.
+    `policy` selects the mock agent's policy ("random" or "fixed").
+    With `seed`, episode i runs with random.seed(seed + i).
+    With `eval_cache` (a JSON file) or `seed`, episodes of deterministic agents (fixed
+    policy, or seeded) are served from an EvaluationCache when an identical episode
+    has run before (a seed without a file caches for this run only);
+    `use_cache=False` disables it.
     """
     print(f"Starting Evaluation for {episodes} episodes using {agent_type} agent...")
     
     # Load Real Environment
     env = load_environment()
     
-    # Load Agent
+    # Load Agent (backends are imported only when selected, see agent/registry.py)
     if agent_type == "gemini":
         try:
-            agent = GeminiAgent()
+            agent = create_agent("gemini", max_concurrency=concurrency, requests_per_minute=requests_per_minute)
+        except ImportError:
+            print("Error: 'google-generativeai' not found. Please install it:")
+            print("pip install google-generativeai")
+            return
         except ValueError as e:
-            print(f"Error initializing GeminiAgent: {e}")
+            print(f"Error initializing AsyncGeminiAgent: {e}")
             print("Please set GOOGLE_API_KEY environment variable.")
             return
+    elif agent_type == "gemini-fake":
+        # Same async client, pointed at a local fake model (no API key needed)
+        agent = create_agent(
+            "gemini",
+            model=FakeGeminiModel(failure_rate=0.1, seed=seed),
+            max_concurrency=concurrency,
+            requests_per_minute=requests_per_minute,
+            base_delay=0.1
+        )
     elif agent_type == "qwen":
         try:
-            agent = QwenAgent()
+            agent = create_agent("qwen")
         except ImportError:
             print("Error: 'transformers' or 'torch' not found. Please install them:")
             print("pip install torch transformers accelerate")
@@ -134,16 +229,62 @@ def run_evaluation(agent_type="mock", episodes=10):
         #      print("Please set HF_TOKEN environment variable.")
         #      return
     else:
-        agent = MockLLMAgent(policy="random")
+        agent = create_agent("mock", policy=policy)
     
     total_score = 0
     wins = 0
     holes = 0
     
-    for i in range(episodes):
-        print(f"\n=== Episode {i+1} ===")
-        score, episode_info = run_episode(env, agent, verbose=True)
+    if asyncio.iscoroutinefunction(agent.generate):
+        outcomes = asyncio.run(run_evaluation_async(agent, episodes, concurrency, history_tokens))
+        results = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+        for i, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException):
+                print(f"=== Episode {i+1} === Failed: {type(outcome).__name__}: {outcome}")
+        print(f"Requests: {agent.request_count} (retries: {agent.retry_count})")
+        if len(results) < episodes:
+            print(f"{episodes - len(results)}/{episodes} episodes failed; results cover the completed ones.")
+        if not results:
+            return
+    else:
+        # Opt-in: only with a cache file or an explicit seed
+        cache = EvaluationCache(eval_cache) if use_cache and (eval_cache or seed is not None) else None
+        results = []
+        for i in range(episodes):
+            print(f"\n=== Episode {i+1} ===")
+            episode_seed = None if seed is None else seed + i
+            if episode_seed is not None:
+                random.seed(episode_seed)
+            
+            # Identical deterministic episode seen before: reuse its result
+            agent_key = agent_cache_key(agent, episode_seed) if cache is not None else None
+            key = None
+            if agent_key:
+                key = cache.key(env.world.grid_map, agent_key, episode_seed,
+                                prompt=env.system_prompt, history_tokens=history_tokens)
+            cached = cache.get(key) if cache is not None else None
+            if cached:
+                print(f"(cached) Outcome: {cached['final_outcome']}. Score: {cached['score']}")
+                results.append((cached['score'], {'score': cached['score'], 'outcome': cached['final_outcome'],
+                                                  'steps': cached['steps'], 'cached': True}))
+                continue
+            
+            score, episode_info = run_episode(env, agent, verbose=True, history_tokens=history_tokens)
+            results.append((score, episode_info))
+            if key:
+                cache.put(key, {"final_outcome": episode_info['outcome'], "steps": episode_info['steps'],
+                                "score": score})
+            
+            # --- AGENT UPDATE (FEW-SHOT ONLY) ---
+            # This does NOT update model weights. It only updates the agent's context/memory.
+            if hasattr(agent, 'update'):
+                agent.update([episode_info])
         
+        if cache is not None:
+            cache.save()
+            print(f"Evaluation cache: {cache.get_statistics()}")
+    
+    for score, episode_info in results:
         total_score += score
         outcome = episode_info['outcome']
         if outcome == "goal":
@@ -151,29 +292,40 @@ def run_evaluation(agent_type="mock", episodes=10):
         elif outcome == "hole":
             holes += 1
         
-        # --- AGENT UPDATE (FEW-SHOT ONLY) ---
-        # This does NOT update model weights. It only updates the agent's context/memory.
-        if hasattr(agent, 'update'):
-            agent.update([episode_info])
-            
-        # Add a small delay for API rate limits if real agent
-        if agent_type == "gemini":
-             import time
-             time.sleep(10)
-        
-    avg_score = total_score / episodes
-    win_rate = wins / episodes
-    hole_rate = holes / episodes
+    avg_score = total_score / len(results)
+    win_rate = wins / len(results)
+    hole_rate = holes / len(results)
     
     print(f"\nEvaluation Complete.")
     print(f"Average Score: {avg_score:.2f}")
     print(f"Win Rate:      {win_rate:.2%}")
     print(f"Hole Rate:     {hole_rate:.2%}")
+    
+    if METRICS.enabled:
+        print("\n" + METRICS.summary())
+        METRICS.export()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--agent", type=str, default="mock", choices=["mock", "gemini", "qwen", "hf"], help="Agent type to evaluate")
+    parser.add_argument("--agent", type=str, default="mock", choices=["mock", "gemini", "gemini-fake", "qwen", "hf"], help="Agent type to evaluate")
     parser.add_argument("--episodes", type=int, default=5, help="Number of episodes")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max in-flight Gemini requests")
+    parser.add_argument("--rpm", type=float, default=15.0, help="Gemini requests per minute (token bucket rate)")
+    parser.add_argument("--policy", type=str, default="random", choices=["random", "fixed"], help="Mock agent policy")
+    parser.add_argument("--seed", type=int, default=None, help="Seed episode i with seed + i")
+    parser.add_argument("--eval-cache", type=str, default=None, help="JSON file caching deterministic episode results across runs (enables the cache)")
+    parser.add_argument("--no-eval-cache", action="store_true", help="Always re-run every episode")
+    parser.add_argument("--history-tokens", type=int, default=DEFAULT_HISTORY_TOKENS, help="Token budget for prompt history (older turns are summarized)")
+    parser.add_argument("--metrics", type=str, default=None, help="Record stage latencies; write to this .jsonl or .prom file")
+    add_profile_arguments(parser)
     args = parser.parse_args()
     
-    run_evaluation(agent_type=args.agent, episodes=args.episodes)
+    if args.metrics:
+        METRICS.configure(args.metrics)
+    
+    run_with_profiling(args, lambda: run_evaluation(agent_type=args.agent, episodes=args.episodes,
+                                                    concurrency=args.concurrency, requests_per_minute=args.rpm,
+                                                    history_tokens=args.history_tokens, policy=args.policy,
+                                                    seed=args.seed, eval_cache=args.eval_cache,
+                                                    use_cache=not args.no_eval_cache),
+                       name="train_loop")
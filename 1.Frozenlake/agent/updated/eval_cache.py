@@ -0,0 +1,109 @@
+"""
+Episode-level result cache for deterministic evaluation.
+
+    cache = EvaluationCache("eval_cache.json")   # None: in-memory for this run only
+    key = cache.key(grid_map, agent_key, seed, max_steps=20)
+    entry = cache.get(key)
+    if entry is None:
+        ...run the episode...
+        cache.put(key, {"final_outcome": outcome, "steps": steps, "score": score})
+    cache.save()
+
+An episode is only cacheable when it is fully determined by the key: the map,
+the agent's identity and version (everything it reads that can change between
+episodes, e.g. a memory fingerprint), the episode seed and any run settings
+passed as keyword arguments. Agents opt in through agent_cache_key().
+Entries hold results only, never paths to artifacts (videos, logs) that a
+later run may overwrite.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+
+def map_hash(grid_map) -> str:
+    """Stable short hash of a map layout."""
+    return hashlib.sha1("\n".join(grid_map).encode("utf-8")).hexdigest()[:16]
+
+
+def callable_key(fn: Callable) -> str:
+    """Identity of a plain agent function; changes when its code does."""
+    code = fn.__code__
+    digest = hashlib.sha1(code.co_code + repr(code.co_consts).encode("utf-8")).hexdigest()[:12]
+    return f"{fn.__module__}.{fn.__qualname__}:{digest}"
+
+
+def agent_cache_key(agent, seed: Optional[int] = None) -> Optional[str]:
+    """
+    Cache identity of an agent object, or None if its episodes cannot be cached.
+
+    Agents opt in with a cache_key() method. Unless they also set
+    `deterministic = True`, they are only cached for seeded episodes.
+    """
+    if not hasattr(agent, "cache_key"):
+        return None
+    if seed is None and not getattr(agent, "deterministic", False):
+        return None
+    return agent.cache_key()
+
+
+class EvaluationCache:
+    """Final outcome, step count and score (plus any replay data) per deterministic episode."""
+
+    def __init__(self, filepath: Optional[str] = None):
+        """
+        Args:
+            filepath: JSON file to load from and save to (None keeps results in memory only)
+        """
+        self.filepath = filepath
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        if filepath and os.path.exists(filepath):
+            try:
+                with open(filepath, "r") as f:
+                    self.entries = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                print(f"Warning: Could not load evaluation cache from {filepath}. Starting fresh.")
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(grid_map, agent_key: str, seed: Optional[int] = None, **config) -> str:
+        """Cache key for one episode; `config` holds any other setting that shapes it."""
+        payload = json.dumps([map_hash(grid_map), agent_key, seed, sorted(config.items())], default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Cached result for `key` (None on a miss or when key is None)."""
+        if key is None:
+            return None
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: Optional[str], result: Dict[str, Any]):
+        """Stores a JSON-serializable episode result (ignored when key is None)."""
+        if key is None:
+            return
+        self.entries[key] = result
+        self._dirty = True
+
+    def save(self):
+        if not self.filepath or not self._dirty:
+            return
+        try:
+            with open(self.filepath, "w") as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            self._dirty = False
+        except IOError as e:
+            print(f"Error saving evaluation cache: {e}")
+
+    def get_statistics(self) -> Dict:
+        return {"cached_episodes": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,333 @@
+"""
+Gymnasium-style vector environments over the standalone FrozenLake worlds.
+
+    env = make_vector_env(8, obs_type="rgb")        # VLM/Wrapper/gym_env.py, VLM2/Wrapper/gym_env.py
+    obs, infos = env.reset(seed=0)                  # obs: (8, H, W, 3) uint8
+    obs, rewards, terminateds, truncateds, infos = env.step(actions)
+    env.close()
+
+The worlds stay independent of Gymnasium: FrozenLakeEnvAdapter gives them the
+gym.Env reset/step signature, and SharedMemoryVectorEnv runs one adapter per
+subprocess like gymnasium.vector.AsyncVectorEnv. Observations are written by
+the workers straight into one shared-memory array of shape (num_envs, *obs_shape);
+the pipes only carry actions, rewards, flags and info dicts, so a 400x400x3
+frame is never pickled. Finished sub-environments are reset in the same step;
+their last observation is returned in infos["final_observation"].
+
+Gymnasium is optional. When it is installed the classes subclass gym.Env /
+gym.vector.VectorEnv and expose observation_space / action_space; without it
+they work the same, minus the spaces.
+"""
+import multiprocessing as mp
+import traceback
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import gymnasium as gym
+    from gymnasium import spaces
+    from gymnasium.vector.utils import batch_space
+    _EnvBase = gym.Env
+    _VectorEnvBase = gym.vector.VectorEnv
+except ImportError:
+    # Gymnasium is optional: same behaviour, no space objects
+    gym = None
+    spaces = None
+    _EnvBase = object
+    _VectorEnvBase = object
+
+# Same action ids as gymnasium's FrozenLake (and VLM2's FrozenLakeGame)
+ACTION_NAMES = ("LEFT", "DOWN", "RIGHT", "UP")
+OBS_TYPES = ("state", "rgb")
+
+
+class FrozenLakeEnvAdapter(_EnvBase):
+    """
+    gym.Env interface for a FrozenLake world. Subclasses implement the three hooks:
+        _reset_world() -> (row, col)
+        _step_world(action_id) -> ((row, col), tile)
+        _frame() -> (H, W, 3) uint8 frame of the current state
+
+    Observations are the integer state row * cols + col (obs_type="state")
+    or the rendered frame (obs_type="rgb"). Reward is 1.0 on reaching the goal,
+    0.0 otherwise; holes and the goal terminate, max_steps truncates.
+    """
+    metadata = {"render_modes": ["rgb_array"]}
+
+    def __init__(self, rows: int, cols: int, obs_type: str = "state", frame_shape=None,
+                 max_steps: int = 100):
+        """
+        Args:
+            rows, cols: Grid size
+            obs_type: "state" or "rgb"
+            frame_shape: (H, W, 3) of rendered frames (needed for obs_type="rgb")
+            max_steps: Steps before an episode is truncated
+        """
+        if obs_type not in OBS_TYPES:
+            raise ValueError(f"Unknown obs_type '{obs_type}'. Choose from {OBS_TYPES}.")
+        self.rows = rows
+        self.cols = cols
+        self.obs_type = obs_type
+        self.max_steps = max_steps
+        self.render_mode = "rgb_array"
+        self.elapsed_steps = 0
+
+        if obs_type == "state":
+            self.observation_shape, self.observation_dtype = (), np.dtype(np.int64)
+        else:
+            self.observation_shape, self.observation_dtype = tuple(frame_shape), np.dtype(np.uint8)
+        if spaces is not None:
+            self.action_space = spaces.Discrete(len(ACTION_NAMES))
+            if obs_type == "state":
+                self.observation_space = spaces.Discrete(rows * cols)
+            else:
+                self.observation_space = spaces.Box(0, 255, self.observation_shape, np.uint8)
+
+    # --- Hooks ---
+
+    def _reset_world(self):
+        raise NotImplementedError
+
+    def _step_world(self, action: int):
+        raise NotImplementedError
+
+    def _frame(self) -> np.ndarray:
+        raise NotImplementedError
+
+    # --- gym.Env API ---
+
+    def _observe(self, pos):
+        if self.obs_type == "state":
+            return pos[0] * self.cols + pos[1]
+        return self._frame()
+
+    def reset(self, seed: Optional[int] = None, options: Optional[Dict] = None):
+        if gym is not None:
+            super().reset(seed=seed)
+        self.elapsed_steps = 0
+        return self._observe(self._reset_world()), {}
+
+    def step(self, action):
+        pos, tile = self._step_world(int(action))
+        self.elapsed_steps += 1
+        terminated = tile in ("H", "G")
+        truncated = not terminated and self.elapsed_steps >= self.max_steps
+        reward = 1.0 if tile == "G" else 0.0
+        return self._observe(pos), reward, terminated, truncated, {"tile": tile}
+
+    def render(self):
+        return self._frame()
+
+    def close(self):
+        pass
+
+
+def _worker(index: int, env_fn: Callable, pipe, parent_pipe, shared_buffer,
+            obs_shape, obs_dtype, num_envs: int):
+    """Subprocess loop: runs commands from `pipe`, writes observations into shared memory."""
+    parent_pipe.close()
+    observations = np.frombuffer(shared_buffer, dtype=obs_dtype).reshape((num_envs,) + tuple(obs_shape))
+    env = None
+    try:
+        env = env_fn()
+        while True:
+            command, data = pipe.recv()
+            if command == "reset":
+                seed, options = data
+                obs, info = env.reset(seed=seed, options=options)
+                observations[index] = obs
+                pipe.send((info, True))
+            elif command == "step":
+                obs, reward, terminated, truncated, info = env.step(data)
+                if terminated or truncated:
+                    # Same-step autoreset; the last observation travels once, in the info
+                    final_obs, final_info = obs, info
+                    obs, info = env.reset()
+                    info = dict(info, final_observation=final_obs, final_info=final_info)
+                observations[index] = obs
+                pipe.send(((reward, terminated, truncated, info), True))
+            elif command == "call":
+                name, args, kwargs = data
+                attr = getattr(env, name)
+                pipe.send((attr(*args, **kwargs) if callable(attr) else attr, True))
+            elif command == "close":
+                pipe.send((None, True))
+                break
+            else:
+                raise RuntimeError(f"Unknown command '{command}'")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception as e:
+        pipe.send(((type(e).__name__, str(e), traceback.format_exc()), False))
+    finally:
+        if env is not None:
+            env.close()
+        pipe.close()
+
+
+def _merge_infos(infos: List[Dict]) -> Dict:
+    """Per-env info dicts -> gymnasium vector layout: infos[key] array + infos['_key'] mask."""
+    merged = {}
+    num_envs = len(infos)
+    for i, info in enumerate(infos):
+        for key, value in info.items():
+            if key not in merged:
+                merged[key] = np.empty(num_envs, dtype=object)
+                merged["_" + key] = np.zeros(num_envs, dtype=bool)
+            merged[key][i] = value
+            merged["_" + key][i] = True
+    return merged
+
+
+class SharedMemoryVectorEnv(_VectorEnvBase):
+    """
+    AsyncVectorEnv-style vector environment with observations in shared memory.
+    One subprocess per environment; step() = step_async() + step_wait().
+    """
+
+    def __init__(self, env_fns: Sequence[Callable], context: Optional[str] = None, copy: bool = True):
+        """
+        Args:
+            env_fns: Callables creating each sub-environment (FrozenLakeEnvAdapter or any
+                     gym.Env with observation_shape / observation_dtype attributes)
+            context: multiprocessing start method ("fork", "spawn", ...); default for the platform
+            copy: Return a copy of the shared observations (False returns the shared
+                  array itself, valid until the next reset/step)
+        """
+        self.num_envs = len(env_fns)
+        self.copy = copy
+        self.closed = False
+        self._waiting = False
+
+        # Shapes and spaces come from a throwaway instance, as in AsyncVectorEnv
+        dummy = env_fns[0]()
+        self.single_observation_shape = tuple(dummy.observation_shape)
+        self.single_observation_dtype = np.dtype(dummy.observation_dtype)
+        self.metadata = getattr(dummy, "metadata", {})
+        self.render_mode = getattr(dummy, "render_mode", None)
+        if spaces is not None:
+            self.single_observation_space = dummy.observation_space
+            self.single_action_space = dummy.action_space
+            self.observation_space = batch_space(self.single_observation_space, self.num_envs)
+            self.action_space = batch_space(self.single_action_space, self.num_envs)
+        dummy.close()
+
+        ctx = mp.get_context(context)
+        nbytes = self.num_envs * int(np.prod(self.single_observation_shape, dtype=np.int64)) \
+            * self.single_observation_dtype.itemsize
+        self._shared_buffer = ctx.Array("B", max(nbytes, 1), lock=False)
+        self._observations = np.frombuffer(self._shared_buffer, dtype=self.single_observation_dtype,
+                                           count=nbytes // self.single_observation_dtype.itemsize
+                                           ).reshape((self.num_envs,) + self.single_observation_shape)
+
+        self.parent_pipes, self.processes = [], []
+        for index, env_fn in enumerate(env_fns):
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker, name=f"FrozenLakeWorker-{index}", daemon=True,
+                args=(index, env_fn, child_pipe, parent_pipe, self._shared_buffer,
+                      self.single_observation_shape, self.single_observation_dtype.str, self.num_envs))
+            self.parent_pipes.append(parent_pipe)
+            self.processes.append(process)
+            process.start()
+            child_pipe.close()
+
+    def _worker_died(self, index: int) -> RuntimeError:
+        """Shuts down the other workers after worker `index` died without reporting (e.g. killed)."""
+        self.close(terminate=True)
+        return RuntimeError(f"Worker {index} exited unexpectedly (exit code {self.processes[index].exitcode}).")
+
+    def _send(self, commands: Sequence[tuple]):
+        """Sends one (command, data) message to each worker."""
+        for index, (pipe, command) in enumerate(zip(self.parent_pipes, commands)):
+            try:
+                pipe.send(command)
+            except (BrokenPipeError, ConnectionResetError):
+                raise self._worker_died(index) from None
+
+    def _receive(self) -> List:
+        results, errors = [], []
+        for index, pipe in enumerate(self.parent_pipes):
+            try:
+                result, success = pipe.recv()
+            except (EOFError, ConnectionResetError):
+                raise self._worker_died(index) from None
+            if success:
+                results.append(result)
+            else:
+                errors.append((index, result))
+        if errors:
+            index, (name, message, trace) = errors[0]
+            self.close(terminate=True)
+            raise RuntimeError(f"Worker {index} raised {name}: {message}\n{trace}")
+        return results
+
+    def _batch_observations(self) -> np.ndarray:
+        return self._observations.copy() if self.copy else self._observations
+
+    def reset(self, seed=None, options: Optional[Dict] = None):
+        """
+        Args:
+            seed: None, an int (sub-environment i gets seed + i) or a list of seeds
+            options: Passed to every sub-environment's reset
+        """
+        if seed is None or isinstance(seed, int):
+            seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+        self._send([("reset", (env_seed, options)) for env_seed in seeds])
+        infos = self._receive()
+        return self._batch_observations(), _merge_infos(infos)
+
+    def step_async(self, actions):
+        self._send([("step", int(action)) for action in actions])
+        self._waiting = True
+
+    def step_wait(self):
+        results = self._receive()
+        self._waiting = False
+        rewards, terminateds, truncateds, infos = zip(*results)
+        return (self._batch_observations(),
+                np.array(rewards, dtype=np.float64),
+                np.array(terminateds, dtype=bool),
+                np.array(truncateds, dtype=bool),
+                _merge_infos(list(infos)))
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def call(self, name: str, *args, **kwargs) -> tuple:
+        """Calls (or reads) attribute `name` on every sub-environment."""
+        self._send([("call", (name, args, kwargs))] * self.num_envs)
+        return tuple(self._receive())
+
+    def render(self):
+        return self.call("render")
+
+    def close(self, terminate: bool = False):
+        if self.closed:
+            return
+        self.closed = True
+        if not terminate:
+            if self._waiting:
+                # Drain the pending step before shutting down
+                for pipe in self.parent_pipes:
+                    pipe.recv()
+            for pipe in self.parent_pipes:
+                try:
+                    pipe.send(("close", None))
+                    pipe.recv()
+                except (BrokenPipeError, EOFError):
+                    pass
+        for process in self.processes:
+            if terminate:
+                process.terminate()
+            process.join(timeout=5)
+        for pipe in self.parent_pipes:
+            pipe.close()
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close(terminate=True)
@@ -0,0 +1,301 @@
+"""
+Lightweight timing/counter instrumentation shared by all loops.
+
+    from agent.updated.instrumentation import METRICS   # 1.Frozenlake
+    from instrumentation import METRICS                 # VLM / VLM2 (agent/updated on sys.path)
+
+    with METRICS.timer("env.step"):
+        ...
+    @METRICS.timed("agent.generate", agent="mock")
+    def generate(...): ...
+    METRICS.count("steps")
+
+Disabled by default: timer() hands back a shared no-op context manager and
+decorated functions pay a single attribute check. Enable with
+METRICS.configure(path) or the FROZENLAKE_METRICS=<path> environment variable;
+a ".prom" path writes Prometheus text format (textfile collector), anything
+else appends JSON lines. Call METRICS.export() to write the current snapshot.
+
+Latencies go into fixed log-scale histograms (bounded memory, ~10% bucket
+resolution) from which p50/p95/p99 are estimated.
+"""
+import asyncio
+import functools
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+METRICS_ENV_VAR = "FROZENLAKE_METRICS"
+PROMETHEUS_PREFIX = "frozenlake_"
+
+_MIN_SECONDS = 1e-7
+_GROWTH = 1.1
+_NUM_BUCKETS = 242  # 1e-7 s .. ~1e3 s
+_LOG_GROWTH = math.log(_GROWTH)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Log-bucketed latency histogram."""
+    __slots__ = ("buckets", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.buckets = [0] * _NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value: float):
+        if value <= _MIN_SECONDS:
+            idx = 0
+        else:
+            idx = min(int(math.log(value / _MIN_SECONDS) / _LOG_GROWTH) + 1, _NUM_BUCKETS - 1)
+        self.buckets[idx] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation, clipped to [min, max]."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                upper = _MIN_SECONDS * _GROWTH ** idx
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict:
+        snap = {"count": self.count, "sum": self.total,
+                "min": self.min if self.count else 0.0, "max": self.max}
+        for q in QUANTILES:
+            snap[f"p{round(q * 100)}"] = self.quantile(q)
+        return snap
+
+
+class _NullTimer:
+    """Shared no-op context manager returned while disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "key", "start")
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+def _key(name: str, labels: Dict[str, str]) -> Tuple:
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+class JsonLinesSink:
+    """Appends one JSON object per series on every export."""
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+
+    def write(self, snapshot: Dict):
+        with open(self.filepath, "a") as f:
+            for row in snapshot["series"]:
+                f.write(json.dumps({"timestamp": snapshot["timestamp"], **row}) + "\n")
+
+
+class PrometheusTextSink:
+    """Rewrites a Prometheus text-format file (node_exporter textfile collector) on every export."""
+    def __init__(self, filepath: str, prefix: str = PROMETHEUS_PREFIX):
+        self.filepath = filepath
+        self.prefix = prefix
+
+    def _name(self, name: str) -> str:
+        return self.prefix + "".join(ch if ch.isalnum() else "_" for ch in name)
+
+    @staticmethod
+    def _labels(labels: Dict[str, str], **extra) -> str:
+        items = {**labels, **extra}
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items.items()) + "}"
+
+    def write(self, snapshot: Dict):
+        lines = []
+        typed = set()
+        for row in snapshot["series"]:
+            labels = row["labels"]
+            if row["type"] == "counter":
+                metric = self._name(row["name"]) + "_total"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{self._labels(labels)} {row['value']}")
+            else:
+                metric = self._name(row["name"]) + "_seconds"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} summary")
+                    typed.add(metric)
+                for q in QUANTILES:
+                    value = row[f"p{round(q * 100)}"]
+                    lines.append(f"{metric}{self._labels(labels, quantile=str(q))} {value:.9g}")
+                lines.append(f"{metric}_sum{self._labels(labels)} {row['sum']:.9g}")
+                lines.append(f"{metric}_count{self._labels(labels)} {row['count']}")
+        tmp_path = self.filepath + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.filepath)
+
+
+def sink_for_path(filepath: str):
+    """Prometheus text for *.prom, JSON lines otherwise."""
+    return PrometheusTextSink(filepath) if filepath.endswith(".prom") else JsonLinesSink(filepath)
+
+
+class Metrics:
+    """Registry of latency histograms and counters, keyed by (name, labels)."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[Tuple, Histogram] = {}
+        self.counters: Dict[Tuple, float] = {}
+        self.sinks: List = []
+        self._lock = threading.Lock()
+
+    # --- Configuration ---
+
+    def configure(self, filepath: Optional[str] = None, sink=None):
+        """Enables collection and adds a sink (from a file path or a sink object)."""
+        self.enabled = True
+        if filepath:
+            self.sinks.append(sink_for_path(filepath))
+        if sink is not None:
+            self.sinks.append(sink)
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    # --- Recording ---
+
+    def timer(self, name: str, **labels):
+        """Context manager timing its block into histogram `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, _key(name, labels))
+
+    def timed(self, name: str, **labels):
+        """Decorator timing every call (sync or async) into histogram `name`."""
+        key = _key(name, labels)
+
+        def decorator(fn):
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await fn(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        self._observe(key, time.perf_counter() - start)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._observe(key, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, value: float = 1, **labels):
+        """Increments counter `name`."""
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Records an externally measured duration."""
+        if self.enabled:
+            self._observe(_key(name, labels), seconds)
+
+    def _observe(self, key: Tuple, seconds: float):
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(seconds)
+
+    # --- Export ---
+
+    def snapshot(self) -> Dict:
+        """Current values of every series."""
+        series = []
+        with self._lock:
+            for (name, labels), hist in sorted(self.histograms.items()):
+                series.append({"name": name, "labels": dict(labels), "type": "histogram", **hist.snapshot()})
+            for (name, labels), value in sorted(self.counters.items()):
+                series.append({"name": name, "labels": dict(labels), "type": "counter", "value": value})
+        return {"timestamp": time.time(), "series": series}
+
+    def export(self):
+        """Writes the current snapshot to every sink (no-op while disabled)."""
+        if not self.enabled or not self.sinks:
+            return
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            sink.write(snapshot)
+
+    def summary(self) -> str:
+        """Human-readable table of the histograms and counters."""
+        lines = [f"{'metric':<40} {'count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for row in self.snapshot()["series"]:
+            label = row["name"] + "".join(f"[{k}={v}]" for k, v in row["labels"].items())
+            if row["type"] == "histogram":
+                lines.append(f"{label:<40} {row['count']:>8} {row['p50'] * 1e3:>9.3f} "
+                             f"{row['p95'] * 1e3:>9.3f} {row['p99'] * 1e3:>9.3f}")
+            else:
+                lines.append(f"{label:<40} {row['value']:>8g}")
+        return "\n".join(lines)
+
+
+# Process-wide registry used by every instrumented module
+METRICS = Metrics()
+if os.environ.get(METRICS_ENV_VAR):
+    METRICS.configure(os.environ[METRICS_ENV_VAR])
@@ -0,0 +1,262 @@
+"""
+Profiling support for the CLI entry points (stdlib only).
+
+    parser = argparse.ArgumentParser()
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_with_profiling(args, lambda: train_loop(...), name="train_loop_updated")
+
+--profile cprofile   Deterministic cProfile: <name>.pstats + <name>.collapsed
+--profile sample     Sampling profiler (stack snapshots of the main thread): <name>.collapsed
+--trace-malloc       tracemalloc: <name>.tracemalloc.txt, top allocation sites and
+                     growth between start and end, attributed to source lines
+
+Collapsed files use the "frame;frame;frame count" format read by flamegraph.pl
+and speedscope. For cProfile output the stacks are rebuilt from the caller graph,
+so they are an approximation; the sampling profiler records real stacks.
+A top-N hotspot table is printed after the run.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+PROFILE_MODES = ("cprofile", "sample")
+DEFAULT_PROFILE_DIR = "profiles"
+
+
+def add_profile_arguments(parser):
+    """Adds --profile / --profile-dir / --profile-top / --sample-interval / --trace-malloc."""
+    parser.add_argument("--profile", type=str, default=None, choices=PROFILE_MODES,
+                        help="Run under cProfile or the sampling profiler")
+    parser.add_argument("--profile-dir", type=str, default=DEFAULT_PROFILE_DIR,
+                        help="Directory for profile outputs")
+    parser.add_argument("--profile-top", type=int, default=20, help="Hotspots shown in the summary")
+    parser.add_argument("--sample-interval", type=float, default=0.001,
+                        help="Seconds between samples (--profile sample)")
+    parser.add_argument("--trace-malloc", action="store_true",
+                        help="Track allocations with tracemalloc and report them per source line")
+
+
+def run_with_profiling(args, fn: Callable, name: str):
+    """Runs fn() directly, or under the profilers selected by the parsed `args`."""
+    if not args.profile and not args.trace_malloc:
+        return fn()
+    return profile_run(fn, name=name, mode=args.profile, output_dir=args.profile_dir,
+                       top=args.profile_top, trace_malloc=args.trace_malloc,
+                       sample_interval=args.sample_interval)
+
+
+def _frame_label(filename: str, lineno: int, funcname: str) -> str:
+    if filename == "~":  # Built-ins
+        return funcname
+    return f"{funcname} ({os.path.basename(filename)}:{lineno})"
+
+
+# --- cProfile ---
+
+def _collapsed_from_pstats(stats: pstats.Stats, max_depth: int = 64) -> Dict[str, int]:
+    """
+    Rebuilds approximate stacks from the caller graph.
+    Each function's self time is split over its call paths in proportion to the
+    cumulative time each caller spent in it. Values are in microseconds.
+    """
+    entries = stats.stats
+    callees: Dict[tuple, Dict[tuple, float]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, ct) in callers.items():
+            callees.setdefault(caller, {})[func] = ct
+
+    roots = [func for func, (_, _, _, _, callers) in entries.items() if not callers]
+    collapsed: Counter = Counter()
+
+    def walk(func, path, on_path, scale):
+        _, _, tt, _, _ = entries[func]
+        label = _frame_label(*func)
+        stack = f"{path};{label}" if path else label
+        self_us = int(tt * scale * 1e6)
+        if self_us:
+            collapsed[stack] += self_us
+        if len(on_path) >= max_depth:
+            return
+        on_path.add(func)
+        for callee, edge_ct in callees.get(func, {}).items():
+            callee_ct = entries[callee][3]
+            # Recursion is folded into the outermost frame
+            if callee_ct <= 0 or callee in on_path:
+                continue
+            child_scale = scale * (edge_ct / callee_ct)
+            if child_scale * callee_ct * 1e6 >= 1:
+                walk(callee, stack, on_path, child_scale)
+        on_path.discard(func)
+
+    for root in roots:
+        walk(root, "", set(), 1.0)
+    return dict(collapsed)
+
+
+def _run_cprofile(fn: Callable, base: str, top: int):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn()
+    finally:
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(base + ".pstats")
+        _write_collapsed(_collapsed_from_pstats(stats), base + ".collapsed")
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("tottime").print_stats(top)
+        print(f"\n=== Top {top} hotspots (self time) ===")
+        print(_trim_pstats_output(summary.getvalue()))
+        print(f"Profile written to {base}.pstats and {base}.collapsed")
+    return result
+
+
+def _trim_pstats_output(text: str) -> str:
+    """Drops the pstats preamble, keeping the table."""
+    lines = text.strip().splitlines()
+    for i, line in enumerate(lines):
+        if line.strip().startswith("ncalls"):
+            return "\n".join(lines[i:])
+    return text
+
+
+# --- Sampling ---
+
+class SamplingProfiler:
+    """Snapshots the target thread's stack every `interval` seconds from a daemon thread."""
+
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(_frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def top_functions(self, n: int):
+        """(self samples, total samples, frame) for the n functions with the most self samples."""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        return [(c, total_counts[f], f) for f, c in self_counts.most_common(n)]
+
+
+def _run_sampling(fn: Callable, base: str, top: int, interval: float):
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        result = fn()
+    finally:
+        profiler.stop()
+        _write_collapsed(profiler.samples, base + ".collapsed")
+        total = sum(profiler.samples.values()) or 1
+        print(f"\n=== Top {top} hotspots ({total} samples every {interval * 1e3:g} ms) ===")
+        print(f"{'self %':>7} {'total %':>8}  function")
+        for self_count, total_count, frame in profiler.top_functions(top):
+            print(f"{100 * self_count / total:>6.1f}% {100 * total_count / total:>7.1f}%  {frame}")
+        print(f"Samples written to {base}.collapsed")
+    return result
+
+
+def _write_collapsed(stacks: Dict[str, int], filepath: str):
+    with open(filepath, "w") as f:
+        for stack, value in sorted(stacks.items()):
+            f.write(f"{stack} {value}\n")
+
+
+# --- tracemalloc ---
+
+def _write_tracemalloc_report(start, end, filepath: str, top: int):
+    # Leave out the profiler's own bookkeeping
+    ignore = [tracemalloc.Filter(False, path) for path in
+              (tracemalloc.__file__, cProfile.__file__, pstats.__file__, threading.__file__, __file__)]
+    start, end = start.filter_traces(ignore), end.filter_traces(ignore)
+    lines = ["Top allocation sites (live at end of run):"]
+    for stat in end.statistics("lineno")[:top]:
+        lines.append(f"  {stat.size / 1024:>10.1f} KiB {stat.count:>8} blocks  {stat.traceback}")
+    lines.append("")
+    lines.append("Largest growth since start of run:")
+    for stat in end.compare_to(start, "lineno")[:top]:
+        lines.append(f"  {stat.size_diff / 1024:>+10.1f} KiB {stat.count_diff:>+8} blocks  {stat.traceback}")
+    report = "\n".join(lines)
+    with open(filepath, "w") as f:
+        f.write(report + "\n")
+    return report
+
+
+def profile_run(fn: Callable, name: str, mode: Optional[str] = "cprofile",
+                output_dir: str = DEFAULT_PROFILE_DIR, top: int = 20,
+                trace_malloc: bool = False, sample_interval: float = 0.001):
+    """
+    Runs fn() under the requested profilers and writes the reports.
+
+    Args:
+        fn: Workload to run (its return value is passed through).
+        name: Basename of the output files (a timestamp is appended).
+        mode: "cprofile", "sample" or None (only tracemalloc).
+        output_dir: Where outputs are written (created if missing).
+        top: Rows in the printed hotspot / allocation summaries.
+        trace_malloc: Also record allocations with tracemalloc.
+        sample_interval: Seconds between samples for mode="sample".
+    """
+    if mode is not None and mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'. Choose from {PROFILE_MODES}.")
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+
+    snapshots = {}
+
+    def workload():
+        # Snapshots bracket the workload only, not the profilers' reporting
+        if trace_malloc:
+            tracemalloc.start()
+            snapshots["start"] = tracemalloc.take_snapshot()
+        try:
+            return fn()
+        finally:
+            if trace_malloc:
+                snapshots["end"] = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+
+    try:
+        if mode == "cprofile":
+            return _run_cprofile(workload, base, top)
+        if mode == "sample":
+            return _run_sampling(workload, base, top, sample_interval)
+        return workload()
+    finally:
+        if "end" in snapshots:
+            report = _write_tracemalloc_report(snapshots["start"], snapshots["end"],
+                                               base + ".tracemalloc.txt", top)
+            print(f"\n=== Allocations (tracemalloc) ===\n{report}")
+            print(f"Allocation report written to {base}.tracemalloc.txt")
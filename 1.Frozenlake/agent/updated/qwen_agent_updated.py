@@ -1,19 +1,30 @@
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
 import random
 
+from agent.updated.instrumentation import METRICS
+
 class QwenAgentUpdated:
     """
     Stateless Agent using Qwen2.5-3B-Instruct.
     Includes a fallback Mock mode if torch/transformers fails to load
     (allowing logic verification of the PI system without GPU/Env).
     """
-    def __init__(self, model_name: str = "Qwen/Qwen2.5-3B-Instruct"):
-        self.mock_mode = False
+    def __init__(self, model_name: str = "Qwen/Qwen2.5-3B-Instruct", mock: bool = False):
+        """
+        Args:
+            model_name: HF model id.
+            mock: Skip model loading and use the mock policy (benchmarks, CI).
+        """
+        self.mock_mode = mock
         self.tokenizer = None
         self.model = None
+        if mock:
+            return
         
         try:
+            # Lazy import: mock mode must work on machines without torch installed
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+
             print(f"Loading {model_name} (Updated Agent)...")
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
             self.model = AutoModelForCausalLM.from_pretrained(
@@ -25,6 +36,7 @@ class QwenAgentUpdated:
             print(f"CRITICAL WARNING: Model load failed ({e}). Switching to MOCK mode for system validation.")
             self.mock_mode = True
 
+    @METRICS.timed("agent.generate", agent="qwen-updated")
     def generate(self, system_prompt: str, user_prompt: str) -> str:
         """
         Generates a response. Uses Mock if model failed to load.
@@ -0,0 +1,149 @@
+"""
+Experience replay for the Q-table memory (TrajectoryMemory).
+
+    replay = ReplayBuffer(capacity=10000, prioritized=True)
+    ...
+    memory.update_step(s, a, r, s2, done)        # online update, as before
+    replay.add(s, a, r, s2, done)
+    ...
+    replay.replay(memory, batch_size=32, num_batches=8)   # between episodes
+
+Transitions live in fixed-size numpy columns used as a ring buffer (the oldest
+transition is overwritten once full). States are stored as ids into a key
+table, so a minibatch is a handful of array gathers. Sampling is uniform or
+proportional to |TD error| (prioritized replay, with importance-sampling
+weights); each minibatch is applied with TrajectoryMemory.update_batch.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .trajectory_memory_updated import ACTIONS
+except ImportError:
+    # Imported as a top-level module (VLM / VLM2 put agent/updated on sys.path)
+    from trajectory_memory_updated import ACTIONS
+
+_ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+
+
+class ReplayBuffer:
+    """Ring buffer of Q-learning transitions with uniform or prioritized sampling."""
+
+    def __init__(self, capacity: int = 10000, prioritized: bool = False, alpha: float = 0.6,
+                 beta: float = 0.4, epsilon: float = 1e-3, seed: Optional[int] = None):
+        """
+        Args:
+            capacity: Transitions kept (oldest overwritten first)
+            prioritized: Sample proportionally to |TD error| ** alpha
+            alpha: Priority exponent (0 = uniform)
+            beta: Importance-sampling exponent (1 = full correction)
+            epsilon: Added to |TD error| so every transition can still be sampled
+            seed: RNG seed
+        """
+        if capacity < 1:
+            raise ValueError(f"Replay capacity must be positive, got {capacity}.")
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+
+        self.states = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.priorities = np.zeros(capacity, dtype=np.float64)
+
+        self.size = 0
+        self.position = 0  # Next slot to write
+        self.max_priority = 1.0
+
+        # State key (str(state), as in the Q-table) <-> id
+        self.state_keys: List[str] = []
+        self._state_ids: Dict[str, int] = {}
+
+    def __len__(self):
+        return self.size
+
+    def _state_id(self, state) -> int:
+        key = str(state)
+        state_id = self._state_ids.get(key)
+        if state_id is None:
+            state_id = self._state_ids[key] = len(self.state_keys)
+            self.state_keys.append(key)
+        return state_id
+
+    def add(self, state: tuple, action: str, reward: float, next_state: tuple, done: bool):
+        """Stores one transition (invalid actions are ignored, as in update_step)."""
+        action_id = _ACTION_INDEX.get(action)
+        if action_id is None:
+            return
+        i = self.position
+        self.states[i] = self._state_id(state)
+        self.actions[i] = action_id
+        self.rewards[i] = reward
+        self.next_states[i] = self._state_id(next_state)
+        self.dones[i] = done
+        # New transitions get the highest priority so they are replayed at least once
+        self.priorities[i] = self.max_priority
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Draws a minibatch (with replacement).
+
+        Returns:
+            (indices, importance weights or None for uniform sampling)
+        """
+        if self.size == 0:
+            raise ValueError("Cannot sample from an empty replay buffer.")
+        if not self.prioritized:
+            return self.rng.integers(0, self.size, size=batch_size), None
+
+        scaled = self.priorities[:self.size] ** self.alpha
+        probs = scaled / scaled.sum()
+        indices = self.rng.choice(self.size, size=batch_size, p=probs)
+        weights = (self.size * probs[indices]) ** -self.beta
+        return indices, weights / weights.max()
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray):
+        priorities = np.abs(td_errors) + self.epsilon
+        self.priorities[indices] = priorities
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+    def replay(self, memory, batch_size: int = 32, num_batches: int = 1) -> float:
+        """
+        Applies `num_batches` minibatch TD updates to `memory` and saves it once.
+
+        Args:
+            memory: TrajectoryMemory to update
+            batch_size: Transitions per minibatch
+            num_batches: Minibatches to replay
+
+        Returns:
+            Mean |TD error| over the replayed transitions (0.0 if the buffer is empty)
+        """
+        if self.size == 0 or num_batches <= 0:
+            return 0.0
+        keys = self.state_keys
+        total_error = 0.0
+        for _ in range(num_batches):
+            indices, weights = self.sample(batch_size)
+            td_errors = memory.update_batch(
+                [keys[i] for i in self.states[indices].tolist()],
+                [ACTIONS[a] for a in self.actions[indices].tolist()],
+                self.rewards[indices],
+                [keys[i] for i in self.next_states[indices].tolist()],
+                self.dones[indices],
+                weights=weights,
+                save=False,
+            )
+            if self.prioritized:
+                self.update_priorities(indices, td_errors)
+            total_error += float(np.abs(td_errors).sum())
+        memory.save()
+        return total_error / (batch_size * num_batches)
@@ -0,0 +1,259 @@
+"""
+Replay dataset: sharded, memory-mapped .npy segments for offline analysis/retraining.
+
+Layout of a dataset directory:
+    index.json                  Shard list, fields, totals
+    strings.json                Dataset-local string table (message ids -> text)
+    episodes.npy                Structured array: start, length, outcome, score
+    shard_00000/actions.npy     int8    (n,)
+    shard_00000/states.npy      int16   (n, 2)  position before the step
+    shard_00000/positions.npy   int16   (n, 2)  position after the step
+    shard_00000/rewards.npy     float32 (n,)
+    shard_00000/dones.npy       bool    (n,)    episode ended here (goal/hole); never set
+                                                in truncated ('ongoing') episodes
+    shard_00000/episode_ids.npy int32   (n,)
+    shard_00000/msg_<field>.npy int32   (n,)    one per message field
+
+Episodes from any loop are written from their TrajectoryBuffer.
+The reader memory-maps every column, so sampling touches only the rows drawn.
+"""
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_STEP_COLUMNS = ("actions", "states", "positions", "rewards", "dones", "episode_ids")
+
+# dtype and per-step shape of each step column (message columns are int32 ids)
+_COLUMN_LAYOUT = {
+    "actions": (np.int8, ()),
+    "states": (np.int16, (2,)),
+    "positions": (np.int16, (2,)),
+    "rewards": (np.float32, ()),
+    "dones": (np.bool_, ()),
+    "episode_ids": (np.int32, ()),
+}
+
+EPISODE_DTYPE = np.dtype([
+    ("start", np.int64),
+    ("length", np.int32),
+    ("outcome", np.int32),   # id in strings.json
+    ("score", np.float32),
+])
+
+
+class ReplayDatasetWriter:
+    """
+    Appends episodes and flushes a shard every `shard_size` steps.
+
+    Usage:
+        with ReplayDatasetWriter("replay/", message_fields=("state_msg",)) as writer:
+            writer.add_episode(ep_data["trajectory"], outcome="goal", score=1.0)
+    """
+    def __init__(self, root_dir: str, message_fields: Sequence[str] = (), shard_size: int = 100_000):
+        """
+        Args:
+            root_dir: Output directory (created if missing). Existing datasets are appended to.
+            message_fields: Buffer message fields to export (others are dropped).
+            shard_size: Steps per shard file.
+        """
+        self.root_dir = root_dir
+        self.message_fields = tuple(message_fields)
+        self.shard_size = shard_size
+        os.makedirs(root_dir, exist_ok=True)
+
+        self.shards: List[Dict] = []
+        self.strings: List[str] = []
+        self.episodes: List[tuple] = []
+        self.num_steps = 0
+        self._load_existing()
+
+        self._string_ids = {s: i for i, s in enumerate(self.strings)}
+        self._pending: Dict[str, list] = {}
+        self._pending_steps = 0
+        self._reset_pending()
+
+    def _load_existing(self):
+        index_path = os.path.join(self.root_dir, "index.json")
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        if tuple(index["message_fields"]) != self.message_fields:
+            raise ValueError(f"Dataset at {self.root_dir} has fields {index['message_fields']}.")
+        self.shards = index["shards"]
+        self.num_steps = index["num_steps"]
+        with open(os.path.join(self.root_dir, "strings.json"), "r") as f:
+            self.strings = json.load(f)
+        self.episodes = [tuple(e) for e in np.load(os.path.join(self.root_dir, "episodes.npy")).tolist()]
+
+    def _reset_pending(self):
+        self._pending = {name: [] for name in _STEP_COLUMNS}
+        for field in self.message_fields:
+            self._pending[f"msg_{field}"] = []
+        self._pending_steps = 0
+
+    def _intern(self, text: str) -> int:
+        idx = self._string_ids.get(text)
+        if idx is None:
+            idx = len(self.strings)
+            self._string_ids[text] = idx
+            self.strings.append(text)
+        return idx
+
+    def add_episode(self, buffer, outcome: str = "ongoing", score: float = 0.0,
+                    start_pos=None):
+        """
+        Queues one episode for writing.
+
+        Args:
+            buffer: The episode's TrajectoryBuffer (agent/updated/trajectory_buffer.py).
+            outcome: Final outcome string ("ongoing" marks a truncated episode: no step is done).
+            score: Episode score.
+            start_pos: Position before the first step (for the `states` column; None: (0, 0)).
+        """
+        n = len(buffer)
+        episode_id = len(self.episodes)
+        self.episodes.append((self.num_steps + self._pending_steps, n, self._intern(outcome), score))
+        if n == 0:
+            return
+
+        # .copy() releases the buffer export so the source arrays stay appendable
+        positions = np.frombuffer(buffer.positions, dtype=np.int16).reshape(n, 2).copy()
+        states = np.empty_like(positions)
+        states[0] = start_pos if start_pos is not None else (0, 0)
+        states[1:] = positions[:-1]
+        dones = np.zeros(n, dtype=bool)
+        dones[-1] = outcome != "ongoing"
+
+        p = self._pending
+        p["actions"].append(np.frombuffer(buffer.actions, dtype=np.int8).copy())
+        p["states"].append(states)
+        p["positions"].append(positions)
+        p["rewards"].append(np.frombuffer(buffer.rewards, dtype=np.float32).copy())
+        p["dones"].append(dones)
+        p["episode_ids"].append(np.full(n, episode_id, dtype=np.int32))
+        for field in self.message_fields:
+            ids = [self._intern(buffer.message(field, i)) for i in range(n)]
+            p[f"msg_{field}"].append(np.asarray(ids, dtype=np.int32))
+
+        self._pending_steps += n
+        if self._pending_steps >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """Writes pending steps as a new shard."""
+        if not self._pending_steps:
+            return
+        name = f"shard_{len(self.shards):05d}"
+        shard_dir = os.path.join(self.root_dir, name)
+        os.makedirs(shard_dir, exist_ok=True)
+        for column, chunks in self._pending.items():
+            np.save(os.path.join(shard_dir, f"{column}.npy"), np.concatenate(chunks))
+
+        self.shards.append({"name": name, "start": self.num_steps, "steps": self._pending_steps})
+        self.num_steps += self._pending_steps
+        self._reset_pending()
+
+    def close(self):
+        """Flushes remaining steps and writes the index, string table and episode table."""
+        self.flush()
+        np.save(os.path.join(self.root_dir, "episodes.npy"), np.array(self.episodes, dtype=EPISODE_DTYPE))
+        with open(os.path.join(self.root_dir, "strings.json"), "w") as f:
+            json.dump(self.strings, f)
+        index = {
+            "version": 1,
+            "num_steps": self.num_steps,
+            "num_episodes": len(self.episodes),
+            "message_fields": list(self.message_fields),
+            "shards": self.shards,
+        }
+        with open(os.path.join(self.root_dir, "index.json"), "w") as f:
+            json.dump(index, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ReplayDatasetReader:
+    """
+    Memory-mapped reader with random minibatch sampling.
+    Only the index and episode table are loaded eagerly; strings load on first decode.
+    """
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        with open(os.path.join(root_dir, "index.json"), "r") as f:
+            self.index = json.load(f)
+        self.message_fields = tuple(self.index["message_fields"])
+        self._strings: Optional[List[str]] = None
+
+        self.episodes = np.load(os.path.join(root_dir, "episodes.npy"), mmap_mode="r")
+        self.shard_starts = np.array([s["start"] for s in self.index["shards"]], dtype=np.int64)
+        self.columns = list(_STEP_COLUMNS) + [f"msg_{f}" for f in self.message_fields]
+        self.shards = [
+            {col: np.load(os.path.join(root_dir, s["name"], f"{col}.npy"), mmap_mode="r")
+             for col in self.columns}
+            for s in self.index["shards"]
+        ]
+
+    def __len__(self):
+        return self.index["num_steps"]
+
+    @property
+    def num_episodes(self) -> int:
+        return self.index["num_episodes"]
+
+    @property
+    def strings(self) -> List[str]:
+        if self._strings is None:
+            with open(os.path.join(self.root_dir, "strings.json"), "r") as f:
+                self._strings = json.load(f)
+        return self._strings
+
+    def decode(self, ids) -> List[str]:
+        """Message ids -> strings."""
+        return [self.strings[i] for i in np.asarray(ids).ravel()]
+
+    def gather(self, indices, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Reads the given global step indices (any order) from the memory-mapped shards.
+
+        Returns:
+            dict: column name -> array of len(indices), in the order requested.
+
+        Raises:
+            IndexError: If the dataset is empty and `indices` is not.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = columns or self.columns
+        if len(indices) and not len(self):
+            raise IndexError(f"Replay dataset at {self.root_dir} is empty.")
+        shard_ids = np.searchsorted(self.shard_starts, indices, side="right") - 1
+
+        out = {}
+        for col in columns:
+            dtype, shape = _COLUMN_LAYOUT.get(col, (np.int32, ()))
+            out[col] = np.empty((len(indices),) + shape, dtype=dtype)
+        for shard_id in np.unique(shard_ids):
+            mask = shard_ids == shard_id
+            local = indices[mask] - self.shard_starts[shard_id]
+            for col in columns:
+                out[col][mask] = self.shards[shard_id][col][local]
+        return out
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None,
+               columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Uniformly samples a minibatch of transitions."""
+        if not len(self):
+            raise ValueError(f"Cannot sample from the empty replay dataset at {self.root_dir}.")
+        rng = rng if rng is not None else np.random.default_rng()
+        return self.gather(rng.integers(0, len(self), size=batch_size), columns)
+
+    def episode(self, episode_id: int) -> Dict[str, np.ndarray]:
+        """Returns all steps of one episode."""
+        start, length = int(self.episodes[episode_id]["start"]), int(self.episodes[episode_id]["length"])
+        return self.gather(np.arange(start, start + length))
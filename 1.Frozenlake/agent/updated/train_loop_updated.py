@@ -7,35 +7,47 @@ import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
 from wrapper.frozenlake_updated import load_environment_updated
+from wrapper.curriculum import CurriculumScheduler
 from agent.updated.trajectory_memory_updated import TrajectoryMemory
 from agent.updated.qwen_agent_updated import QwenAgentUpdated
-from verifier.outcome import reached_goal, fell_in_hole, hit_wall
-from verifier.delta import distance_delta_reward
+from agent.updated.trajectory_buffer import TrajectoryBuffer
+from verifier.accumulator import RewardAccumulator
+from agent.updated.instrumentation import METRICS
+from agent.updated.profiling import add_profile_arguments, run_with_profiling
 
-def format_trajectory_for_prompt(ep_data):
-    """
-    Formats a single episode trajectory for In-Context Learning.
-    Contains: Step-by-step actions, outcomes, and final result.
-    """
-    lines = [f"--- Example Episode (Fitness: {ep_data['fitness']:.2f}) ---"]
-    for step in ep_data['trajectory']:
-        # step keys: state_msg, action, response, outcome_msg
-        lines.append(f"Observation: {step['state_msg']}")
-        lines.append(f"Action: {step['action']}")
-        lines.append(f"Result: {step['outcome_msg']}")
-    lines.append(f"Final Outcome: {ep_data['final_outcome']}")
-    return "\n".join(lines)
-
-def run_episode(env, agent, memory, verbose=False):
+# Per-step text fields kept (interned) in each episode's TrajectoryBuffer
+TRAJECTORY_FIELDS = ("state_msg", "response", "outcome_msg")
+
+# Token budget for the recalled-memories (ICL) block of the first prompt
+DEFAULT_ICL_TOKENS = 1500
+
+# Step cap per episode on the default 4x4 map
+DEFAULT_MAX_STEPS = 5
+
+# Curriculum map sizes; the step cap must cover the shortest path of the largest
+# map (2 * (size - 1)), with room for detours around holes
+CURRICULUM_SIZES = (4, 5, 6)
+CURRICULUM_MAX_STEPS = 4 * (max(CURRICULUM_SIZES) - 1)
+
+def run_episode(env, agent, memory, verbose=False, icl_tokens=DEFAULT_ICL_TOKENS, max_steps=DEFAULT_MAX_STEPS):
     """
     Runs a single training episode with full trajectory capture.
+    `icl_tokens` caps the recalled-memories block (None = no limit);
+    `max_steps` caps the episode length.
     """
+    with METRICS.timer("episode.run", loop="frozenlake-updated"):
+        episode_data = _run_episode(env, agent, memory, verbose, icl_tokens, max_steps)
+    METRICS.count("episodes", loop="frozenlake-updated")
+    return episode_data
+
+def _run_episode(env, agent, memory, verbose=False, icl_tokens=DEFAULT_ICL_TOKENS, max_steps=DEFAULT_MAX_STEPS):
     # 1. Reset
     obs = env.reset()
     
     # 2. Prepare Episode Container
     episode_data = {
-        "trajectory": [],
+        "trajectory": TrajectoryBuffer(message_fields=TRAJECTORY_FIELDS),
+        "start_pos": obs.get("position", env.world.start_pos),
         "steps": 0,
         "score": 0.0,
         "fitness": 0.0,
@@ -43,19 +55,19 @@ def run_episode(env, agent, memory, verbose=False):
     }
 
     step_count = 0
-    max_steps = 5
     
-    # 3. Construct In-Context Learning Prompt (ICL) from Memory
-    top_k_episodes = memory.get_top_k()
-    icl_prompt = ""
-    if top_k_episodes:
-        icl_prompt = "\n\n=== SUCCESSFULLY RECALLED MEMORIES ===\n"
-        for ep in top_k_episodes:
-            icl_prompt += format_trajectory_for_prompt(ep) + "\n"
-        icl_prompt += "======================================\n"
+    # 3. In-Context Learning Prompt (ICL) from Memory (re-rendered only when the Top-K changes)
+    icl_prompt = memory.render_icl_block(icl_tokens)
     
     if verbose:
-        print(f"\n--- Episode Start (Memory Size: {len(top_k_episodes)}) ---")
+        print(f"\n--- Episode Start (Memory Size: {len(memory.episodes)}) ---")
+
+    # Incremental reward engine: every transition is scored exactly once
+    rewards = RewardAccumulator(
+        env.rubric,
+        start_pos=env.world.start_pos,
+        goal_pos=(env.world.rows-1, env.world.cols-1) # Bottom-right goal (enforced for curriculum maps)
+    )
 
     while step_count < max_steps:
         # Current Observation (Prompt)
@@ -68,111 +80,43 @@ def run_episode(env, agent, memory, verbose=False):
         
         # 4. Agent Generate
         # System Prompt comes from Env (Evolved)
-        # print(env.current_system_prompt) # REMOVED: Too verbose
         response = agent.generate(env.current_system_prompt, prompt)
         
         # 5. Parse
         action_text = env.parser.parse(response)
         
-        step_record = {
-            "state_msg": current_msg,
-            "response": response,
-            "action": action_text if action_text else "INVALID",
-            "action": action_text if action_text else "INVALID",
-            "outcome_msg": "", # Populated after step
-            "position": obs.get("position") 
-        }
-        
-        if not action_text:
-            step_record["outcome_msg"] = "Invalid Action Format."
-            # Penalty handled by Rubric usually, or we skip step
-            # For this loop, we treat as no-op or penalty
-            next_obs = env.world._get_observation("Invalid format. Use <action>...</action>.") # Internal hack to get msg
-            # Logic: just feedback
-            # Feedback
-            feedback_msg = "Invalid format."
-            step_record["outcome_msg"] = feedback_msg
-            # 5.5 Calculate Immediate Reward (Step-wise)
-            # We reconstruct a mini-history [step_record] just for this step's delta, 
-            # or pass the relevant info.
-            # Verifiers expect a list. 
-            step_history = [step_record] 
-            
-            # Note: Delta needs context of previous position.
-            # Step record has 'position'. We need 'previous_pos' which is handled in env but not explicitly here.
-            # Actually, 'step_record' has 'position' (current). 
-            # 'env.previous_pos' tracks prior. 
-            # We can re-use env.previous_pos logic but that's internal.
-            # Better: In 'env.step', we get observation. 
-            # Let's rely on the environment's feedback or just calculate cleanly here.
-            
-            # Simplified: Call verifiers directly with robust checking
-            r_wall = hit_wall(step_history, obs['outcome'])
-            r_hole = fell_in_hole(step_history, obs['outcome'])
-            r_goal = reached_goal(step_history, obs['outcome'])
-            
-            # Delta is tricky without history. 
-            # However, env.feedback() updates its internal state.
-            # We can approximate delta reward by manually calculating dist change.
-            # OR we can just add a 'reward' field to the observation in the wrapper? 
-            # NO, wrapper shouldn't leak reward unless we standardized it.
-            
-            # Let's calculate delta simple here:
-            prev_pos = env.previous_pos # Accessed via instance (it was updated in feedback call?)
-            # Wait, env.feedback() updates previous_pos. It was called slightly below in original code.
-            # Let's move feedback call UP or handle delta manually.
-            
-            # Let's calculate Delta manually for clarity:
-            # We need PRE-move position.
-            # 'obs' is POST-move.
-            # The agent WAS at... we didn't store it explicitly in a var, but we can infer.
-            # Actually, let's just use the `distance_delta_reward` which handles history.
-            # If we pass `[prev_step, current_step]`, it works.
-            
-            # Hack: We stored `episode_data["trajectory"]` so far.
-            # But the Current Step is not appended yet.
-            
-            # Let's append first?
-            # step_record["outcome_msg"] = feedback_msg (not yet)
-            
-            # Fix: We'll calculate Reward AFTER feedback updates.
-            pass
-        else:
+        # Invalid format: no world step, no transition recorded
+        if action_text:
             # 6. Step
-            next_obs = env.step(action_text)
+            with METRICS.timer("env.step", loop="frozenlake-updated"):
+                next_obs = env.step(action_text)
+            METRICS.count("steps", loop="frozenlake-updated")
             
             # 7. Feedback (Causal)
             feedback_msg = env.feedback(next_obs) # This updates internal prev_pos
+
+            # --- Immediate Reward (one transition, running totals) ---
+            step_reward = rewards.step(
+                next_obs["position"],
+                next_obs["outcome"],
+                wall_hit="hit a wall" in feedback_msg
+            )
             
-            step_record["outcome_msg"] = feedback_msg
-            if "position" not in step_record or step_record["position"] is None:
-                 step_record["position"] = next_obs.get("position")
-
-            # --- Calculate Immediate Reward ---
-            # We construct a 2-step history for Delta: [Previous (if exists), Current]
-            history_for_reward = []
-            if len(episode_data["trajectory"]) > 0:
-                history_for_reward.append(episode_data["trajectory"][-1])
-            history_for_reward.append(step_record)
-            
-            # Calculate components
-            # Note: hit_wall uses 'outcome_msg' which we just set.
-            # fell_in_hole uses 'final_outcome' (obs['outcome'])
-            
-            r_wall = hit_wall([step_record], next_obs['outcome'])
-            r_hole = fell_in_hole([step_record], next_obs['outcome'])
-            r_goal = reached_goal([step_record], next_obs['outcome'])
-            r_delta = distance_delta_reward(history_for_reward, next_obs['outcome'])
-            
-            step_reward = r_wall + r_hole + r_goal + r_delta
-            step_record["reward"] = step_reward
-            
-            episode_data["trajectory"].append(step_record)
+            # Columnar record: strings are interned, no per-step dict
+            episode_data["trajectory"].append(
+                action_text,
+                position=next_obs.get("position"),
+                reward=step_reward,
+                state_msg=current_msg,
+                response=response,
+                outcome_msg=feedback_msg
+            )
             
             if verbose:
                 pos = obs.get("position", "Unknown")
                 print(f"[Step {step_count} @ {pos}] Action: {action_text} >> {feedback_msg}")
 
+            obs = next_obs
             if obs["terminated"]:
                 episode_data["final_outcome"] = obs["outcome"]
                 break
@@ -181,14 +125,8 @@ def run_episode(env, agent, memory, verbose=False):
 
     episode_data["steps"] = step_count
     
-    # 8. Calculate Score
-    # We reconstruct lists for the rubric
-    # Rubric expects (episode_history, final_outcome, text_history, parser)
-    # episode_history stored actions
-    actions_list = [s["action"] for s in episode_data["trajectory"]]
-    texts_list = [s["response"] for s in episode_data["trajectory"]]
-    
-    score = env.rubric.calculate_score(episode_data["trajectory"], episode_data["final_outcome"], texts_list, env.parser)
+    # 8. Final Score (from running totals, no re-scan of the trajectory)
+    score = rewards.final_score(episode_data["final_outcome"])
     episode_data["score"] = score
     
     if verbose:
@@ -196,22 +134,45 @@ def run_episode(env, agent, memory, verbose=False):
 
     return episode_data
 
-def train_loop(episodes=20, verbose=True):
+def train_loop(episodes=20, verbose=True, export_dir=None, icl_tokens=DEFAULT_ICL_TOKENS, curriculum=False,
+               seed=None, max_steps=None):
+    """
+    Runs the training loop.
+    If `export_dir` is set, every episode is also written to a replay dataset there.
+    `icl_tokens` is the token budget for recalled episodes in the prompt.
+    With `curriculum`, every episode runs on a new map from a CurriculumScheduler
+    (difficulty follows the agent's goal rate); otherwise the default map is used.
+    `max_steps` caps each episode (default: DEFAULT_MAX_STEPS, or CURRICULUM_MAX_STEPS
+    with `curriculum`); the scheduler rates and filters its maps with the same cap.
+    """
+    if max_steps is None:
+        max_steps = CURRICULUM_MAX_STEPS if curriculum else DEFAULT_MAX_STEPS
     print("Initializing Prime-Intellect Upgrade System...")
     
     # 1. Initialize Components
     memory = TrajectoryMemory(filepath="memory.json", k=5)
     agent = QwenAgentUpdated() # Model loading
-    # Curriculum: We could randomize map here if needed, keeping default for now
-    env = load_environment_updated() 
+    # Curriculum: maps are pre-generated in the background, ordered by difficulty
+    scheduler = CurriculumScheduler(sizes=CURRICULUM_SIZES, max_steps=max_steps, seed=seed) if curriculum else None
+    env = scheduler.next_environment() if scheduler else load_environment_updated()
+    evolved = False
     
     print(f"Memory loaded with {len(memory.episodes)} episodes.")
     
+    exporter = None
+    if export_dir:
+        from agent.updated.replay_dataset import ReplayDatasetWriter
+        exporter = ReplayDatasetWriter(export_dir, message_fields=TRAJECTORY_FIELDS)
+    
     for i in range(episodes):
         print(f"\n>>> TRAINING EPISODE {i+1}/{episodes} <<<")
         
         # 2. Run Episode
-        ep_data = run_episode(env, agent, memory, verbose=verbose)
+        ep_data = run_episode(env, agent, memory, verbose=verbose, icl_tokens=icl_tokens, max_steps=max_steps)
+        
+        if exporter:
+            exporter.add_episode(ep_data["trajectory"], ep_data["final_outcome"], ep_data["score"],
+                                 start_pos=env.world.start_pos)
         
         # 3. Memory & Selection
         # Always update Q-Table with experience
@@ -226,9 +187,30 @@ def train_loop(episodes=20, verbose=True):
         if (i + 1) % 3 == 0:
             print("--- EVOLVING SYSTEM PROMPT ---")
             new_prompt = env.evolve_system_prompt(memory)
+            evolved = True
             # print(f"New Strategy Snippet: ...{new_prompt[-200:]}")
 
+        # 5. Curriculum: next map (the evolved guidance carries over)
+        if scheduler:
+            level = scheduler.record(ep_data["final_outcome"] == "goal")
+            env = scheduler.next_environment()
+            if evolved:
+                env.evolve_system_prompt(memory)
+            if verbose:
+                print(f"Curriculum level {level + 1}/{scheduler.levels}: {env.world.grid_map}")
+
+    if scheduler:
+        print(f"Curriculum: {scheduler.get_statistics()}")
+        scheduler.close()
+
+    if exporter:
+        exporter.close()
+        print(f"Replay dataset written to {export_dir} ({exporter.num_steps} steps).")
+
     print("\nTraining Complete.")
+    if METRICS.enabled:
+        print(METRICS.summary())
+        METRICS.export()
     print("Top Memories:")
     for i, ep in enumerate(memory.get_top_k()):
         print(f"{i+1}. Fitness: {ep['fitness']:.2f} | Score: {ep['score']} | Steps: {ep['steps']} | Outcome: {ep['final_outcome']}")
@@ -236,6 +218,20 @@ def train_loop(episodes=20, verbose=True):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--export-dir", type=str, default=None, help="Write episodes to a replay dataset")
+    parser.add_argument("--icl-tokens", type=int, default=DEFAULT_ICL_TOKENS, help="Token budget for recalled episodes in the prompt")
+    parser.add_argument("--curriculum", action="store_true", help="Draw a new map per episode, adapted to the success rate")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the curriculum maps")
+    parser.add_argument("--max-steps", type=int, default=None,
+                        help=f"Step cap per episode (default: {DEFAULT_MAX_STEPS}, {CURRICULUM_MAX_STEPS} with --curriculum)")
+    parser.add_argument("--metrics", type=str, default=None, help="Record stage latencies; write to this .jsonl or .prom file")
+    add_profile_arguments(parser)
     args = parser.parse_args()
     
-    train_loop(episodes=args.episodes)
+    if args.metrics:
+        METRICS.configure(args.metrics)
+    
+    run_with_profiling(args, lambda: train_loop(episodes=args.episodes, export_dir=args.export_dir,
+                                                icl_tokens=args.icl_tokens, curriculum=args.curriculum,
+                                                seed=args.seed, max_steps=args.max_steps),
+                       name="train_loop_updated")
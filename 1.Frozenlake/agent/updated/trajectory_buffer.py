@@ -0,0 +1,242 @@
+import json
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# Action name <-> int8 code (same ids as VLM2's FrozenLakeGame: 0=LEFT, 1=DOWN, 2=RIGHT, 3=UP)
+ACTION_CODES = {"LEFT": 0, "DOWN": 1, "RIGHT": 2, "UP": 3}
+ACTION_NAMES = {code: name for name, code in ACTION_CODES.items()}
+INVALID_ACTION = -1
+
+_MAGIC = b"TRJB"
+_VERSION = 1
+
+
+class StringTable:
+    """
+    Interns strings to integer ids, so a message repeated across steps
+    ("You moved RIGHT. Current tile: F.") is stored once.
+    Each buffer owns its table unless one is passed in; pass the same table to
+    several buffers to share strings across episodes (it lives as long as they do).
+    """
+    __slots__ = ("_ids", "strings")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, text: str) -> int:
+        idx = self._ids.get(text)
+        if idx is None:
+            idx = len(self.strings)
+            self._ids[text] = idx
+            self.strings.append(text)
+        return idx
+
+    def get(self, idx: int) -> str:
+        return self.strings[idx]
+
+
+class TrajectoryBuffer:
+    """
+    Compact, column-oriented trajectory storage (one row per step).
+
+    Columns (stdlib arrays, no per-step dicts):
+    - actions:   int8   action code (ACTION_CODES, INVALID_ACTION = -1)
+    - positions: int16  flattened (row, col) pairs, (-1, -1) when unknown
+    - rewards:   float32
+    - frames:    int32  handle into a shared frame source (-1 = no frame)
+    - one int32 column of interned string ids per message field
+
+    Iterating yields step dicts, so code written for the old
+    list-of-dicts trajectories (e.g. format_trajectory_for_prompt) keeps working.
+    """
+    __slots__ = ("message_fields", "strings", "frame_source",
+                 "actions", "positions", "rewards", "frames", "messages")
+
+    def __init__(self, message_fields: Sequence[str] = (), strings: Optional[StringTable] = None,
+                 frame_source: Optional[Sequence[Any]] = None):
+        """
+        Args:
+            message_fields: Names of the per-step text fields (e.g. "state_msg", "outcome_msg").
+            strings: String table for interning (default: a new table owned by this buffer).
+            frame_source: Indexable store that frame handles refer to (frames are never copied).
+        """
+        self.message_fields = tuple(message_fields)
+        self.strings = strings if strings is not None else StringTable()
+        self.frame_source = frame_source
+
+        self.actions = array("b")
+        self.positions = array("h")
+        self.rewards = array("f")
+        self.frames = array("i")
+        self.messages = {field: array("i") for field in self.message_fields}
+
+    def __len__(self):
+        return len(self.actions)
+
+    def append(self, action, position=None, reward: float = 0.0, frame: int = -1, **messages: str):
+        """
+        Appends one step.
+
+        Args:
+            action: Action name ("RIGHT"), action id (2) or None for invalid output.
+            position: (row, col) after the step, or None.
+            reward: Step reward.
+            frame: Handle of the step's frame in frame_source (-1 if none).
+            **messages: One string per message field.
+        """
+        if isinstance(action, str):
+            action = ACTION_CODES.get(action.upper(), INVALID_ACTION)
+        elif action is None:
+            action = INVALID_ACTION
+        self.actions.append(action)
+
+        if position is None:
+            self.positions.extend((-1, -1))
+        else:
+            self.positions.extend((position[0], position[1]))
+
+        self.rewards.append(reward)
+        self.frames.append(frame)
+
+        for field in self.message_fields:
+            self.messages[field].append(self.strings.intern(messages.get(field, "")))
+
+    # --- Column access ---
+
+    def position(self, i: int):
+        r, c = self.positions[2 * i], self.positions[2 * i + 1]
+        return None if r < 0 else (r, c)
+
+    def action_name(self, i: int) -> str:
+        return ACTION_NAMES.get(self.actions[i], "INVALID")
+
+    def message(self, field: str, i: int) -> str:
+        return self.strings.get(self.messages[field][i])
+
+    def frame(self, i: int):
+        handle = self.frames[i]
+        if handle < 0 or self.frame_source is None:
+            return None
+        return self.frame_source[handle]
+
+    def total_reward(self) -> float:
+        return float(sum(self.rewards))
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        """Decodes step `i` into the legacy dict format."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("TrajectoryBuffer index out of range")
+        row = {
+            "action": self.action_name(i),
+            "action_id": self.actions[i],
+            "position": self.position(i),
+            "reward": self.rewards[i],
+        }
+        for field in self.message_fields:
+            row[field] = self.message(field, i)
+        if self.frames[i] >= 0:
+            row["frame"] = self.frame(i)
+        return row
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Expands to a list of step dicts (e.g. for JSON export). Frames are omitted."""
+        rows = []
+        for row in self:
+            row.pop("frame", None)
+            rows.append(row)
+        return rows
+
+    def nbytes(self) -> int:
+        """Approximate memory of the columns (excluding the string table and frames)."""
+        columns = [self.actions, self.positions, self.rewards, self.frames, *self.messages.values()]
+        return sum(col.itemsize * len(col) for col in columns)
+
+    # --- Serialization ---
+    # Layout: MAGIC | uint32 header length | JSON header | raw column bytes (little-endian).
+    # Only the strings referenced by this buffer are written, re-indexed locally.
+
+    def to_bytes(self) -> bytes:
+        local_ids: Dict[int, int] = {}
+        local_strings: List[str] = []
+        remapped = {}
+        for field in self.message_fields:
+            col = array("i")
+            for gid in self.messages[field]:
+                lid = local_ids.get(gid)
+                if lid is None:
+                    lid = len(local_strings)
+                    local_ids[gid] = lid
+                    local_strings.append(self.strings.get(gid))
+                col.append(lid)
+            remapped[field] = col
+
+        columns = [("actions", self.actions), ("positions", self.positions),
+                   ("rewards", self.rewards), ("frames", self.frames)]
+        columns += [(f"msg:{field}", remapped[field]) for field in self.message_fields]
+
+        header = {
+            "version": _VERSION,
+            "steps": len(self),
+            "message_fields": list(self.message_fields),
+            "strings": local_strings,
+            "columns": [[name, col.typecode, len(col)] for name, col in columns],
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+
+        body = []
+        for _, col in columns:
+            if sys.byteorder != "little":
+                col = array(col.typecode, col)
+                col.byteswap()
+            body.append(col.tobytes())
+        return _MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + b"".join(body)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, strings: Optional[StringTable] = None,
+                   frame_source: Optional[Sequence[Any]] = None) -> "TrajectoryBuffer":
+        if data[:4] != _MAGIC:
+            raise ValueError("Not a TrajectoryBuffer file.")
+        (header_len,) = struct.unpack("<I", data[4:8])
+        header = json.loads(data[8:8 + header_len].decode("utf-8"))
+        if header["version"] != _VERSION:
+            raise ValueError(f"Unsupported TrajectoryBuffer version {header['version']}.")
+
+        buf = cls(header["message_fields"], strings=strings, frame_source=frame_source)
+        global_ids = [buf.strings.intern(s) for s in header["strings"]]
+
+        offset = 8 + header_len
+        for name, typecode, length in header["columns"]:
+            col = array(typecode)
+            nbytes = col.itemsize * length
+            col.frombytes(data[offset:offset + nbytes])
+            if sys.byteorder != "little":
+                col.byteswap()
+            offset += nbytes
+            if name.startswith("msg:"):
+                buf.messages[name[4:]] = array("i", (global_ids[lid] for lid in col))
+            else:
+                setattr(buf, name, col)
+        return buf
+
+    def save(self, filepath: str):
+        """Writes the buffer in the compact binary format."""
+        with open(filepath, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, filepath: str, strings: Optional[StringTable] = None,
+             frame_source: Optional[Sequence[Any]] = None) -> "TrajectoryBuffer":
+        with open(filepath, "rb") as f:
+            return cls.from_bytes(f.read(), strings=strings, frame_source=frame_source)
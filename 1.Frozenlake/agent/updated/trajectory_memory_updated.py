@@ -1,39 +1,280 @@
+import heapq
+import itertools
 import json
 import os
-from typing import List, Dict, Any
+import sys
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .instrumentation import METRICS
+    from ..conversation_buffer import estimate_tokens
+except ImportError:
+    # Imported as a top-level module (VLM / VLM2 put agent/updated on sys.path)
+    from instrumentation import METRICS
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from conversation_buffer import estimate_tokens
+
+ACTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
+_ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+
+# Fitness = score - STEP_COST * steps (shorter successful paths rank higher)
+STEP_COST = 0.05
+
+ICL_HEADER = "\n\n=== SUCCESSFULLY RECALLED MEMORIES ===\n"
+ICL_FOOTER = "======================================\n"
+
+def format_trajectory_for_prompt(ep_data):
+    """
+    Formats a single episode trajectory for In-Context Learning.
+    Contains: Step-by-step actions, outcomes, and final result.
+    """
+    return "\n".join(_trajectory_prompt_lines(ep_data))
+
+def _trajectory_prompt_lines(ep_data, max_steps=None):
+    steps = ep_data['trajectory']
+    lines = [f"--- Example Episode (Fitness: {ep_data['fitness']:.2f}) ---"]
+    for i, step in enumerate(steps):
+        if max_steps is not None and i == max_steps:
+            lines.append(f"... ({len(steps) - max_steps} more steps)")
+            break
+        # step keys: state_msg, action, response, outcome_msg
+        lines.append(f"Observation: {step['state_msg']}")
+        lines.append(f"Action: {step['action']}")
+        lines.append(f"Result: {step['outcome_msg']}")
+    lines.append(f"Final Outcome: {ep_data['final_outcome']}")
+    return lines
+
+def _episode_fitness(ep_data: Dict[str, Any]) -> float:
+    return round(ep_data["score"] - STEP_COST * ep_data["steps"], 4)
+
+def _trajectory_steps(trajectory) -> List[Dict[str, Any]]:
+    """Plain JSON-ready step dicts (TrajectoryBuffers decode to the legacy format)."""
+    steps = []
+    for step in trajectory:
+        step = {key: value for key, value in step.items() if key not in ("frame", "action_id")}
+        if step.get("position") is not None:
+            step["position"] = list(step["position"])
+        steps.append(step)
+    return steps
+
+def _trajectory_transitions(trajectory, start_pos):
+    """(states, actions, rewards, next_states) of the valid steps of a trajectory."""
+    if hasattr(trajectory, "positions"):
+        # TrajectoryBuffer: read the columns directly (codes 0=LEFT, 1=DOWN, 2=RIGHT, 3=UP)
+        positions = np.asarray(trajectory.positions, dtype=np.int64).reshape(-1, 2)
+        names = np.array(["LEFT", "DOWN", "RIGHT", "UP", "INVALID"])
+        codes = np.asarray(trajectory.actions, dtype=np.int64)
+        actions = names[np.where(codes < 0, 4, codes)]
+        rewards = np.asarray(trajectory.rewards, dtype=np.float64)
+    else:
+        positions = np.array([step.get("position") or (-1, -1) for step in trajectory], dtype=np.int64).reshape(-1, 2)
+        actions = np.array([step["action"] for step in trajectory])
+        rewards = np.array([step.get("reward", 0.0) for step in trajectory], dtype=np.float64)
+
+    # State before step i is the position after step i-1 (the start for the first step)
+    previous = np.vstack([np.asarray(start_pos, dtype=np.int64).reshape(1, 2), positions[:-1]])
+    valid = (positions[:, 0] >= 0) & (previous[:, 0] >= 0) & np.isin(actions, ACTIONS)
+    states = [str(p) for p in map(tuple, previous[valid].tolist())]
+    next_states = [str(p) for p in map(tuple, positions[valid].tolist())]
+    return states, actions[valid].tolist(), rewards[valid], next_states, valid
 
 class TrajectoryMemory:
     """
     Manages persistent storage of successful episodes.
     Retains only the Top-K episodes based on a fitness score.
     """
-    def __init__(self, filepath: str = "memory.json"):
+    MERGE_MODES = ("mean", "visits")
+
+    def __init__(self, filepath: Optional[str] = "memory.json", k: int = 5):
         """
         Initializes the Memory System.
-        Now primarily a Q-Table store: State(Coords) -> {Action: Q-Value}
+        A Q-Table store: State(Coords) -> {Action: Q-Value}, plus the Top-K episodes by fitness.
+        filepath=None keeps the table in memory only (e.g. a worker's shard).
         """
+        if k < 1:
+            raise ValueError(f"Memory size k must be positive, got {k}.")
         self.filepath = filepath
+        self.k = k
         self.q_table: Dict[str, Dict[str, float]] = {}
+        # Updates per state/action since load or the last merge (not persisted)
+        self.visits: Dict[str, Dict[str, int]] = {}
+        # Min-heap of (fitness, insertion order, episode): the root is the weakest survivor
+        self._heap: List[tuple] = []
+        self._order = itertools.count()
+        self._top_k: Optional[List[Dict[str, Any]]] = None
+        self._lessons: Optional[str] = None
+        # Bumped whenever the Top-K set changes; keys the rendered ICL block
+        self.version = 0
+        self._icl_cache: Dict[Optional[int], tuple] = {}
         self._load_memory()
 
+    @METRICS.timed("memory.load")
     def _load_memory(self):
         """Loads Q-table from JSON file if it exists."""
-        if os.path.exists(self.filepath):
+        if self.filepath and os.path.exists(self.filepath):
             try:
                 with open(self.filepath, 'r') as f:
-                    self.q_table = json.load(f)
+                    data = json.load(f)
             except (json.JSONDecodeError, IOError):
                 print(f"Warning: Could not load memory from {self.filepath}. Starting fresh.")
-                self.q_table = {}
+                data = {}
+            if isinstance(data.get("episodes"), list) and isinstance(data.get("q_table"), dict):
+                self.q_table = data["q_table"]
+                for ep in data["episodes"]:
+                    self._push_episode(ep)
+            else:
+                # Plain Q-table file (no episodes stored yet)
+                self.q_table = data
 
+    @METRICS.timed("memory.save")
     def _save_memory(self):
-        """Saves current Q-table to JSON file."""
+        """Saves current Q-table (and the Top-K episodes, if any) to JSON file."""
+        if not self.filepath:
+            return
+        data = self.q_table
+        if self._heap:
+            data = {"q_table": self.q_table, "episodes": self.get_top_k()}
         try:
             with open(self.filepath, 'w') as f:
-                json.dump(self.q_table, f, indent=2, sort_keys=True)
+                json.dump(data, f, indent=2, sort_keys=True)
         except IOError as e:
             print(f"Error saving memory: {e}")
 
+    def save(self):
+        """Writes the memory to `filepath` (for callers batching updates with save=False)."""
+        self._save_memory()
+
+    # --- Episode memory (Top-K by fitness) ---
+
+    @property
+    def episodes(self) -> List[Dict[str, Any]]:
+        """Stored episodes, best first."""
+        return self.get_top_k()
+
+    def _push_episode(self, ep: Dict[str, Any]) -> bool:
+        """O(log k) insertion; returns False if the episode does not make the Top-K."""
+        entry = (ep["fitness"], next(self._order), ep)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+        else:
+            return False
+        self._top_k = None
+        self._lessons = None
+        self.version += 1
+        return True
+
+    @METRICS.timed("memory.add_episode")
+    def add_episode(self, ep_data: Dict[str, Any]) -> bool:
+        """
+        Offers an episode to the Top-K memory (sets ep_data["fitness"]).
+        Saves only if the episode is kept.
+
+        Returns:
+            True if the episode is now among the Top-K
+        """
+        ep_data["fitness"] = _episode_fitness(ep_data)
+        if len(self._heap) >= self.k and ep_data["fitness"] <= self._heap[0][0]:
+            return False
+        stored = {
+            "fitness": ep_data["fitness"],
+            "score": ep_data["score"],
+            "steps": ep_data["steps"],
+            "final_outcome": ep_data["final_outcome"],
+            "trajectory": _trajectory_steps(ep_data["trajectory"]),
+        }
+        self._push_episode(stored)
+        self._save_memory()
+        return True
+
+    def get_top_k(self) -> List[Dict[str, Any]]:
+        """Top-K episodes, best first (cached until the set changes; treat as read-only)."""
+        if self._top_k is None:
+            self._top_k = [entry[2] for entry in sorted(self._heap, key=lambda e: (-e[0], e[1]))]
+        return self._top_k
+
+    def render_icl_block(self, max_tokens: Optional[int] = None) -> str:
+        """
+        In-Context Learning block with the Top-K episodes, best first ("" if empty).
+        Memoized per budget until the Top-K set changes (see version).
+
+        Args:
+            max_tokens: Token budget (estimate_tokens) for the whole block. Episodes are
+                        added best first; the first one that does not fit is cut short
+                        after as many steps as fit, and the rest are dropped.
+        """
+        cached = self._icl_cache.get(max_tokens)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        block = self._render_icl_block(max_tokens)
+        self._icl_cache[max_tokens] = (self.version, block)
+        return block
+
+    def _render_icl_block(self, max_tokens: Optional[int]) -> str:
+        episodes = self.get_top_k()
+        if not episodes:
+            return ""
+        parts = []
+        used = estimate_tokens(ICL_HEADER + ICL_FOOTER)
+        for ep in episodes:
+            text = format_trajectory_for_prompt(ep) + "\n"
+            tokens = estimate_tokens(text)
+            if max_tokens is None or used + tokens <= max_tokens:
+                parts.append(text)
+                used += tokens
+                continue
+            # Keep the longest prefix of steps that fits, then stop
+            for max_steps in range(len(ep["trajectory"]) - 1, -1, -1):
+                text = "\n".join(_trajectory_prompt_lines(ep, max_steps)) + "\n"
+                if used + estimate_tokens(text) <= max_tokens:
+                    parts.append(text)
+                    break
+            break
+        if not parts:
+            return ""
+        return ICL_HEADER + "".join(parts) + ICL_FOOTER
+
+    def get_lessons(self) -> str:
+        """Action sequences of the Top-K episodes, for the system prompt (cached until the set changes)."""
+        if self._lessons is None:
+            lines = []
+            for ep in self.get_top_k():
+                path = " -> ".join(step["action"] for step in ep["trajectory"])
+                lines.append(f"- Fitness {ep['fitness']:.2f} ({ep['final_outcome']} in {ep['steps']} steps): {path}")
+            self._lessons = "\n".join(lines) if lines else "No successful episodes recorded yet."
+        return self._lessons
+
+    @METRICS.timed("memory.update_q_table")
+    def update_q_table(self, ep_data: Dict[str, Any], start_pos: Optional[tuple] = None):
+        """
+        Applies every valid step of an episode's trajectory with update_step, in
+        order (each step sees the values written by the earlier ones, e.g. when a
+        state is revisited), and saves once at the end.
+
+        Args:
+            ep_data: Episode with "trajectory" (TrajectoryBuffer or step dicts) and "final_outcome"
+            start_pos: Position before the first step (default: ep_data["start_pos"], else (0, 0))
+        """
+        if start_pos is None:
+            start_pos = ep_data.get("start_pos") or (0, 0)
+        trajectory = ep_data["trajectory"]
+        if not len(trajectory):
+            return
+        states, actions, rewards, next_states, valid = _trajectory_transitions(trajectory, start_pos)
+        if not states:
+            return
+        # Only the last step of a finished episode is terminal
+        dones = np.zeros(len(valid), dtype=bool)
+        dones[-1] = ep_data.get("final_outcome", "ongoing") != "ongoing"
+        # States are already keys (str(state)); update_step's str() leaves them unchanged
+        for state, action, reward, next_state, done in zip(states, actions, rewards.tolist(), next_states,
+                                                           dones[valid].tolist()):
+            self.update_step(state, action, reward, next_state, done, save=False)
+        self.save()
+
     def get_q_values(self, state: tuple) -> Dict[str, float]:
         """
         Returns the Q-values for a given state.
@@ -50,10 +291,13 @@ class TrajectoryMemory:
                 values[action] = 0.0
         return values
 
-    def update_step(self, state: tuple, action: str, reward: float, next_state: tuple, done: bool):
+    @METRICS.timed("memory.update")
+    def update_step(self, state: tuple, action: str, reward: float, next_state: tuple, done: bool,
+                    save: bool = True):
         """
         Performs a single Q-Learning update step.
         Q(s,a) <- Q(s,a) + alpha * (r + gamma * max_a' Q(s',a') - Q(s,a))
+        save=False skips writing the table (call save() after a run of updates).
         """
         if action not in ["UP", "DOWN", "LEFT", "RIGHT"]:
             return
@@ -84,5 +328,108 @@ class TrajectoryMemory:
         # Update
         new_q = current_q + alpha * (target - current_q)
         self.q_table[state_key][action] = round(new_q, 4) # Round for cleaner JSON
+        state_visits = self.visits.setdefault(state_key, {})
+        state_visits[action] = state_visits.get(action, 0) + 1
         
+        if save:
+            self._save_memory()
+
+    @METRICS.timed("memory.update_batch")
+    def update_batch(self, states: Sequence[str], actions: Sequence[str], rewards, next_states: Sequence[str],
+                     dones, weights=None, save: bool = True) -> np.ndarray:
+        """
+        Vectorized Q-Learning update for a minibatch of transitions (same rule,
+        alpha and gamma as update_step). All TD errors are computed from the same
+        table snapshot; repeated (state, action) pairs get their mean step.
+
+        Args:
+            states, next_states: State keys (str(state))
+            actions: Action names
+            rewards, dones: Per-transition reward and terminal flag
+            weights: Optional per-transition step weights (importance sampling)
+            save: Write the table once after the batch
+
+        Returns:
+            TD errors (target - Q) before the update
+        """
+        alpha = 0.1 # Learning rate
+        gamma = 0.9 # Discount factor
+        
+        # Dense view of the touched states: values, plus which actions exist
+        keys = list(dict.fromkeys(list(states) + list(next_states)))
+        index = {key: i for i, key in enumerate(keys)}
+        q = np.zeros((len(keys), len(ACTIONS)))
+        present = np.zeros((len(keys), len(ACTIONS)), dtype=bool)
+        for i, key in enumerate(keys):
+            for action, value in self.q_table.get(key, {}).items():
+                j = _ACTION_INDEX.get(action)
+                if j is not None:
+                    q[i, j] = value
+                    present[i, j] = True
+        
+        s = np.fromiter((index[k] for k in states), dtype=np.int64, count=len(states))
+        ns = np.fromiter((index[k] for k in next_states), dtype=np.int64, count=len(next_states))
+        a = np.fromiter((_ACTION_INDEX[x] for x in actions), dtype=np.int64, count=len(actions))
+        
+        # Max over existing next actions, 0 for unseen/terminal next states
+        next_q = np.where(present[ns], q[ns], -np.inf).max(axis=1)
+        next_q = np.where(np.isfinite(next_q) & ~np.asarray(dones, dtype=bool), next_q, 0.0)
+        td_errors = np.asarray(rewards, dtype=np.float64) + gamma * next_q - q[s, a]
+        
+        steps = alpha * td_errors if weights is None else alpha * td_errors * np.asarray(weights)
+        flat = s * len(ACTIONS) + a
+        pairs, inverse = np.unique(flat, return_inverse=True)
+        mean_steps = np.bincount(inverse, weights=steps) / np.bincount(inverse)
+        counts = np.bincount(inverse)
+        
+        for pair, step, count in zip(pairs.tolist(), mean_steps.tolist(), counts.tolist()):
+            i, j = divmod(pair, len(ACTIONS))
+            key, action = keys[i], ACTIONS[j]
+            state_q = self.q_table.setdefault(key, {})
+            state_q[action] = round(state_q.get(action, 0.0) + step, 4) # Round for cleaner JSON
+            state_visits = self.visits.setdefault(key, {})
+            state_visits[action] = state_visits.get(action, 0) + count
+        
+        if save:
+            self._save_memory()
+        return td_errors
+
+    @classmethod
+    def shard(cls, q_table: Dict[str, Dict[str, float]]) -> "TrajectoryMemory":
+        """In-memory copy of a Q-table for a worker; merge it back with merge_shards."""
+        memory = cls(filepath=None)
+        memory.q_table = {state: dict(actions) for state, actions in q_table.items()}
+        return memory
+
+    def merge_shards(self, shards: List[Dict[str, Dict]], mode: str = "visits"):
+        """
+        Folds worker shards back into this table and saves once.
+        Every shard must have started from this table's current values.
+
+        Args:
+            shards: {"q_table": ..., "visits": ...} per worker
+            mode: "mean" averages every shard's value (untouched entries count
+                  as the starting value); "visits" weights each shard's value
+                  by how often it updated that entry.
+        """
+        if mode not in self.MERGE_MODES:
+            raise ValueError(f"Unknown merge mode '{mode}'. Choose from {self.MERGE_MODES}.")
+        if not shards:
+            return
+
+        touched = {(state, action)
+                   for shard in shards for state, actions in shard["visits"].items() for action in actions}
+        for state, action in touched:
+            base = self.q_table.get(state, {}).get(action, 0.0)
+            if mode == "mean":
+                merged = sum(shard["q_table"].get(state, {}).get(action, base) for shard in shards) / len(shards)
+            else:
+                weights = [shard["visits"].get(state, {}).get(action, 0) for shard in shards]
+                merged = sum(w * shard["q_table"][state][action]
+                             for w, shard in zip(weights, shards) if w) / sum(weights)
+            self.q_table.setdefault(state, {})[action] = round(merged, 4)
+            state_visits = self.visits.setdefault(state, {})
+            state_visits[action] = state_visits.get(action, 0) + sum(
+                shard["visits"].get(state, {}).get(action, 0) for shard in shards)
+
         self._save_memory()
@@ -0,0 +1,178 @@
+"""
+Incremental reward engine.
+
+RewardAccumulator receives each transition once and keeps a running total for
+every rubric term, so the training loop gets the per-step reward and the final
+Rubric score without building throwaway histories or re-scanning the trajectory.
+Totals equal the corresponding episode-level verifiers on the default map.
+"""
+from typing import Dict, Optional, Tuple
+
+from .outcome import reached_goal, fell_in_hole, hit_wall
+from .efficiency import step_efficiency
+from .delta import distance_delta_reward
+from .distance import manhattan_distance_reward
+
+
+def _manhattan(pos1, pos2) -> int:
+    return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+
+
+class RewardTerm:
+    """
+    One rubric term, updated per transition.
+    step() returns the term's per-step contribution; total() its episode value.
+    """
+    def __init__(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int]):
+        self.start_pos = start_pos
+        self.goal_pos = goal_pos
+        self.reset()
+
+    def reset(self):
+        self.value = 0.0
+
+    def step(self, position, outcome: str, wall_hit: bool) -> float:
+        return 0.0
+
+    def total(self, final_outcome: str, steps: int, last_position) -> float:
+        return self.value
+
+
+class GoalTerm(RewardTerm):
+    """reached_goal: +1.0 on the transition that lands on the goal."""
+    def step(self, position, outcome, wall_hit):
+        return 1.0 if outcome == "goal" else 0.0
+
+    def total(self, final_outcome, steps, last_position):
+        return 1.0 if final_outcome == "goal" else 0.0
+
+
+class HoleTerm(RewardTerm):
+    """fell_in_hole: -1.0 on the transition that falls into a hole."""
+    def step(self, position, outcome, wall_hit):
+        return -1.0 if outcome == "hole" else 0.0
+
+    def total(self, final_outcome, steps, last_position):
+        return -1.0 if final_outcome == "hole" else 0.0
+
+
+class WallTerm(RewardTerm):
+    """hit_wall: -1.0 per wall hit."""
+    def step(self, position, outcome, wall_hit):
+        reward = -1.0 if wall_hit else 0.0
+        self.value += reward
+        return reward
+
+
+class DistanceDeltaTerm(RewardTerm):
+    """distance_delta_reward: +/-0.5 per step closer to / away from the goal."""
+    def reset(self):
+        super().reset()
+        self.previous_pos = self.start_pos
+
+    def step(self, position, outcome, wall_hit):
+        if not position:
+            return 0.0
+        delta = _manhattan(self.previous_pos, self.goal_pos) - _manhattan(position, self.goal_pos)
+        self.previous_pos = position
+        reward = 0.5 if delta > 0 else (-0.5 if delta < 0 else 0.0)
+        self.value += reward
+        return reward
+
+
+class StepEfficiencyTerm(RewardTerm):
+    """step_efficiency: episode-level, 1 / (steps + 1) if the goal was reached."""
+    def total(self, final_outcome, steps, last_position):
+        return 1.0 / (steps + 1) if final_outcome == "goal" else 0.0
+
+
+class ManhattanDistanceTerm(RewardTerm):
+    """manhattan_distance_reward: episode-level, 1 - final_distance / max_distance."""
+    def total(self, final_outcome, steps, last_position):
+        if not steps or last_position is None:
+            return 0.0
+        max_dist = float(_manhattan(self.start_pos, self.goal_pos))
+        return max(0.0, 1.0 - _manhattan(last_position, self.goal_pos) / max_dist)
+
+
+# Scalar verifier -> incremental term
+TERM_TYPES = {
+    reached_goal: GoalTerm,
+    fell_in_hole: HoleTerm,
+    hit_wall: WallTerm,
+    distance_delta_reward: DistanceDeltaTerm,
+    step_efficiency: StepEfficiencyTerm,
+    manhattan_distance_reward: ManhattanDistanceTerm,
+}
+
+
+class RewardAccumulator:
+    """
+    Stateful reward engine for one episode at a time.
+
+    Usage:
+        acc = RewardAccumulator(env.rubric)
+        acc.reset()
+        r = acc.step(obs["position"], obs["outcome"], wall_hit)  # per transition
+        score = acc.final_score()  # == rubric.calculate_score(trajectory, outcome, ...)
+    """
+    def __init__(self, rubric, start_pos: Tuple[int, int] = (0, 0), goal_pos: Tuple[int, int] = (3, 3)):
+        """
+        Args:
+            rubric: Rubric whose (verifier, weight) pairs define the terms.
+            start_pos: Start position (the verifiers assume (0, 0)).
+            goal_pos: Goal position (the verifiers assume (3, 3)).
+        """
+        self.terms = []
+        for verifier, weight in rubric.verifiers:
+            term_type = TERM_TYPES.get(verifier)
+            if term_type is None:
+                raise ValueError(f"No incremental implementation for verifier '{verifier.__name__}'.")
+            self.terms.append((verifier.__name__, term_type(start_pos, goal_pos), weight))
+        self.reset()
+
+    def reset(self):
+        """Clears all running totals for a new episode."""
+        for _, term, _ in self.terms:
+            term.reset()
+        self.steps = 0
+        self.last_position = None
+        self.final_outcome = "ongoing"
+
+    def step(self, position, outcome: str, wall_hit: bool = False) -> float:
+        """
+        Records one transition.
+
+        Args:
+            position: Agent position after the step.
+            outcome: World outcome after the step ("ongoing", "goal", "hole").
+            wall_hit: Whether the move hit a wall.
+
+        Returns:
+            float: Per-step reward, the unweighted sum of the terms' step contributions.
+        """
+        self.steps += 1
+        if position:
+            self.last_position = position
+        self.final_outcome = outcome
+        return sum(term.step(position, outcome, wall_hit) for _, term, _ in self.terms)
+
+    def totals(self) -> Dict[str, float]:
+        """Running value of every rubric term (unweighted), keyed by verifier name."""
+        return {
+            name: term.total(self.final_outcome, self.steps, self.last_position)
+            for name, term, _ in self.terms
+        }
+
+    def final_score(self, final_outcome: Optional[str] = None) -> float:
+        """
+        Weighted rubric score for the episode so far.
+
+        Args:
+            final_outcome: Override the outcome of the last transition (e.g. "ongoing").
+        """
+        outcome = final_outcome if final_outcome is not None else self.final_outcome
+        return sum(
+            weight * term.total(outcome, self.steps, self.last_position)
+            for _, term, weight in self.terms
+        )
@@ -0,0 +1,135 @@
+"""
+Vectorized (NumPy) verifiers for scoring many episodes at once.
+
+Each function takes an EpisodeBatch and returns a float array of shape (N,)
+with exactly the values the per-episode verifier would return for each episode.
+Used by Rubric.calculate_scores_batch for offline evaluation.
+"""
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .outcome import reached_goal, fell_in_hole, hit_wall
+from .efficiency import step_efficiency
+from .delta import distance_delta_reward
+from .distance import manhattan_distance_reward
+
+# Outcome string <-> int8 code
+OUTCOME_CODES = {"ongoing": 0, "goal": 1, "hole": 2}
+OUTCOME_NAMES = {code: name for name, code in OUTCOME_CODES.items()}
+
+# Same constants as the scalar verifiers (default 4x4 map)
+START_POS = (0, 0)
+GOAL_POS = (3, 3)
+MAX_DIST = 6.0
+
+
+class EpisodeBatch:
+    """
+    Columnar batch of N episodes padded to T steps.
+
+    Attributes:
+        positions (np.ndarray): (N, T, 2) int16 agent position after each step.
+                                Missing positions are forward-filled.
+        outcomes (np.ndarray): (N,) int8 final outcome code (see OUTCOME_CODES).
+        wall_hits (np.ndarray): (N, T) bool, True where the step hit a wall.
+        lengths (np.ndarray): (N,) int32 number of recorded steps per episode.
+    """
+    def __init__(self, positions, outcomes, wall_hits, lengths):
+        self.positions = np.asarray(positions, dtype=np.int16)
+        self.outcomes = np.asarray(outcomes, dtype=np.int8)
+        self.wall_hits = np.asarray(wall_hits, dtype=bool)
+        self.lengths = np.asarray(lengths, dtype=np.int32)
+
+        n, t = self.wall_hits.shape
+        if self.positions.shape != (n, t, 2) or self.outcomes.shape != (n,) or self.lengths.shape != (n,):
+            raise ValueError("EpisodeBatch columns have inconsistent shapes.")
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @property
+    def step_mask(self) -> np.ndarray:
+        """(N, T) bool, True for real (non-padding) steps."""
+        return np.arange(self.wall_hits.shape[1]) < self.lengths[:, None]
+
+    @classmethod
+    def from_episodes(cls, trajectories: Sequence[List[Dict[str, Any]]], final_outcomes: Sequence[str]):
+        """
+        Builds a batch from per-step dict trajectories (train_loop_updated.py format).
+
+        Args:
+            trajectories: One list of step dicts per episode ('position', 'outcome_msg').
+            final_outcomes: Outcome string per episode.
+        """
+        n = len(trajectories)
+        t = max((len(traj) for traj in trajectories), default=0)
+        positions = np.empty((n, t, 2), dtype=np.int16)
+        wall_hits = np.zeros((n, t), dtype=bool)
+        lengths = np.zeros(n, dtype=np.int32)
+
+        for i, traj in enumerate(trajectories):
+            last = START_POS
+            for j, step in enumerate(traj):
+                pos = step.get('position')
+                if pos:
+                    last = pos
+                positions[i, j] = last
+                wall_hits[i, j] = "hit a wall" in step.get('outcome_msg', '')
+            positions[i, len(traj):] = last
+            lengths[i] = len(traj)
+
+        outcomes = np.array([OUTCOME_CODES.get(o, 0) for o in final_outcomes], dtype=np.int8)
+        return cls(positions, outcomes, wall_hits, lengths)
+
+
+def _goal_distance(positions: np.ndarray) -> np.ndarray:
+    """Manhattan distance to GOAL_POS over the last axis."""
+    return np.abs(positions[..., 0] - GOAL_POS[0]) + np.abs(positions[..., 1] - GOAL_POS[1])
+
+
+def reached_goal_batch(batch: EpisodeBatch) -> np.ndarray:
+    return (batch.outcomes == OUTCOME_CODES["goal"]).astype(np.float64)
+
+
+def fell_in_hole_batch(batch: EpisodeBatch) -> np.ndarray:
+    return -(batch.outcomes == OUTCOME_CODES["hole"]).astype(np.float64)
+
+
+def hit_wall_batch(batch: EpisodeBatch) -> np.ndarray:
+    return -(batch.wall_hits & batch.step_mask).sum(axis=1).astype(np.float64)
+
+
+def step_efficiency_batch(batch: EpisodeBatch) -> np.ndarray:
+    return np.where(batch.outcomes == OUTCOME_CODES["goal"], 1.0 / (batch.lengths + 1.0), 0.0)
+
+
+def distance_delta_reward_batch(batch: EpisodeBatch) -> np.ndarray:
+    n = len(batch)
+    start = np.broadcast_to(np.array(START_POS, dtype=np.int16), (n, 1, 2))
+    path = np.concatenate([start, batch.positions], axis=1)
+    dist = _goal_distance(path.astype(np.int32))
+    # +0.5 per step closer, -0.5 per step away
+    delta = np.sign(dist[:, :-1] - dist[:, 1:]) * batch.step_mask
+    return 0.5 * delta.sum(axis=1, dtype=np.float64)
+
+
+def manhattan_distance_reward_batch(batch: EpisodeBatch) -> np.ndarray:
+    n = len(batch)
+    if batch.positions.shape[1] == 0:
+        return np.zeros(n)
+    last_idx = np.maximum(batch.lengths - 1, 0)
+    final_pos = batch.positions[np.arange(n), last_idx].astype(np.int32)
+    reward = np.maximum(0.0, 1.0 - _goal_distance(final_pos) / MAX_DIST)
+    return np.where(batch.lengths > 0, reward, 0.0)
+
+
+# Scalar verifier -> vectorized implementation (used by Rubric.calculate_scores_batch)
+BATCH_VERIFIERS = {
+    reached_goal: reached_goal_batch,
+    fell_in_hole: fell_in_hole_batch,
+    hit_wall: hit_wall_batch,
+    step_efficiency: step_efficiency_batch,
+    distance_delta_reward: distance_delta_reward_batch,
+    manhattan_distance_reward: manhattan_distance_reward_batch,
+}
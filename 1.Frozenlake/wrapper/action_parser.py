@@ -0,0 +1,203 @@
+import re
+from itertools import islice
+from typing import Dict, Optional
+
+# --- Shared Action Parsers ---
+# Single home for the action parsers used by 1.Frozenlake (wrapper/frozenlake.py,
+# wrapper/frozenlake_updated.py) and VLM (Wrapper/xml_parser.py).
+# Only depends on the standard library so other trees can import it by path.
+
+ACTION_KEYWORD_PATTERN = re.compile(r"\b(LEFT|RIGHT|UP|DOWN)\b", re.IGNORECASE)
+_KEYWORD_MAX_LEN = len("RIGHT")
+
+_TAG_PATTERNS: Dict[str, re.Pattern] = {}
+
+
+def _tag_pattern(tag_name: str) -> re.Pattern:
+    """Returns the compiled <tag>(.*?)</tag> pattern, compiled once per tag name."""
+    pattern = _TAG_PATTERNS.get(tag_name)
+    if pattern is None:
+        pattern = re.compile(f"<{tag_name}>(.*?)</{tag_name}>", re.DOTALL | re.IGNORECASE)
+        _TAG_PATTERNS[tag_name] = pattern
+    return pattern
+
+
+class XMLParser:
+    """
+    Parses XML-formatted actions from LLM output.
+    Design strictly follows Prime Intellect verifiers.XMLParser pattern.
+    """
+    def __init__(self, fields: Dict[str, str]):
+        """
+        Args:
+            fields: A dict mapping field names to their expected tag names.
+                    e.g. {"answer": "action"}
+        """
+        self.fields = fields
+        # In this specific case, we care about the 'answer' field which maps to <action>
+        self.tag_name = fields.get("answer", "action")
+        self.pattern = _tag_pattern(self.tag_name)
+
+    def parse(self, text: str) -> Optional[str]:
+        """
+        Extracts the content of the action tag.
+        Returns None if not found, malformed, or if multiple tags exist.
+        """
+        # Only 0, 1 or "more than one" matters: stop scanning at the second match
+        matches = list(islice(self.pattern.finditer(text), 2))
+
+        if len(matches) == 1:
+            return matches[0].group(1).strip()
+        # None found, or multiple actions (hallucination) -> reject
+        return None
+
+    def format_reward(self, text: str) -> float:
+        """
+        Returns 1.0 if the format is correct (tag exists), 0.0 otherwise.
+        """
+        return 1.0 if self.parse(text) is not None else 0.0
+
+    def stream(self) -> "XMLActionStream":
+        """Returns a fresh incremental parser for streamed model output."""
+        return XMLActionStream(self.tag_name)
+
+
+class RobustParser:
+    """
+    A loose parser that extracts action keywords from free text.
+    Replaces the strict XML requirement for smaller models.
+    """
+    def __init__(self, fields=None):
+        self.fields = fields
+
+    def parse(self, text: str):
+        # Look for actions (case-insensitive)
+        match = ACTION_KEYWORD_PATTERN.search(text)
+        if match:
+            return match.group(1).upper()
+        return None
+
+    def format_reward(self, text: str) -> float:
+        return 1.0 if self.parse(text) is not None else 0.0
+
+    def stream(self) -> "KeywordActionStream":
+        """Returns a fresh incremental parser for streamed model output."""
+        return KeywordActionStream()
+
+
+# --- Incremental (Streaming) Parsers ---
+
+class XMLActionStream:
+    """
+    Incremental counterpart of XMLParser.parse for streamed output.
+    Each character is scanned once; tags split across chunks are handled.
+
+    Usage:
+        stream = parser.stream()
+        for chunk in chunks:
+            if stream.feed(chunk):
+                break  # Outcome is final (a second action tag was seen)
+        action = stream.close()
+    """
+    def __init__(self, tag_name: str = "action"):
+        self.open_re = re.compile(re.escape(f"<{tag_name}>"), re.IGNORECASE)
+        self.close_re = re.compile(re.escape(f"</{tag_name}>"), re.IGNORECASE)
+        self.open_len = len(tag_name) + 2
+        self.close_len = len(tag_name) + 3
+
+        self.buffer = ""
+        self.search_pos = 0          # Where to look for the next opening tag
+        self.content_start = None    # Set while inside an open tag
+        self.first_match = None
+        self.match_count = 0
+
+    @property
+    def done(self) -> bool:
+        """True once more input cannot change the result (two tags -> rejected)."""
+        return self.match_count >= 2
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Consumes a chunk of model output.
+
+        Returns:
+            bool: True if the result is already final.
+        """
+        if self.done:
+            return True
+        self.buffer += chunk
+
+        while not self.done:
+            if self.content_start is None:
+                m = self.open_re.search(self.buffer, self.search_pos)
+                if m is None:
+                    # Keep a tail that may hold the start of a split opening tag
+                    self.search_pos = max(self.search_pos, len(self.buffer) - self.open_len + 1)
+                    break
+                self.content_start = m.end()
+                self.search_pos = m.end()
+
+            m = self.close_re.search(self.buffer, self.search_pos)
+            if m is None:
+                self.search_pos = max(self.search_pos, len(self.buffer) - self.close_len + 1)
+                break
+
+            self.match_count += 1
+            if self.match_count == 1:
+                self.first_match = self.buffer[self.content_start:m.start()]
+            self.content_start = None
+            self.search_pos = m.end()
+
+        return self.done
+
+    def close(self) -> Optional[str]:
+        """Ends the stream and returns the same result XMLParser.parse would."""
+        if self.match_count == 1:
+            return self.first_match.strip()
+        return None
+
+
+class KeywordActionStream:
+    """
+    Incremental counterpart of RobustParser.parse for streamed output.
+    The first keyword is final as soon as the character after it arrives
+    (needed for the word boundary, e.g. "UP" vs "UPPER").
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.search_pos = 0
+        self.action = None
+
+    @property
+    def done(self) -> bool:
+        return self.action is not None
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Consumes a chunk of model output.
+
+        Returns:
+            bool: True if the action is already decided.
+        """
+        if self.done:
+            return True
+        self.buffer += chunk
+
+        m = ACTION_KEYWORD_PATTERN.search(self.buffer, self.search_pos)
+        if m is None:
+            # A keyword may be split across chunks: rescan only the short tail
+            self.search_pos = max(self.search_pos, len(self.buffer) - _KEYWORD_MAX_LEN)
+        elif m.end() < len(self.buffer):
+            self.action = m.group(1).upper()
+        else:
+            # Match touches the end of the buffer: wait for the boundary character
+            self.search_pos = m.start()
+        return self.done
+
+    def close(self) -> Optional[str]:
+        """Ends the stream and returns the same result RobustParser.parse would."""
+        if self.action is None:
+            m = ACTION_KEYWORD_PATTERN.search(self.buffer, self.search_pos)
+            if m:
+                self.action = m.group(1).upper()
+        return self.action
@@ -0,0 +1,349 @@
+"""
+Curriculum of FrozenLake maps, ordered by difficulty and adapted to the agent.
+
+    scheduler = CurriculumScheduler(sizes=(4, 5, 6), max_steps=20, seed=0)   # generated maps
+    scheduler = CurriculumScheduler(pool=[map_a, map_b, ...])                # fixed pool
+    env = scheduler.next_environment()   # load_environment_updated(spec.grid_map, spec.transitions)
+    ...
+    scheduler.record(outcome == "goal")  # promotes / demotes the level
+    scheduler.close()
+
+Every map is analyzed once into a MapSpec: next-state transition table, shortest
+safe path, hole density and the solve rate of a noisy oracle (follows a shortest
+path but takes a random action with probability `oracle_noise`), combined into a
+difficulty in [0, 1]. Generation and analysis are vectorized over a batch of
+same-size maps.
+
+A background thread keeps a few analyzed maps ready for the current level and its
+neighbours, so building the next environment never waits on map generation
+(next_map only blocks if the agent outruns the thread; counted in `stalls`).
+"""
+import os
+import sys
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from wrapper.frozenlake_updated import load_environment_updated
+
+# (row, col) deltas in FrozenLakeWorld.TRANSITION_ACTIONS order: LEFT, DOWN, RIGHT, UP
+_DELTAS = np.array([(0, -1), (1, 0), (0, 1), (-1, 0)])
+
+# Difficulty = weighted oracle failure rate, hole density and path length (each scaled to [0, 1])
+DIFFICULTY_WEIGHTS = {"oracle_failure": 0.5, "hole_density": 0.25, "path_length": 0.25}
+HOLE_DENSITY_SCALE = 0.5
+PATH_LENGTH_SCALE = 20
+
+_TABLES: Dict[tuple, np.ndarray] = {}
+
+
+def transition_table(rows: int, cols: int) -> np.ndarray:
+    """
+    Next-state table shared by every (non-slippery) map of this size.
+
+    Returns:
+        (rows * cols, 4) int64 array; moves into a wall map back onto the same state
+    """
+    table = _TABLES.get((rows, cols))
+    if table is None:
+        r, c = np.divmod(np.arange(rows * cols), cols)
+        next_r = np.clip(r[:, None] + _DELTAS[:, 0], 0, rows - 1)
+        next_c = np.clip(c[:, None] + _DELTAS[:, 1], 0, cols - 1)
+        table = _TABLES[(rows, cols)] = next_r * cols + next_c
+        table.setflags(write=False)
+    return table
+
+
+class MapSpec:
+    """An analyzed map: layout, transition table and difficulty measures."""
+    __slots__ = ("grid_map", "transitions", "path_length", "hole_density", "oracle_solve_rate", "difficulty")
+
+    def __init__(self, grid_map, transitions, path_length, hole_density, oracle_solve_rate, difficulty):
+        self.grid_map = grid_map
+        self.transitions = transitions
+        self.path_length = path_length
+        self.hole_density = hole_density
+        self.oracle_solve_rate = oracle_solve_rate
+        self.difficulty = difficulty
+
+    def __repr__(self):
+        return (f"MapSpec({len(self.grid_map)}x{len(self.grid_map[0])}, path={self.path_length}, "
+                f"holes={self.hole_density:.2f}, oracle={self.oracle_solve_rate:.2f}, "
+                f"difficulty={self.difficulty:.2f})")
+
+
+def difficulty_score(path_length, hole_density, oracle_solve_rate):
+    """Combined difficulty in [0, 1] (works on scalars or arrays)."""
+    w = DIFFICULTY_WEIGHTS
+    return (w["oracle_failure"] * (1.0 - oracle_solve_rate)
+            + w["hole_density"] * np.minimum(hole_density / HOLE_DENSITY_SCALE, 1.0)
+            + w["path_length"] * np.minimum(path_length / PATH_LENGTH_SCALE, 1.0))
+
+
+def _goal_distances(table, holes, goals):
+    """Shortest safe distance to the goal for every state of every map, (B, S); inf if unreachable."""
+    dist = np.where(goals, 0.0, np.inf)
+    fixed = holes | goals
+    for _ in range(table.shape[0]):
+        via = dist[:, table].min(axis=2) + 1
+        updated = np.where(fixed, dist, np.minimum(dist, via))
+        if np.array_equal(updated, dist):
+            break
+        dist = updated
+    return dist
+
+
+def _oracle_solve_rates(table, policy, holes, goals, starts, noise, rollouts, max_steps, rng):
+    """Fraction of noisy-oracle rollouts reaching the goal within max_steps, per map."""
+    maps = np.arange(len(starts))[:, None]
+    pos = np.repeat(starts[:, None], rollouts, axis=1)
+    alive = np.ones(pos.shape, dtype=bool)
+    solved = np.zeros(pos.shape, dtype=bool)
+    for _ in range(max_steps):
+        explore = rng.random(pos.shape) < noise
+        actions = np.where(explore, rng.integers(0, 4, size=pos.shape), policy[maps, pos])
+        pos = np.where(alive, table[pos, actions], pos)
+        solved |= alive & goals[maps, pos]
+        alive &= ~(holes[maps, pos] | goals[maps, pos])
+        if not alive.any():
+            break
+    return solved.mean(axis=1)
+
+
+def analyze_maps(grid_maps: Sequence[Sequence[str]], oracle_noise: float = 0.3, rollouts: int = 200,
+                 max_steps: Optional[int] = None, rng=None) -> List[Optional[MapSpec]]:
+    """
+    Analyzes a batch of maps (vectorized per map size).
+
+    Args:
+        grid_maps: Maps as lists of strings ('S', 'F', 'H', 'G')
+        oracle_noise: Probability that the oracle takes a random action
+        rollouts: Oracle rollouts per map
+        max_steps: Oracle step limit (default: 2 * (rows + cols))
+        rng: numpy Generator
+
+    Returns:
+        One MapSpec per map, or None where the goal cannot be reached
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    specs: List[Optional[MapSpec]] = [None] * len(grid_maps)
+    by_size: Dict[tuple, List[int]] = {}
+    for i, grid_map in enumerate(grid_maps):
+        by_size.setdefault((len(grid_map), len(grid_map[0])), []).append(i)
+
+    for (rows, cols), indices in by_size.items():
+        table = transition_table(rows, cols)
+        tiles = np.array([[list(row) for row in grid_maps[i]] for i in indices]).reshape(len(indices), -1)
+        holes, goals = tiles == "H", tiles == "G"
+        starts = (tiles == "S").argmax(axis=1)
+
+        dist = _goal_distances(table, holes, goals)
+        path_lengths = dist[np.arange(len(indices)), starts]
+        policy = dist[:, table].argmin(axis=2)
+        solve_rates = _oracle_solve_rates(table, policy, holes, goals, starts, oracle_noise, rollouts,
+                                          max_steps or 2 * (rows + cols), rng)
+        hole_density = holes.mean(axis=1)
+        difficulty = difficulty_score(path_lengths, hole_density, solve_rates)
+
+        for j, i in enumerate(indices):
+            if np.isfinite(path_lengths[j]):
+                specs[i] = MapSpec(list(grid_maps[i]), table, int(path_lengths[j]), float(hole_density[j]),
+                                   float(solve_rates[j]), float(difficulty[j]))
+    return specs
+
+
+def generate_maps(count: int, size: int = 4, hole_prob: float = 0.2, rng=None) -> List[List[str]]:
+    """Random size x size maps, Start top-left and Goal bottom-right (may be unsolvable)."""
+    rng = rng if rng is not None else np.random.default_rng()
+    tiles = np.where(rng.random((count, size, size)) < hole_prob, "H", "F")
+    tiles[:, 0, 0] = "S"
+    tiles[:, -1, -1] = "G"
+    return [["".join(row) for row in grid] for grid in tiles.tolist()]
+
+
+def goal_at_corner(grid_map) -> bool:
+    """True if the map's only Goal is bottom-right (where the training loop and feedback expect it)."""
+    return "".join(grid_map).count("G") == 1 and grid_map[-1][-1] == "G"
+
+
+class CurriculumScheduler:
+    """
+    Serves maps level by level, easiest first, and moves between levels
+    from the agent's recent success rate.
+    """
+
+    def __init__(self, pool: Optional[Sequence[Sequence[str]]] = None, sizes: Sequence[int] = (4,),
+                 levels: int = 5, hole_probs=(0.05, 0.3), window: int = 10, promote_at: float = 0.7,
+                 demote_at: float = 0.2, prefetch: int = 4, batch_size: int = 32, oracle_noise: float = 0.3,
+                 rollouts: int = 200, max_steps: Optional[int] = None, seed: Optional[int] = None):
+        """
+        Args:
+            pool: Fixed maps to draw from (split into `levels` buckets by difficulty);
+                  None generates random maps instead
+            sizes: Map sizes for generated maps, spread over the levels (smallest first)
+            levels: Number of difficulty levels
+            hole_probs: (easiest, hardest) hole probability for generated maps
+            window: Episodes in the success-rate window
+            promote_at: Success rate that moves up a level
+            demote_at: Success rate that moves down a level
+            prefetch: Maps kept ready per level (current level and its neighbours)
+            batch_size: Candidate maps generated and analyzed per batch
+            oracle_noise, rollouts: Oracle settings (see analyze_maps)
+            max_steps: Episode step cap of the training loop; the oracle gets the same cap and
+                       maps whose shortest path is longer are skipped (None: no cap)
+            seed: RNG seed
+        """
+        if not 0 <= demote_at < promote_at <= 1:
+            raise ValueError(f"Need 0 <= demote_at < promote_at <= 1, got {demote_at}, {promote_at}.")
+        if pool is None and max_steps is not None and max_steps < 2 * (max(sizes) - 1):
+            raise ValueError(f"max_steps={max_steps} is shorter than the shortest path on a "
+                             f"{max(sizes)}x{max(sizes)} map ({2 * (max(sizes) - 1)}).")
+        self.rng = np.random.default_rng(seed)
+        self.window = window
+        self.promote_at = promote_at
+        self.demote_at = demote_at
+        self.prefetch = prefetch
+        self.batch_size = batch_size
+        self.sizes = tuple(sizes)
+        self.max_steps = max_steps
+        self.analysis = {"oracle_noise": oracle_noise, "rollouts": rollouts, "max_steps": max_steps}
+
+        self.buckets: Optional[List[List[MapSpec]]] = None
+        if pool is not None:
+            misplaced = sum(not goal_at_corner(grid_map) for grid_map in pool)
+            if misplaced:
+                raise ValueError(f"{misplaced} curriculum pool map(s) do not have a single Goal in the "
+                                 f"bottom-right corner.")
+            specs = self._solvable(analyze_maps(pool, rng=self.rng, **self.analysis))
+            if not specs:
+                raise ValueError("No map in the curriculum pool is solvable within max_steps.")
+            if len(specs) < len(pool):
+                print(f"Warning: Dropped {len(pool) - len(specs)} map(s) not solvable within max_steps "
+                      f"from the curriculum pool.")
+            specs.sort(key=lambda spec: spec.difficulty)
+            levels = min(levels, len(specs))
+            self.buckets = [list(bucket) for bucket in np.array_split(np.array(specs, dtype=object), levels)]
+            self._cursors = [0] * levels
+        self.levels = levels
+        self.hole_probs = np.linspace(hole_probs[0], hole_probs[1], levels)
+
+        self.level = 0
+        self._recent = deque(maxlen=window)
+        self._queues = [deque() for _ in range(levels)]
+        self._cond = threading.Condition()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self.maps_served = 0
+        self.stalls = 0
+
+        self._thread = threading.Thread(target=self._run, name="CurriculumPrefetch", daemon=True)
+        self._thread.start()
+
+    def _solvable(self, specs: List[Optional[MapSpec]]) -> List[MapSpec]:
+        """Maps whose goal is reachable within the episode step cap."""
+        return [spec for spec in specs
+                if spec is not None and (self.max_steps is None or spec.path_length <= self.max_steps)]
+
+    # --- Background pre-generation ---
+
+    def _level_to_fill(self) -> Optional[int]:
+        """Current level first, then the next one up, then the one below."""
+        for level in (self.level, self.level + 1, self.level - 1):
+            if 0 <= level < self.levels and len(self._queues[level]) < self.prefetch:
+                return level
+        return None
+
+    def _produce(self, level: int) -> List[MapSpec]:
+        if self.buckets is not None:
+            # Fixed pool: cycle through the level's bucket, easiest first
+            bucket, start = self.buckets[level], self._cursors[level]
+            self._cursors[level] = (start + self.prefetch) % len(bucket)
+            return [bucket[(start + i) % len(bucket)] for i in range(self.prefetch)]
+        size = self.sizes[level * len(self.sizes) // self.levels]
+        # Distinct layouts only (easy levels draw the same near-empty maps often)
+        candidates = list(map(list, dict.fromkeys(
+            tuple(grid) for grid in generate_maps(self.batch_size, size, self.hole_probs[level], self.rng))))
+        specs = self._solvable(analyze_maps(candidates, rng=self.rng, **self.analysis))
+        return sorted(specs, key=lambda spec: spec.difficulty)
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    level = self._level_to_fill()
+                    while level is None and not self._closed:
+                        self._cond.wait()
+                        level = self._level_to_fill()
+                    if self._closed:
+                        return
+                specs = self._produce(level)
+                with self._cond:
+                    self._queues[level].extend(specs)
+                    self._cond.notify_all()
+        except Exception as e:
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+
+    # --- Scheduling ---
+
+    def next_map(self) -> MapSpec:
+        """Next map of the current level (waits only if none is ready yet)."""
+        with self._cond:
+            if not self._queues[self.level]:
+                self.stalls += 1
+            while not self._queues[self.level]:
+                if self._error is not None:
+                    raise RuntimeError(f"Curriculum map generation failed: {self._error}") from self._error
+                if self._closed:
+                    raise RuntimeError("CurriculumScheduler is closed.")
+                self._cond.wait()
+            spec = self._queues[self.level].popleft()
+            self.maps_served += 1
+            self._cond.notify_all()
+            return spec
+
+    def next_environment(self, **kwargs):
+        """load_environment_updated for the next map (with its precomputed transition table)."""
+        spec = self.next_map()
+        return load_environment_updated(spec.grid_map, transitions=spec.transitions, **kwargs)
+
+    @property
+    def success_rate(self) -> float:
+        return sum(self._recent) / len(self._recent) if self._recent else 0.0
+
+    def record(self, success: bool) -> int:
+        """
+        Records an episode result; after `window` episodes at the same level the
+        success rate decides whether to move up, down or stay.
+
+        Returns:
+            The (possibly new) level
+        """
+        with self._cond:
+            self._recent.append(bool(success))
+            if len(self._recent) == self.window:
+                rate = self.success_rate
+                if rate >= self.promote_at and self.level < self.levels - 1:
+                    self.level += 1
+                    self._recent.clear()
+                elif rate <= self.demote_at and self.level > 0:
+                    self.level -= 1
+                    self._recent.clear()
+                self._cond.notify_all()
+            return self.level
+
+    def get_statistics(self) -> Dict:
+        return {"level": self.level, "levels": self.levels, "success_rate": self.success_rate,
+                "maps_served": self.maps_served, "stalls": self.stalls,
+                "ready": [len(queue) for queue in self._queues]}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
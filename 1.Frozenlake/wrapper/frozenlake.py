@@ -1,6 +1,7 @@
-import re
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+from wrapper.action_parser import XMLParser
+
 try:
     from World.frozenlake_world import FrozenLakeWorld
     from verifier import reached_goal, fell_in_hole, step_efficiency
@@ -51,43 +52,7 @@ Example INVALID Output:
 
 
 # --- 2. Parser (Verifiers Mock) ---
-
-class XMLParser:
-    """
-    Parses XML-formatted actions from LLM output.
-    Design strictly follows Prime Intellect verifiers.XMLParser pattern.
-    """
-    def __init__(self, fields: Dict[str, str]):
-        """
-        Args:
-            fields: A dict mapping field names to their expected tag names.
-                    e.g. {"answer": "action"}
-        """
-        self.fields = fields
-        # In this specific case, we care about the 'answer' field which maps to <action>
-        self.tag_name = fields.get("answer", "action")
-
-    def parse(self, text: str) -> Optional[str]:
-        """
-        Extracts the content of the action tag.
-        Returns None if not found, malformed, or if multiple tags exist.
-        """
-        pattern = f"<{self.tag_name}>(.*?)</{self.tag_name}>"
-        # Find ALL matches to enforce single-action constraint
-        matches = re.findall(pattern, text, re.DOTALL | re.IGNORECASE)
-        
-        if len(matches) == 1:
-            return matches[0].strip()
-        elif len(matches) > 1:
-            # Reject if agent output multiple actions (hallucination)
-            return None
-        return None
-
-    def format_reward(self, text: str) -> float:
-        """
-        Returns 1.0 if the format is correct (tag exists), 0.0 otherwise.
-        """
-        return 1.0 if self.parse(text) is not None else 0.0
+# XMLParser lives in wrapper/action_parser.py (shared with VLM).
 
 
 # --- 3. Feedback Function ---
@@ -116,9 +81,13 @@ class Rubric:
     """
     def __init__(self):
         self.verifiers: List[Tuple[Callable, float]] = []
+        # Optional vectorized overrides: verifier_func -> batch_func(EpisodeBatch) -> np.ndarray
+        self.batch_verifiers: Dict[Callable, Callable] = {}
 
-    def add_verifier(self, verifier_func: Callable, weight: float = 1.0):
+    def add_verifier(self, verifier_func: Callable, weight: float = 1.0, batch_func: Optional[Callable] = None):
         self.verifiers.append((verifier_func, weight))
+        if batch_func is not None:
+            self.batch_verifiers[verifier_func] = batch_func
 
     def calculate_score(self, episode_history: List[Any], final_outcome: str, text_history: List[str], parser: XMLParser) -> float:
         """
@@ -146,6 +115,31 @@ class Rubric:
 
         return total_score
 
+    def calculate_scores_batch(self, batch):
+        """
+        Vectorized counterpart of calculate_score for offline evaluation.
+        
+        Args:
+            batch: verifier.batch.EpisodeBatch (columnar positions, outcome codes,
+                   wall-hit flags and lengths for N episodes).
+        
+        Returns:
+            np.ndarray: (N,) weighted scores, equal to calculate_score per episode.
+        """
+        # NumPy is only needed for batch scoring
+        import numpy as np
+        from verifier.batch import BATCH_VERIFIERS
+
+        total_scores = np.zeros(len(batch))
+        for verifier, weight in self.verifiers:
+            batch_func = self.batch_verifiers.get(verifier) or BATCH_VERIFIERS.get(verifier)
+            if batch_func is None:
+                raise ValueError(f"No vectorized implementation for verifier '{verifier.__name__}'. "
+                                 "Pass batch_func to add_verifier().")
+            total_scores += weight * batch_func(batch)
+
+        return total_scores
+
 # --- 5. Environment Loader ---
 
 class FrozenLakeEnvironment:
@@ -6,8 +6,8 @@ import math
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from World.frozenlake_world import FrozenLakeWorld
-from World.frozenlake_world import FrozenLakeWorld
-from wrapper.frozenlake import XMLParser, Rubric, reached_goal, fell_in_hole, step_efficiency
+from wrapper.frozenlake import Rubric, reached_goal, fell_in_hole, step_efficiency
+from wrapper.action_parser import XMLParser, RobustParser
 from verifier.outcome import hit_wall
 from verifier.delta import distance_delta_reward
 
@@ -101,25 +101,20 @@ Based on previous successful survivors, adhere to these successful patterns:
 
 # --- 3. Loader ---
 
-BASE_SYSTEM_PROMPT = """You are an RL agent playing FrozenLake 4x4.
+SYSTEM_PROMPT_TEMPLATE = """You are an RL agent playing FrozenLake {rows}x{cols}.
 Your goal is to reach the Goal (G) from the Start (S) without falling into Holes (H).
 
 THE MAP LAYOUT (Use coordinates):
-- Row 0: S (Start), F, F, F
-- Row 1: F, H (Hole!), F, F
-- Row 2: F, F, F, H (Hole!)
-- Row 3: H (Hole!), F, F, G (Goal)
+{layout}
 
 COORDINATE LOGIC:
-- You start at (0, 0).
-- Goal is at (3, 3).
-- DANGER: Do NOT go to (1, 1). That is a HOLE.
-- DANGER: Do NOT go to (2, 3). That is a HOLE.
-- DANGER: Do NOT go to (3, 0). That is a HOLE.
+- You start at {start}.
+- Goal is at {goal}.
+{dangers}
 
 Output instructions:
 1. First, PLAN your move inside <thought> tags. Analyze your current position and adjacent tiles. Check if they are safe or holes.
-   - CHECK DANGER: (1,1), (2,3), (3,0).
+   - CHECK DANGER: {danger_list}.
 2. Return ONLY the action tag: <action>...</action>.
    - You have only four actions: LEFT, RIGHT, UP, DOWN.
 3. Do NOT hallucinate an <observation> tag.
@@ -140,29 +135,32 @@ I will move RIGHT.
 <action>RIGHT</action>
 """
 
-import re
+TILE_LABELS = {"S": "S (Start)", "H": "H (Hole!)", "G": "G (Goal)"}
+
+def build_system_prompt(grid_map):
+    """System prompt describing `grid_map` (layout, start, goal and every hole)."""
+    def coords(r, c):
+        return f"({r}, {c})"
+    holes = [(r, c) for r, row in enumerate(grid_map) for c, tile in enumerate(row) if tile == "H"]
+    start = next((r, c) for r, row in enumerate(grid_map) for c, tile in enumerate(row) if tile == "S")
+    goal = next((r, c) for r, row in enumerate(grid_map) for c, tile in enumerate(row) if tile == "G")
+    return SYSTEM_PROMPT_TEMPLATE.format(
+        rows=len(grid_map),
+        cols=len(grid_map[0]),
+        layout="\n".join(f"- Row {r}: " + ", ".join(TILE_LABELS.get(tile, tile) for tile in row)
+                         for r, row in enumerate(grid_map)),
+        start=coords(*start),
+        goal=coords(*goal),
+        dangers="\n".join(f"- DANGER: Do NOT go to {coords(*h)}. That is a HOLE." for h in holes),
+        danger_list=", ".join(f"({r},{c})" for r, c in holes),
+    )
 
-class RobustParser:
-    """
-    A loose parser that extracts action keywords from free text.
-    Replaces the strict XML requirement for smaller models.
-    """
-    def __init__(self, fields=None):
-        self.fields = fields
-
-    def parse(self, text: str):
-        # Look for actions (case-insensitive)
-        match = re.search(r"\b(LEFT|RIGHT|UP|DOWN)\b", text, re.IGNORECASE)
-        if match:
-            return match.group(1).upper()
-        return None
-
-    def format_reward(self, text: str) -> float:
-        return 1.0 if self.parse(text) is not None else 0.0
-
-def load_environment_updated(grid_map=None, **kwargs):
-    # Curriculum: Support variable grid_map passed in
-    world = FrozenLakeWorld(grid_map=grid_map) 
+BASE_SYSTEM_PROMPT = build_system_prompt(FrozenLakeWorld().grid_map)
+
+def load_environment_updated(grid_map=None, transitions=None, **kwargs):
+    # Curriculum: Support variable grid_map passed in (see wrapper/curriculum.py)
+    world = FrozenLakeWorld(grid_map=grid_map, transitions=transitions)
+    system_prompt = BASE_SYSTEM_PROMPT if grid_map is None else build_system_prompt(world.grid_map)
     
     # Switch to RobustParser
     parser = RobustParser()
@@ -177,5 +175,5 @@ def load_environment_updated(grid_map=None, **kwargs):
         world=world,
         parser=parser,
         rubric=rubric,
-        system_prompt_template=BASE_SYSTEM_PROMPT
+        system_prompt_template=system_prompt
     )
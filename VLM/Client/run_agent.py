@@ -1,3 +1,5 @@
+import argparse
+import multiprocessing
 import sys
 import os
 import random
@@ -10,6 +12,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from World.frozenlake_world import FrozenLakeWorld
 from World.frozenlake_renderer import FrozenLakeRenderer
 from Wrapper.vlm_wrapper import VLMWrapper
+from Wrapper.image_encoder import ImageEncoder
+from Wrapper.vlm_backend import MockVLMBackend, get_backend, BACKENDS
 from Evaluation.outcome import reached_goal, fell_in_hole
 from Evaluation.efficiency import step_efficiency
 
@@ -20,6 +24,10 @@ try:
 except ImportError:
     # Fallback if path is tricky, or just assume it is there due to sys.path
     from trajectory_memory_updated import TrajectoryMemory
+from trajectory_buffer import TrajectoryBuffer
+from replay_buffer import ReplayBuffer
+from instrumentation import METRICS
+from profiling import add_profile_arguments, run_with_profiling
 
 MEMORY_FILE = os.path.join(os.path.dirname(__file__), '../Memory/memory.json')
 
@@ -41,115 +49,371 @@ def mock_vlm_model(prompt):
     # Return in XML format as expected
     return f"<thought>I see a grid. I will go {action}.</thought>\n<action>{action}</action>"
 
-def run_agent(episodes=5):
-    print("Initializing VLM-Style FrozenLake Agent (Q-Table Memory)...")
-    
-    # 1. Init Components
-    world = FrozenLakeWorld()
-    renderer = FrozenLakeRenderer()
-    wrapper = VLMWrapper(renderer)
-    
-    # Initialize Q-Table Memory
-    memory = TrajectoryMemory(filepath=MEMORY_FILE)
-    
-    print(f"Memory Loaded. Knowledge contains {len(memory.q_table)} states.")
-    
-    for ep in range(episodes):
-        print(f"\n--- Episode {ep+1} ---")
-        wrapper.reset_history() # Reset Proximity History
-        obs_data = world.reset()
-        current_frame = renderer.render(world)
-        
-        trajectory = []
-        step_count = 0
-        max_steps = 10
+class EpisodeSlot:
+    """
+    One world's episode, advanced one model response at a time.
+    Several slots step in lockstep so the VLM backend sees full batches.
+    """
+    def __init__(self, world, renderer, wrapper, memory, max_steps=10, tag="", verbose=True, replay=None):
+        self.world = world
+        self.renderer = renderer
+        self.wrapper = wrapper
+        self.memory = memory
+        self.max_steps = max_steps
+        self.tag = tag  # Prefix for printed lines when several worlds run
+        self.verbose = verbose
+        self.replay = replay  # ReplayBuffer receiving every transition (optional)
+        # Frames are identified by map + agent cell, so each board state is encoded once
+        self.map_key = tuple(world.grid_map)
+        self.done = True
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    def start(self, ep):
+        self.log(f"\n{self.tag}--- Episode {ep+1} ---")
+        self.wrapper.reset_history() # Reset Proximity History
+        self.obs_data = self.world.reset()
+        self.current_frame = self.renderer.render(self.world)
         
-        last_distance = None
-        current_feedback = ""
+        self.trajectory = TrajectoryBuffer(message_fields=("observation_msg", "outcome_state", "feedback"))
+        self.step_count = 0
+        self.current_feedback = ""
 
         # Initial distance
-        start_pos = obs_data["position"]
-        goal_pos = obs_data["goal_pos"]
-        last_distance = wrapper.calculate_manhattan(start_pos, goal_pos)
+        self.start_pos = self.obs_data["position"]
+        self.goal_pos = self.obs_data["goal_pos"]
+        self.last_distance = self.wrapper.calculate_manhattan(self.start_pos, self.goal_pos)
+        self.done = self.obs_data["terminated"] or self.step_count >= self.max_steps
+
+    def build_prompt(self):
+        # 2. Get Q-Values for Current State
+        current_pos = self.obs_data["position"]
+        q_values = self.memory.get_q_values(current_pos)
         
-        while not obs_data["terminated"] and step_count < max_steps:
-            # 2. Get Q-Values for Current State
-            current_pos = obs_data["position"]
-            q_values = memory.get_q_values(current_pos)
-            
-            # 3. Build Prompt (Inject Q-Values)
-            prompt = wrapper.build_prompt(obs_data, q_values, current_frame, current_feedback)
-            
-            # 4. Model Inference
-            response = mock_vlm_model(prompt)
-            
-            # 5. Parse Action
-            action = wrapper.parse_action(response)
-            
-            if not action:
-                print("Invalid action format from model.")
-                break
-                
-            # 6. Step
-            print(f"Step {step_count}: Action {action}")
-            prev_pos = current_pos # Store for update
-            obs_data = world.step(action)
-            current_frame = renderer.render(world)
-            
-            # 6a. Calculate Proximity Feedback
-            new_pos = obs_data["position"]
-            new_distance = wrapper.calculate_manhattan(new_pos, goal_pos)
+        # 3. Build Prompt (Inject Q-Values)
+        return self.wrapper.build_prompt(self.obs_data, q_values, self.current_frame, self.current_feedback,
+                                         frame_key=(self.map_key, current_pos))
+
+    def advance(self, response):
+        """Applies the model response; returns True once the episode is over."""
+        # 5. Parse Action
+        action = self.wrapper.parse_action(response)
+        
+        if not action:
+            self.log(f"{self.tag}Invalid action format from model.")
+            self.done = True
+            return True
             
-            step_score = 0.0
-            if new_distance < last_distance:
-                current_feedback = "EVALUATION: Good move. (+0.1 Score) You moved CLOSER."
-                step_score = 0.1
-            elif new_distance > last_distance:
-                current_feedback = "EVALUATION: Bad move. (-0.1 Score) You moved AWAY."
-                step_score = -0.1
-            else:
-                current_feedback = "EVALUATION: Neutral move. (-0.1 Score) Hit wall or same."
-                step_score = -0.1
-                
-            # ADJUST REWARD Logic for Q-Learning
-            # Standard FrozenLake is Sparse (0,0,0,1).
-            # But we want to reinforce efficiency too.
-            q_reward = step_score 
-            if obs_data["outcome"] == "goal":
-                q_reward = 1.0
-            elif obs_data["outcome"] == "hole":
-                q_reward = -1.0
-                
-            # 7. UPDATE MEMORY (Q-Learning Step)
-            memory.update_step(prev_pos, action, q_reward, new_pos, obs_data["terminated"])
-                
-            last_distance = new_distance
+        # 6. Step
+        self.log(f"{self.tag}Step {self.step_count}: Action {action}")
+        prev_pos = self.obs_data["position"] # Store for update
+        with METRICS.timer("env.step", loop="vlm"):
+            obs_data = self.world.step(action)
+        with METRICS.timer("render", loop="vlm"):
+            self.current_frame = self.renderer.render(self.world)
+        METRICS.count("steps", loop="vlm")
+        self.obs_data = obs_data
+        
+        # 6a. Calculate Proximity Feedback
+        new_pos = obs_data["position"]
+        new_distance = self.wrapper.calculate_manhattan(new_pos, self.goal_pos)
+        
+        step_score = 0.0
+        if new_distance < self.last_distance:
+            self.current_feedback = "EVALUATION: Good move. (+0.1 Score) You moved CLOSER."
+            step_score = 0.1
+        elif new_distance > self.last_distance:
+            self.current_feedback = "EVALUATION: Bad move. (-0.1 Score) You moved AWAY."
+            step_score = -0.1
+        else:
+            self.current_feedback = "EVALUATION: Neutral move. (-0.1 Score) Hit wall or same."
+            step_score = -0.1
             
-            # Record
-            trajectory.append({
-                "observation_msg": obs_data["message"],
-                "action": action,
-                "outcome_state": obs_data["outcome"],
-                "feedback": current_feedback,
-                "step_score": step_score
-            })
+        # ADJUST REWARD Logic for Q-Learning
+        # Standard FrozenLake is Sparse (0,0,0,1).
+        # But we want to reinforce efficiency too.
+        q_reward = step_score 
+        if obs_data["outcome"] == "goal":
+            q_reward = 1.0
+        elif obs_data["outcome"] == "hole":
+            q_reward = -1.0
             
-            step_count += 1
+        # 7. UPDATE MEMORY (Q-Learning Step)
+        self.memory.update_step(prev_pos, action, q_reward, new_pos, obs_data["terminated"])
+        if self.replay is not None:
+            self.replay.add(prev_pos, action, q_reward, new_pos, obs_data["terminated"])
             
-            if obs_data["terminated"]:
-                print(f"Terminated: {obs_data['outcome']}")
+        self.last_distance = new_distance
         
-        # End of Episode
-        final_outcome = obs_data["outcome"]
+        # Record
+        self.trajectory.append(
+            action,
+            position=new_pos,
+            reward=step_score,
+            observation_msg=obs_data["message"],
+            outcome_state=obs_data["outcome"],
+            feedback=self.current_feedback
+        )
+        
+        self.step_count += 1
+        
+        if obs_data["terminated"]:
+            self.log(f"{self.tag}Terminated: {obs_data['outcome']}")
+        
+        self.done = obs_data["terminated"] or self.step_count >= self.max_steps
+        return self.done
+
+    def finish(self):
+        """Scores the finished episode; returns (final_outcome, score)."""
+        final_outcome = self.obs_data["outcome"]
         
         # Simple scoring for display
-        score = sum(t['step_score'] for t in trajectory)
+        score = self.trajectory.total_reward()
         if final_outcome == "goal": score += 1.0
         elif final_outcome == "hole": score -= 1.0
             
-        print(f"Episode Score: {score:.2f}")
+        self.log(f"{self.tag}Episode Score: {score:.2f}")
+        METRICS.count("episodes", loop="vlm")
+        return final_outcome, score
+
+
+def run_agent(episodes=5, export_dir=None, memory_file=MEMORY_FILE, image_format="PNG",
+              image_quality=85, image_scale=1.0, num_worlds=1, backend="mock", max_steps=10,
+              replay_batches=0, replay_batch_size=32, replay_capacity=10000, prioritized_replay=False):
+    """
+    Runs the VLM agent loop.
+    If `export_dir` is set, every episode is also written to a replay dataset there.
+    `memory_file` is the Q-table JSON path.
+    `image_format` / `image_quality` / `image_scale` configure the prompt image encoding.
+    `num_worlds` > 1 steps that many worlds in lockstep (sharing the Q-table) and sends
+    their prompts to the backend as one batch; finished worlds start the next episode.
+    `backend` is a VLMBackend or a name from Wrapper/vlm_backend.py ("mock", "blip").
+    `max_steps` caps each episode.
+    `replay_batches` > 0 keeps transitions in a replay buffer and replays that many
+    minibatches of `replay_batch_size` after every episode (uniform, or prioritized
+    by TD error with `prioritized_replay`).
+    """
+    print("Initializing VLM-Style FrozenLake Agent (Q-Table Memory)...")
+    
+    # 1. Init Components
+    renderer = FrozenLakeRenderer()
+    encoder = ImageEncoder(image_format, image_quality, image_scale)
+    if backend == "mock":
+        # Late-bound so mock_vlm_model can be swapped out
+        backend = MockVLMBackend(lambda prompt: mock_vlm_model(prompt))
+    elif isinstance(backend, str):
+        try:
+            backend = get_backend(backend)
+        except ImportError:
+            print("Error: 'transformers' or 'torch' not found. Please install them:")
+            print("pip install torch transformers")
+            return
+    
+    # Initialize Q-Table Memory
+    memory = TrajectoryMemory(filepath=memory_file)
+    
+    print(f"Memory Loaded. Knowledge contains {len(memory.q_table)} states.")
+    replay = ReplayBuffer(replay_capacity, prioritized=prioritized_replay) if replay_batches > 0 else None
+    
+    exporter = None
+    if export_dir:
+        from replay_dataset import ReplayDatasetWriter
+        exporter = ReplayDatasetWriter(export_dir, message_fields=("observation_msg", "outcome_state", "feedback"))
+    
+    num_worlds = max(1, min(num_worlds, episodes))
+    slots = [EpisodeSlot(FrozenLakeWorld(), renderer, VLMWrapper(renderer, encoder), memory,
+                         max_steps=max_steps, tag=f"[world {i}] " if num_worlds > 1 else "", replay=replay)
+             for i in range(num_worlds)]
+    
+    next_episode = 0
+    active = []
+    for slot in slots[:episodes]:
+        slot.start(next_episode)
+        next_episode += 1
+        active.append(slot)
+    
+    while active:
+        stepping = [slot for slot in active if not slot.done]
+        if stepping:
+            # 4. Model Inference (one batch for all worlds)
+            prompts = [slot.build_prompt() for slot in stepping]
+            with METRICS.timer("agent.generate", agent=backend.name):
+                responses = backend.generate_batch(prompts)
+            for slot, response in zip(stepping, responses):
+                slot.advance(response)
+        
+        # End of Episode: score, export, and refill the slot
+        still_active = []
+        for slot in active:
+            if not slot.done:
+                still_active.append(slot)
+                continue
+            final_outcome, score = slot.finish()
+            if exporter:
+                exporter.add_episode(slot.trajectory, final_outcome, score, start_pos=slot.start_pos)
+            if replay is not None:
+                td_error = replay.replay(memory, replay_batch_size, replay_batches)
+                slot.log(f"{slot.tag}Replayed {replay_batches}x{replay_batch_size} transitions "
+                         f"(buffer {len(replay)}, mean |TD error| {td_error:.3f})")
+            if next_episode < episodes:
+                slot.start(next_episode)
+                next_episode += 1
+                still_active.append(slot)
+        active = still_active
             
+    if exporter:
+        exporter.close()
+        print(f"Replay dataset written to {export_dir} ({exporter.num_steps} steps).")
+    
     print("\nRun Complete.")
+    print(f"Image cache: {encoder.get_statistics()}")
+    if METRICS.enabled:
+        print(METRICS.summary())
+        METRICS.export()
+
+def _run_shard(task):
+    """
+    Worker: runs `task["episodes"]` episodes against an in-memory copy of the Q-table.
+    Returns the shard (for merging) and the episodes (trajectories as bytes).
+    """
+    if task["seed"] is not None:
+        random.seed(task["seed"])
+    renderer = FrozenLakeRenderer()
+    wrapper = VLMWrapper(renderer, ImageEncoder(*task["image"]))
+    if task["backend"] == "mock":
+        backend = MockVLMBackend(lambda prompt: mock_vlm_model(prompt))
+    else:
+        # Pool processes persist across rounds, so the model stays loaded
+        backend = get_backend(task["backend"])
+    memory = TrajectoryMemory.shard(task["q_table"])
+    batches, batch_size, capacity, prioritized = task["replay"]
+    replay = ReplayBuffer(capacity, prioritized=prioritized, seed=task["seed"]) if batches > 0 else None
+    slot = EpisodeSlot(FrozenLakeWorld(), renderer, wrapper, memory,
+                       max_steps=task["max_steps"], verbose=False, replay=replay)
+    
+    finished = []
+    for ep in range(task["episodes"]):
+        slot.start(ep)
+        while not slot.done:
+            slot.advance(backend.generate(slot.build_prompt()))
+        final_outcome, score = slot.finish()
+        if replay is not None:
+            replay.replay(memory, batch_size, batches)
+        finished.append((final_outcome, score, slot.start_pos, slot.trajectory.to_bytes()))
+    return {"q_table": memory.q_table, "visits": memory.visits, "episodes": finished}
+
+
+def run_agent_parallel(episodes=40, workers=4, merge_interval=5, merge_mode="visits", max_steps=10,
+                       export_dir=None, memory_file=MEMORY_FILE, backend="mock", seed=None,
+                       image_format="PNG", image_quality=85, image_scale=1.0,
+                       replay_batches=0, replay_batch_size=32, replay_capacity=10000, prioritized_replay=False):
+    """
+    Runs episodes across a pool of worker processes.
+    Each round, every worker plays up to `merge_interval` episodes on its own copy
+    (shard) of the Q-table with the usual update_step rule; the shards are then
+    merged into the master memory (merge_mode "mean" or "visits") and saved once.
+    With `replay_batches` > 0, each worker also replays its own transitions into
+    its shard after every episode (see run_agent).
+    """
+    print(f"Initializing parallel VLM agent ({workers} workers, merge every {merge_interval} episodes)...")
+    memory = TrajectoryMemory(filepath=memory_file)
+    print(f"Memory Loaded. Knowledge contains {len(memory.q_table)} states.")
+    
+    exporter = None
+    if export_dir:
+        from replay_dataset import ReplayDatasetWriter
+        exporter = ReplayDatasetWriter(export_dir, message_fields=("observation_msg", "outcome_state", "feedback"))
+    
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    done = 0
+    round_index = 0
+    outcomes = {}
+    start = time.perf_counter()
+    try:
+        while done < episodes:
+            tasks = []
+            remaining = episodes - done
+            for i in range(workers):
+                count = min(merge_interval, remaining)
+                if count <= 0:
+                    break
+                remaining -= count
+                tasks.append({
+                    "q_table": memory.q_table, "episodes": count, "max_steps": max_steps,
+                    "backend": backend, "image": (image_format, image_quality, image_scale),
+                    "replay": (replay_batches, replay_batch_size, replay_capacity, prioritized_replay),
+                    "seed": None if seed is None else seed + round_index * workers + i,
+                })
+            
+            shards = pool.map(_run_shard, tasks) if pool else [_run_shard(task) for task in tasks]
+            memory.merge_shards(shards, mode=merge_mode)
+            
+            for shard in shards:
+                for final_outcome, score, start_pos, trajectory_bytes in shard["episodes"]:
+                    outcomes[final_outcome] = outcomes.get(final_outcome, 0) + 1
+                    METRICS.count("episodes", loop="vlm")
+                    if exporter:
+                        trajectory = TrajectoryBuffer.from_bytes(trajectory_bytes)
+                        exporter.add_episode(trajectory, final_outcome, score, start_pos=start_pos)
+                done += len(shard["episodes"])
+            round_index += 1
+            print(f"Round {round_index}: {done}/{episodes} episodes, "
+                  f"{len(memory.q_table)} states, outcomes {outcomes}")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    
+    elapsed = time.perf_counter() - start
+    if exporter:
+        exporter.close()
+        print(f"Replay dataset written to {export_dir} ({exporter.num_steps} steps).")
+    
+    print(f"\nRun Complete. {episodes} episodes in {elapsed:.2f}s ({episodes / elapsed:.1f} episodes/s).")
+    if METRICS.enabled:
+        print(METRICS.summary())
+        METRICS.export()
 
 if __name__ == "__main__":
-    run_agent()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=5)
+    parser.add_argument("--export-dir", type=str, default=None, help="Write episodes to a replay dataset")
+    parser.add_argument("--image-format", type=str, default="PNG", choices=["PNG", "JPEG", "WEBP"],
+                        help="Encoding of the prompt image")
+    parser.add_argument("--image-quality", type=int, default=85, help="JPEG/WEBP quality")
+    parser.add_argument("--image-scale", type=float, default=1.0, help="Downscale factor for the prompt image")
+    parser.add_argument("--backend", type=str, default="mock", choices=list(BACKENDS), help="VLM backend")
+    parser.add_argument("--worlds", type=int, default=1, help="Worlds stepped in lockstep (batch size)")
+    parser.add_argument("--max-steps", type=int, default=10, help="Step limit per episode")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Run episodes in this many worker processes with Q-table shards")
+    parser.add_argument("--merge-interval", type=int, default=5,
+                        help="Episodes each worker plays between shard merges (--workers)")
+    parser.add_argument("--merge-mode", type=str, default="visits", choices=["mean", "visits"],
+                        help="How shards are merged into the master Q-table (--workers)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the workers (--workers)")
+    parser.add_argument("--replay-batches", type=int, default=0,
+                        help="Experience replay minibatches after every episode (0 = off)")
+    parser.add_argument("--replay-batch-size", type=int, default=32)
+    parser.add_argument("--replay-capacity", type=int, default=10000, help="Transitions kept for replay")
+    parser.add_argument("--prioritized-replay", action="store_true", help="Sample replay by TD error")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    replay_args = dict(replay_batches=args.replay_batches, replay_batch_size=args.replay_batch_size,
+                       replay_capacity=args.replay_capacity, prioritized_replay=args.prioritized_replay)
+    if args.workers:
+        run = lambda: run_agent_parallel(episodes=args.episodes, workers=args.workers,
+                                         merge_interval=args.merge_interval, merge_mode=args.merge_mode,
+                                         max_steps=args.max_steps, export_dir=args.export_dir,
+                                         backend=args.backend, seed=args.seed,
+                                         image_format=args.image_format, image_quality=args.image_quality,
+                                         image_scale=args.image_scale, **replay_args)
+    else:
+        run = lambda: run_agent(episodes=args.episodes, export_dir=args.export_dir,
+                                image_format=args.image_format, image_quality=args.image_quality,
+                                image_scale=args.image_scale, num_worlds=args.worlds,
+                                backend=args.backend, max_steps=args.max_steps, **replay_args)
+    run_with_profiling(args, run, name="vlm_run_agent")
@@ -0,0 +1,55 @@
+import os
+import sys
+from functools import partial
+
+import numpy as np
+
+# Adjust path to find sibling directories if needed
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+# Vector env core is shared with VLM2 (1.Frozenlake/agent/updated/gym_vector_env.py)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../1.Frozenlake/agent/updated')))
+
+from World.frozenlake_world import FrozenLakeWorld
+from World.frozenlake_renderer import FrozenLakeRenderer
+from gym_vector_env import ACTION_NAMES, FrozenLakeEnvAdapter, SharedMemoryVectorEnv
+
+
+class FrozenLakeWorldEnv(FrozenLakeEnvAdapter):
+    """
+    gym.Env adapter around FrozenLakeWorld.
+    Observations are the integer state or the rendered RGB frame (obs_type="rgb").
+    """
+    def __init__(self, grid_map=None, obs_type="state", tile_size=100, max_steps=100):
+        self.world = FrozenLakeWorld(grid_map)
+        self.renderer = FrozenLakeRenderer(tile_size)
+        # Frames depend only on the agent cell: render each one once
+        self._frames = {}
+        frame_shape = (self.world.rows * tile_size, self.world.cols * tile_size, 3)
+        super().__init__(self.world.rows, self.world.cols, obs_type, frame_shape, max_steps)
+
+    def _reset_world(self):
+        self.world.reset()
+        return self.world.agent_pos
+
+    def _step_world(self, action):
+        obs = self.world.step(ACTION_NAMES[action])
+        return obs["position"], obs["tile"]
+
+    def _frame(self):
+        frame = self._frames.get(self.world.agent_pos)
+        if frame is None:
+            frame = self._frames[self.world.agent_pos] = np.asarray(self.renderer.render(self.world))
+        return frame
+
+
+def make_vector_env(num_envs, grid_map=None, obs_type="state", tile_size=100, max_steps=100,
+                    context=None, copy=True):
+    """
+    Runs `num_envs` FrozenLakeWorldEnv instances in subprocesses with shared-memory observations.
+
+    Returns:
+        SharedMemoryVectorEnv (gymnasium.vector API)
+    """
+    env_fn = partial(FrozenLakeWorldEnv, grid_map=grid_map, obs_type=obs_type,
+                     tile_size=tile_size, max_steps=max_steps)
+    return SharedMemoryVectorEnv([env_fn] * num_envs, context=context, copy=copy)
@@ -0,0 +1,93 @@
+import base64
+import hashlib
+import io
+from collections import OrderedDict
+
+from PIL import Image
+
+IMAGE_FORMATS = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+class ImageEncoder:
+    """
+    Encodes frames into base64 image payloads for VLM APIs, with an LRU cache.
+    Board states recur constantly, so each distinct frame is encoded once.
+    Frames are identified by a caller-supplied key (e.g. map + agent cell) or,
+    without one, by a hash of their pixels.
+    """
+    def __init__(self, image_format="PNG", quality=85, scale=1.0, max_entries=256):
+        """
+        Args:
+            image_format: "PNG", "JPEG" or "WEBP"
+            quality: JPEG/WEBP quality (1-95); ignored for PNG
+            scale: Downscale factor applied before encoding (e.g. 0.5 halves each side)
+            max_entries: Encoded frames kept in the cache
+        """
+        image_format = image_format.upper()
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format '{image_format}'. Choose from {list(IMAGE_FORMATS)}.")
+        if not 0 < scale <= 1:
+            raise ValueError(f"Image scale must be in (0, 1], got {scale}.")
+        self.image_format = image_format
+        self.media_type = IMAGE_FORMATS[image_format]
+        self.quality = quality
+        self.scale = scale
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_key(image):
+        """Key from the pixels themselves, for frames without a known identity."""
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16).hexdigest()
+        return (image.mode, image.size, digest)
+
+    def _encode(self, image):
+        if self.scale != 1.0:
+            size = (max(1, round(image.width * self.scale)), max(1, round(image.height * self.scale)))
+            image = image.resize(size, Image.BILINEAR)
+        if self.image_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        if self.image_format == "PNG":
+            image.save(buffer, format="PNG", optimize=False)
+        else:
+            image.save(buffer, format=self.image_format, quality=self.quality)
+        data = buffer.getvalue()
+        return {
+            "media_type": self.media_type,
+            "data": base64.b64encode(data).decode("ascii"),
+            "size": image.size,
+            "nbytes": len(data),
+        }
+
+    def encode(self, image, key=None):
+        """
+        Returns the encoded payload for `image` (shared; treat as read-only).
+
+        Args:
+            image: PIL image
+            key: Frame identity; frames with equal keys must look the same
+        """
+        if key is None:
+            key = self.content_key(image)
+        payload = self._cache.get(key)
+        if payload is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return payload
+
+        self.misses += 1
+        payload = self._encode(image)
+        self._cache[key] = payload
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return payload
+
+    def get_statistics(self):
+        return {"cached_images": len(self._cache), "hits": self.hits, "misses": self.misses,
+                "format": self.image_format, "scale": self.scale}
+
+    def clear(self):
+        self._cache.clear()
@@ -0,0 +1,152 @@
+import random
+import re
+
+ACTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
+_DIRECTION = re.compile(r"\b(up|down|left|right)\b", re.IGNORECASE)
+
+
+def prompt_image(prompt):
+    """The image part of a build_prompt payload (None if there is none)."""
+    for part in prompt:
+        if part["type"] == "image":
+            return part
+    return None
+
+
+def prompt_text(prompt):
+    """All text parts of a build_prompt payload, joined."""
+    return "".join(part["text"] for part in prompt if part["type"] == "text")
+
+
+def answer_to_action(answer):
+    """Wraps a short VQA answer ("left") in the <action> format the wrapper parses."""
+    match = _DIRECTION.search(answer)
+    if match is None:
+        return answer
+    return f"<action>{match.group(1).upper()}</action>"
+
+
+class VLMBackend:
+    """
+    Interface for the vision-language model behind run_agent.
+    Backends take a batch of VLMWrapper.build_prompt payloads and return one
+    text response per prompt. Load the model in __init__ so it stays warm.
+    """
+    name = "base"
+
+    def generate_batch(self, prompts):
+        raise NotImplementedError
+
+    def generate(self, prompt):
+        return self.generate_batch([prompt])[0]
+
+
+class MockVLMBackend(VLMBackend):
+    """Random valid actions (no model), or any per-prompt function."""
+    name = "mock-vlm"
+
+    def __init__(self, model_fn=None):
+        self.model_fn = model_fn
+
+    def generate_batch(self, prompts):
+        if self.model_fn is not None:
+            return [self.model_fn(prompt) for prompt in prompts]
+        responses = []
+        for _ in prompts:
+            action = random.choice(ACTIONS)
+            responses.append(f"<thought>I see a grid. I will go {action}.</thought>\n<action>{action}</action>")
+        return responses
+
+
+class BlipVQABackend(VLMBackend):
+    """
+    Local BLIP visual question answering on CPU (or any torch device).
+    The model is loaded once and warmed up; every batch is one forward pass.
+    BLIP answers a fixed question per frame, so the question is tokenized once
+    and preprocessed pixels are cached per encoded frame (frames recur).
+    """
+    name = "blip"
+
+    QUESTION = ("Which way should the red circle move to reach the gold tile "
+                "without stepping on a dark tile: up, down, left or right?")
+
+    def __init__(self, model_name="Salesforce/blip-vqa-base", device="cpu", max_new_tokens=5,
+                 num_threads=None, max_cached_frames=256):
+        """
+        Args:
+            model_name: Hugging Face BLIP VQA checkpoint
+            device: torch device
+            max_new_tokens: Answer length limit
+            num_threads: torch CPU threads (default: torch's choice)
+            max_cached_frames: Preprocessed frames kept
+        """
+        import torch
+        from transformers import BlipForQuestionAnswering, BlipProcessor
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.torch = torch
+        self.device = device
+        self.max_new_tokens = max_new_tokens
+        self.max_cached_frames = max_cached_frames
+
+        print(f"Loading {model_name} on {device}...")
+        self.processor = BlipProcessor.from_pretrained(model_name)
+        self.model = BlipForQuestionAnswering.from_pretrained(model_name).to(device).eval()
+
+        question = self.processor.tokenizer(self.QUESTION, return_tensors="pt")
+        self._input_ids = question["input_ids"].to(device)
+        self._attention_mask = question["attention_mask"].to(device)
+        # id(encoded payload) -> (payload, pixel tensor); the payload is kept so its id stays unique
+        self._pixels = {}
+        self._warm_up()
+
+    def _warm_up(self):
+        from PIL import Image
+        self._generate([self.processor.image_processor(Image.new("RGB", (64, 64)),
+                                                       return_tensors="pt")["pixel_values"][0]])
+
+    def _pixel_values(self, image_part):
+        source = image_part.get("source")
+        cached = self._pixels.get(id(source)) if source is not None else None
+        if cached is not None and cached[0] is source:
+            return cached[1]
+        pixels = self.processor.image_processor(image_part["image"].convert("RGB"),
+                                                return_tensors="pt")["pixel_values"][0]
+        if source is not None:
+            if len(self._pixels) >= self.max_cached_frames:
+                self._pixels.clear()
+            self._pixels[id(source)] = (source, pixels)
+        return pixels
+
+    def _generate(self, pixel_list):
+        batch = len(pixel_list)
+        with self.torch.inference_mode():
+            output = self.model.generate(
+                pixel_values=self.torch.stack(pixel_list).to(self.device),
+                input_ids=self._input_ids.expand(batch, -1),
+                attention_mask=self._attention_mask.expand(batch, -1),
+                max_new_tokens=self.max_new_tokens,
+            )
+        return self.processor.batch_decode(output, skip_special_tokens=True)
+
+    def generate_batch(self, prompts):
+        answers = self._generate([self._pixel_values(prompt_image(prompt)) for prompt in prompts])
+        return [answer_to_action(answer) for answer in answers]
+
+
+BACKENDS = {"mock": MockVLMBackend, "blip": BlipVQABackend}
+
+# Loaded backends, reused across runs in the same process
+_LOADED = {}
+
+
+def get_backend(name="mock", **kwargs):
+    """Returns a loaded backend, creating it on first use."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown VLM backend '{name}'. Choose from {list(BACKENDS)}.")
+    key = (name, tuple(sorted(kwargs.items())))
+    backend = _LOADED.get(key)
+    if backend is None:
+        backend = _LOADED[key] = BACKENDS[name](**kwargs)
+    return backend
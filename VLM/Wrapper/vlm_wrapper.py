@@ -5,6 +5,12 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from Wrapper.xml_parser import XMLParser
+from Wrapper.image_encoder import ImageEncoder
+
+OUTPUT_FORMAT_REMINDER = "\nOUTPUT FORMAT:\n<action>UP|DOWN|LEFT|RIGHT</action>"
+
+# Distinct Q-value blocks / feedback texts kept before the slot caches are dropped
+SLOT_CACHE_SIZE = 1024
 
 class VLMWrapper:
     """
@@ -12,8 +18,14 @@ class VLMWrapper:
     Constructs prompts with images and text instructions.
     Manages the parsing of VLM outputs.
     """
-    def __init__(self, renderer):
+    def __init__(self, renderer, encoder=None):
+        """
+        Args:
+            renderer: FrozenLakeRenderer producing the frames
+            encoder: ImageEncoder for the image payloads (default: PNG, full size)
+        """
         self.renderer = renderer
+        self.encoder = encoder if encoder is not None else ImageEncoder()
         self.parser = XMLParser(fields={"answer": "action"})
         self.last_distance = None
         
@@ -31,6 +43,27 @@ Valid actions: UP, DOWN, LEFT, RIGHT.
 Example:
 <action>RIGHT</action>
 """
+        
+        # Per-step slots, memoized by their inputs (few distinct values recur)
+        self._memory_parts = {}
+        self._observation_parts = {}
+        self._last_prompt_key = None
+        self._last_frame = None
+        self._last_frame_key = None
+        self._last_image = None
+        self._last_prompt = None
+
+    @property
+    def system_prompt(self):
+        return self._system_prompt
+
+    @system_prompt.setter
+    def system_prompt(self, text):
+        # Static parts are compiled once; changing the system prompt recompiles them
+        self._system_prompt = text
+        self.static_prefix = ({"type": "text", "text": "SYSTEM:\n" + text},)
+        self._format_reminder = {"type": "text", "text": OUTPUT_FORMAT_REMINDER}
+        self._last_prompt_key = None
 
     def reset_history(self):
         self.last_distance = None
@@ -38,42 +71,73 @@ Example:
     def calculate_manhattan(self, pos1, pos2):
         return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
 
-    def build_prompt(self, observation, q_values, current_frame, current_feedback=""):
-        """
-        Constructs the multimodal prompt with Q-Value Context.
-        """
-        
-        # 1. System Prompt
-        prompt_content = [
-            {"type": "text", "text": "SYSTEM:\n" + self.system_prompt}
-        ]
-        
-        # 2. Add Q-Value Context (Implicit Memory)
-        if q_values:
+    def _memory_part(self, q_key):
+        """Q-value block for a (action, score) tuple, formatted once per distinct value."""
+        part = self._memory_parts.get(q_key)
+        if part is None:
             memory_text = "\nMEMORY (Action History Scores for Current View):\n"
             # Sort helpfulness for display
-            sorted_actions = sorted(q_values.items(), key=lambda x: x[1], reverse=True)
+            sorted_actions = sorted(q_key, key=lambda x: x[1], reverse=True)
             
             for action, score in sorted_actions:
                 annotation = ""
                 if score > 0.5: annotation = " (Recommended)"
                 elif score < -0.5: annotation = " (Avoid)"
                 memory_text += f"- {action}: {score:.2f}{annotation}\n"
-                     
-            prompt_content.append({"type": "text", "text": memory_text})
             
-        # 3. Add Current Observation (Image) + PROXIMITY FEEDBACK
-        proximity_msg = ""
-        if current_feedback:
-            proximity_msg = "\n" + current_feedback
+            if len(self._memory_parts) >= SLOT_CACHE_SIZE:
+                self._memory_parts.clear()
+            part = self._memory_parts[q_key] = {"type": "text", "text": memory_text}
+        return part
+
+    def _observation_part(self, current_feedback):
+        part = self._observation_parts.get(current_feedback)
+        if part is None:
+            proximity_msg = ""
+            if current_feedback:
+                proximity_msg = "\n" + current_feedback
+            if len(self._observation_parts) >= SLOT_CACHE_SIZE:
+                self._observation_parts.clear()
+            part = self._observation_parts[current_feedback] = {
+                "type": "text", "text": "\nOBSERVATION:\n(See attached image)\n" + proximity_msg}
+        return part
 
-        obs_text = "\nOBSERVATION:\n(See attached image)\n" + proximity_msg
-        prompt_content.append({"type": "text", "text": obs_text})
-        prompt_content.append({"type": "image", "image": current_frame})
+    def build_prompt(self, observation, q_values, current_frame, current_feedback="", frame_key=None):
+        """
+        Constructs the multimodal prompt with Q-Value Context.
+        The image part carries the raw frame ("image") and its encoded payload
+        ("source": media_type + base64 data), encoded once per distinct frame.
+        `frame_key` identifies the frame (e.g. map + agent cell); without it
+        the frame is identified by a hash of its pixels.
+        
+        The prompt is a tuple of shared, read-only parts: the static prefix
+        (`self.static_prefix`, the same objects on every call, so a backend can
+        cache its tokenization) followed by the per-step slots. When Q-values,
+        feedback and frame are unchanged, the previous prompt object is returned.
+        """
+        q_key = tuple(q_values.items()) if q_values else ()
+        prompt_key = (q_key, current_feedback, frame_key)
+        if (prompt_key == self._last_prompt_key
+                and (frame_key is not None or current_frame is self._last_frame)):
+            return self._last_prompt
         
-        # 4. Add Action Constraint Reminder
-        prompt_content.append({"type": "text", "text": "\nOUTPUT FORMAT:\n<action>UP|DOWN|LEFT|RIGHT</action>"})
+        # 1. System Prompt, 2. Q-Value Context (Implicit Memory),
+        # 3. Current Observation (Image) + PROXIMITY FEEDBACK, 4. Action Constraint Reminder
+        memory = (self._memory_part(q_key),) if q_key else ()
+        if current_frame is self._last_frame and frame_key == self._last_frame_key:
+            # Same frame object: skip the encoder lookup (and its content hash)
+            image = self._last_image
+        else:
+            image = {"type": "image", "image": current_frame,
+                     "source": self.encoder.encode(current_frame, frame_key)}
+        prompt_content = (self.static_prefix + memory
+                          + (self._observation_part(current_feedback), image, self._format_reminder))
         
+        self._last_prompt_key = prompt_key
+        self._last_frame = current_frame
+        self._last_frame_key = frame_key
+        self._last_image = image
+        self._last_prompt = prompt_content
         return prompt_content
 
     def parse_action(self, model_output):
@@ -4,11 +4,15 @@ Runnable Demo: Video-Based FrozenLake Learning
 This demonstrates the complete system where an agent learns
 ONLY from video frames, without accessing game state.
 """
+import argparse
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from Wrapper.video_environment import VideoBasedEnvironment
+from Wrapper.video_environment import VideoBasedEnvironment, METRICS
+# Importable once Wrapper.video_environment has set up the shared path
+from profiling import add_profile_arguments, run_with_profiling
+from eval_cache import EvaluationCache, callable_key
 import random
 from PIL import Image
 
@@ -80,12 +84,20 @@ def simple_heuristic_agent(frame: Image.Image, observation: dict, memories: list
     return random.choice([ACTIONS['LEFT'], ACTIONS['DOWN'], ACTIONS['RIGHT'], ACTIONS['UP']])
 
 
-def run_demo(num_episodes=10):
+def run_demo(num_episodes=10, export_dir=None, recording="always", seed=None, eval_cache=None, use_cache=True):
     """
     Run the video-based learning demo.
     
     Args:
         num_episodes: Number of episodes to run
+        export_dir: If set, write every episode to a replay dataset there
+        recording: Which episodes to save as video (see Wrapper/recording_policy.py)
+        seed: Seed episode i with seed + i. Seeded episodes are deterministic, so an
+              episode identical to one run before (same map, agent code, memory and
+              seed) is served from the evaluation cache instead of being re-simulated,
+              re-rendered and re-encoded (cached episodes have no video)
+        eval_cache: JSON file for the evaluation cache (None: this run only)
+        use_cache: False always re-runs every episode
     """
     print("=" * 60)
     print("VIDEO-BASED FROZENLAKE LEARNING DEMO")
@@ -104,7 +116,18 @@ def run_demo(num_episodes=10):
     print()
     
     # Create environment
-    env = VideoBasedEnvironment()
+    env = VideoBasedEnvironment(recording=recording)
+    
+    exporter = None
+    if export_dir:
+        # Importable once Wrapper.video_environment has set up the shared path
+        from replay_dataset import ReplayDatasetWriter
+        exporter = ReplayDatasetWriter(export_dir, message_fields=('observation', 'outcome', 'progress'))
+    
+    # The heuristic agent draws random moves, so only seeded episodes are cacheable;
+    # the dataset needs full trajectories, so exporting disables the cache
+    cache = EvaluationCache(eval_cache) if use_cache and seed is not None and exporter is None else None
+    agent_id = callable_key(simple_heuristic_agent)
     
     # Run episodes
     successes = 0
@@ -112,15 +135,36 @@ def run_demo(num_episodes=10):
     for episode in range(num_episodes):
         print(f"Episode {episode + 1}/{num_episodes}...")
         
-        result = env.run_episode_with_agent(simple_heuristic_agent, max_steps=50)
+        cache_key = None
+        if seed is not None:
+            random.seed(seed + episode)
+        if cache is not None:
+            cache_key = cache.key(env.map_desc, f"{agent_id}:{env.memory.fingerprint()}", seed + episode,
+                                  max_steps=50, env_max_steps=env.max_steps, cell_size=env.cell_size,
+                                  recording=repr(env.recording))
+        cached = cache.get(cache_key) if cache is not None else None
+        
+        if cached:
+            result = env.replay_cached_episode(cached)
+            print("  (cached)")
+        else:
+            result = env.run_episode_with_agent(simple_heuristic_agent, max_steps=50)
+            if cache_key:
+                # Videos are overwritten by later runs, so only the outcome and memory update are kept
+                cache.put(cache_key, {field: result[field] for field in
+                                      ('final_outcome', 'steps', 'start_position', 'last_situation', 'last_action')})
         
         print(f"  Outcome: {result['final_outcome']}")
         print(f"  Steps: {result['steps']}")
-        print(f"  Video: {result['video_path']}")
+        print(f"  Video: {result['video_path'] or 'not recorded'}")
         
         if result['final_outcome'] == 'success':
             successes += 1
         
+        if exporter:
+            exporter.add_episode(result['episode_data'], result['final_outcome'],
+                                 start_pos=result['start_position'] or (0, 0))
+        
         # Show memory stats
         stats = env.memory.get_statistics()
         print(f"  Memory: {stats['total_experiences']} experiences "
@@ -140,6 +184,14 @@ def run_demo(num_episodes=10):
     for key, value in stats.items():
         print(f"  {key}: {value}")
     
+    if exporter:
+        exporter.close()
+        print(f"\nReplay dataset written to: {export_dir} ({exporter.num_steps} steps)")
+    
+    if cache is not None:
+        cache.save()
+        print(f"\nEvaluation cache: {cache.get_statistics()}")
+    
     # Save memory
     memory_path = "trajectory_memory.json"
     env.memory.save_to_file(memory_path)
@@ -156,10 +208,28 @@ def run_demo(num_episodes=10):
         print(f"   Lesson: {exp['lesson']}")
         print()
     
+    if METRICS.enabled:
+        print(METRICS.summary())
+        METRICS.export()
+    
     print("=" * 60)
-    print("Demo complete! Videos saved to 'videos/' directory.")
+    print(f"Demo complete! Videos ({env.recording.mode}) saved to 'videos/' directory.")
     print("=" * 60)
 
 
 if __name__ == "__main__":
-    run_demo(num_episodes=10)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--export-dir", type=str, default=None, help="Write episodes to a replay dataset")
+    parser.add_argument("--record", type=str, default="always",
+                        help="Episodes saved as video: always, never, every:N, first:K, success, failure")
+    parser.add_argument("--seed", type=int, default=None, help="Seed episode i with seed + i (enables the evaluation cache)")
+    parser.add_argument("--eval-cache", type=str, default=None, help="JSON file caching seeded episode results across runs")
+    parser.add_argument("--no-eval-cache", action="store_true", help="Always re-run every episode")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    run_with_profiling(args, lambda: run_demo(num_episodes=args.episodes, export_dir=args.export_dir,
+                                              recording=args.record, seed=args.seed,
+                                              eval_cache=args.eval_cache, use_cache=not args.no_eval_cache),
+                       name="vlm2_demo")
@@ -4,11 +4,28 @@ Purpose: Store only useful experiences derived from video observations.
 NO ACCESS TO: game state or symbolic rewards.
 ONLY DOES: store and retrieve video-based experiences.
 """
+import hashlib
 import json
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from collections import deque
 
 
+def episode_lesson(episode_data) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Final outcome, last situation and last action of an episode.
+    
+    Args:
+        episode_data: The episode's TrajectoryBuffer (fields 'observation', 'outcome')
+    
+    Returns:
+        (final_outcome, situation, action); 'unknown', None, None for an empty episode
+    """
+    if not len(episode_data):
+        return 'unknown', None, None
+    return (episode_data.message('outcome', -1), episode_data.message('observation', -1),
+            f"Action {episode_data.actions[-1]}")
+
+
 class TrajectoryMemory:
     """Stores video-based learning experiences."""
     
@@ -73,6 +90,26 @@ class TrajectoryMemory:
             if len(self.trajectories) > self.max_size:
                 self._prune_memory()
     
+    def add_episode_lesson(self, final_outcome: str, situation: Optional[str], action: Optional[str]):
+        """
+        Stores a finished episode's lesson (see episode_lesson): every success,
+        failures only if new.
+        """
+        if final_outcome == 'success':
+            self.add_experience(
+                situation=situation,
+                action=action,
+                outcome='success',
+                lesson="Successfully reached the goal"
+            )
+        elif final_outcome == 'failure' and situation is not None:
+            self.add_experience(
+                situation=situation,
+                action=action,
+                outcome='failure',
+                lesson="Avoid this action in this situation"
+            )
+    
     def _calculate_informativeness(self, experience: Dict) -> float:
         """
         Score how informative an experience is.
@@ -141,6 +178,11 @@ class TrajectoryMemory:
         """Return all successful trajectories."""
         return [exp for exp in self.trajectories if exp["outcome"] == "success"]
     
+    def fingerprint(self) -> str:
+        """Hash of the retrievable experiences (what an agent can see of this memory)."""
+        data = json.dumps(self.trajectories, sort_keys=True)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+    
     def get_statistics(self) -> Dict:
         """Return memory statistics."""
         return {
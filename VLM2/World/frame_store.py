@@ -0,0 +1,62 @@
+"""
+Frame Store
+Purpose: Render each unique frame once and share it across steps and episodes.
+A frame is fully determined by (map, agent cell, cell size), so on a 4x4 map
+there are at most 16 distinct frames. Trajectories hold small integer handles.
+Each renderer (or vector environment) owns its store, so a store is bounded by
+the cells of its maps and is freed with its environment.
+"""
+import hashlib
+from typing import Callable, Dict, List, Tuple
+
+from PIL import Image
+
+
+def map_hash(map_desc) -> str:
+    """Stable short hash of a map layout."""
+    return hashlib.sha1("\n".join(map_desc).encode("utf-8")).hexdigest()[:16]
+
+
+class FrameStore:
+    """
+    Content-addressed frame cache: key -> handle -> PIL Image.
+    Stored frames are shared; treat them as read-only (copy before drawing on them).
+    """
+
+    def __init__(self):
+        self._handles: Dict[Tuple, int] = {}
+        self._frames: List[Image.Image] = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __getitem__(self, handle: int) -> Image.Image:
+        return self._frames[handle]
+
+    def get_handle(self, key: Tuple, render_fn: Callable[[], Image.Image]) -> int:
+        """
+        Returns the handle for `key`, rendering the frame only on first use.
+
+        Args:
+            key: (map hash, agent row, agent col, cell size)
+            render_fn: Called once to produce the frame if the key is new
+        """
+        handle = self._handles.get(key)
+        if handle is None:
+            self.misses += 1
+            handle = len(self._frames)
+            self._frames.append(render_fn())
+            self._handles[key] = handle
+        else:
+            self.hits += 1
+        return handle
+
+    def get_statistics(self) -> Dict:
+        return {"unique_frames": len(self._frames), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        """Drops all frames. Invalidates every handle handed out so far."""
+        self._handles.clear()
+        self._frames.clear()
@@ -22,7 +22,6 @@ class EpisodeVideoBuilder:
         """
         self.fps = fps
         self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
     
     def build_video(self, frames: List[Image.Image], episode_num: int, filename=None):
         """
@@ -43,6 +42,8 @@ class EpisodeVideoBuilder:
         if filename is None:
             filename = f'episode_{episode_num:04d}.mp4'
         
+        # Created on first use, so runs that record nothing leave no directory behind
+        os.makedirs(self.output_dir, exist_ok=True)
         video_path = os.path.join(self.output_dir, filename)
         
         # Get dimensions from first frame
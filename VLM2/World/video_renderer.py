@@ -7,6 +7,9 @@ ONLY DOES: render grid state to image frames.
 import numpy as np
 from PIL import Image, ImageDraw
 import os
+from array import array
+
+from World.frame_store import FrameStore, map_hash
 
 
 class FrozenLakeVideoRenderer:
@@ -21,20 +24,28 @@ class FrozenLakeVideoRenderer:
         'agent': (0, 0, 255)   # Agent = Blue
     }
     
-    def __init__(self, map_desc, cell_size=100):
+    def __init__(self, map_desc, cell_size=100, frame_store=None):
         """
         Args:
             map_desc: List of strings describing the grid layout
             cell_size: Pixel size of each grid cell
+            frame_store: FrameStore for deduplicated frames (default: a new store for this renderer)
         """
         self.map_desc = map_desc
         self.rows = len(map_desc)
         self.cols = len(map_desc[0])
         self.cell_size = cell_size
         
-        # Frame storage for current episode
-        self.episode_frames = []
+        # Each unique frame is rendered once and shared across episodes
+        self.frame_store = frame_store if frame_store is not None else FrameStore()
+        self.map_key = map_hash(map_desc)
+        
+        # Frame storage for current episode (handles into frame_store)
+        self.episode_frames = array('i')
         self.frame_count = 0
+        # False while the episode is not being recorded (frames are not kept)
+        self.capture = True
+        self.last_handle = -1
         
     def render_frame(self, agent_row, agent_col):
         """
@@ -79,6 +90,16 @@ class FrozenLakeVideoRenderer:
         
         return img
     
+    def frame_handle(self, agent_row, agent_col):
+        """
+        Handle of the frame for this agent cell, rendering it only on first use.
+        
+        Returns:
+            int handle into self.frame_store
+        """
+        key = (self.map_key, agent_row, agent_col, self.cell_size)
+        return self.frame_store.get_handle(key, lambda: self.render_frame(agent_row, agent_col))
+    
     def add_frame(self, agent_row, agent_col, save_to_disk=False, output_dir='frames'):
         """
         Create and store a frame for the current timestep.
@@ -90,10 +111,13 @@ class FrozenLakeVideoRenderer:
             output_dir: Directory to save frames
         
         Returns:
-            The rendered frame image
+            The rendered frame image (shared; treat as read-only)
         """
-        frame = self.render_frame(agent_row, agent_col)
-        self.episode_frames.append(frame)
+        handle = self.frame_handle(agent_row, agent_col)
+        frame = self.frame_store[handle]
+        self.last_handle = handle
+        if self.capture:
+            self.episode_frames.append(handle)
         
         if save_to_disk:
             os.makedirs(output_dir, exist_ok=True)
@@ -105,12 +129,23 @@ class FrozenLakeVideoRenderer:
     
     def get_frames(self):
         """Return all frames from current episode."""
+        return [self.frame_store[h] for h in self.episode_frames]
+    
+    def get_frame_handles(self):
+        """Return the frame handles of the current episode."""
         return self.episode_frames
     
-    def reset(self):
-        """Clear frames for new episode."""
-        self.episode_frames = []
+    def reset(self, capture=True):
+        """
+        Clear frames for new episode.
+        
+        Args:
+            capture: Keep this episode's frames (False when it will not be recorded)
+        """
+        self.episode_frames = array('i')
         self.frame_count = 0
+        self.capture = capture
+        self.last_handle = -1
 
 
 # Default 4x4 FrozenLake map
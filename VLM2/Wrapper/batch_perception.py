@@ -0,0 +1,185 @@
+"""
+Batch Perception
+Purpose: Perception and outcome inference for N frames at once.
+Same rules and outputs as VideoPerceptionLayer.perceive and
+OutcomeInferenceModule.infer_outcome, computed on an (N, H, W, 3) uint8 array.
+NO ACCESS TO: game grid, coordinates, tile types, or environment internals.
+ONLY DOES: pixel heuristics on the frame batch.
+"""
+import numpy as np
+from typing import Dict, List, Tuple
+
+# Neighbour offsets checked for danger (8-neighbourhood)
+_NEIGHBOURS = np.array([(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if (dr, dc) != (0, 0)])
+
+NOT_FOUND = -1
+
+
+def color_mask(frames: np.ndarray, color: Tuple[int, int, int], tolerance: int = 30) -> np.ndarray:
+    """
+    Pixels within `tolerance` of `color` on every channel.
+    Works on uint8 directly (range compare instead of abs-diff, no int upcast).
+
+    Returns:
+        bool array of frames.shape[:-1]
+    """
+    mask = None
+    for channel, value in enumerate(color):
+        lo, hi = max(0, value - tolerance), min(255, value + tolerance)
+        plane = frames[..., channel]
+        if lo == 0:
+            match = plane <= hi
+        elif hi == 255:
+            match = plane >= lo
+        else:
+            match = (plane >= lo) & (plane <= hi)
+        mask = match if mask is None else (mask & match)
+    return mask
+
+
+def _direction(from_pos, to_pos) -> str:
+    """Relative direction, as VideoPerceptionLayer._calculate_direction."""
+    row_diff = to_pos[0] - from_pos[0]
+    col_diff = to_pos[1] - from_pos[1]
+    if row_diff == 0 and col_diff == 0:
+        return "same"
+    vertical = "down" if row_diff > 0 else ("up" if row_diff < 0 else "")
+    horizontal = "right" if col_diff > 0 else ("left" if col_diff < 0 else "")
+    if vertical and horizontal:
+        return f"{vertical}-{horizontal}"
+    return vertical or horizontal
+
+
+class BatchPerception:
+    """
+    Vectorized perception + outcome inference over a batch of frames.
+    Keeps the previous inferred agent cell per slot (for movement and progress),
+    which is what the per-frame modules derive from their stored previous frame.
+    """
+
+    AGENT_COLOR = (0, 0, 255)      # Blue
+    HOLE_COLOR = (255, 0, 0)       # Red
+    GOAL_COLOR = (0, 255, 0)       # Green
+
+    def __init__(self, num_envs: int, cell_size=100, grid_rows=4, grid_cols=4):
+        """
+        Args:
+            num_envs: Batch size
+            cell_size: Expected pixel size of each grid cell
+            grid_rows: Expected number of rows in grid
+            grid_cols: Expected number of columns in grid
+        """
+        self.num_envs = num_envs
+        self.cell_size = cell_size
+        self.grid_rows = grid_rows
+        self.grid_cols = grid_cols
+        self.previous_agent = np.full((num_envs, 2), NOT_FOUND, dtype=np.int64)
+
+    def reset(self, indices=None):
+        """Forget the previous frame of the given slots (all if None)."""
+        if indices is None:
+            self.previous_agent[:] = NOT_FOUND
+        else:
+            self.previous_agent[indices] = NOT_FOUND
+
+    def locate(self, frames: np.ndarray, color) -> np.ndarray:
+        """
+        Grid cell of the centroid of `color` pixels in each frame.
+
+        Returns:
+            (N, 2) int array of (row, col), NOT_FOUND where the color is absent
+        """
+        mask = color_mask(frames, color)
+        n, height, width = mask.shape
+        row_counts = mask.sum(axis=2)                        # (N, H)
+        col_counts = mask.sum(axis=1)                        # (N, W)
+        totals = row_counts.sum(axis=1)                      # (N,)
+        found = totals > 0
+        safe_totals = np.where(found, totals, 1)
+        centroid_y = row_counts @ np.arange(height) / safe_totals
+        centroid_x = col_counts @ np.arange(width) / safe_totals
+
+        cells = np.empty((n, 2), dtype=np.int64)
+        cells[:, 0] = (centroid_y / self.cell_size).astype(np.int64)
+        cells[:, 1] = (centroid_x / self.cell_size).astype(np.int64)
+        cells[~found] = NOT_FOUND
+        return cells
+
+    def _danger_nearby(self, frames: np.ndarray, agent: np.ndarray) -> np.ndarray:
+        """Red at the centre of any in-bounds neighbour cell of the agent."""
+        n = len(frames)
+        cells = agent[:, None, :] + _NEIGHBOURS[None, :, :]             # (N, 8, 2)
+        valid = ((cells[..., 0] >= 0) & (cells[..., 0] < self.grid_rows) &
+                 (cells[..., 1] >= 0) & (cells[..., 1] < self.grid_cols) &
+                 (agent[:, None, 0] != NOT_FOUND))
+        ys = np.clip(cells[..., 0], 0, self.grid_rows - 1) * self.cell_size + self.cell_size // 2
+        xs = np.clip(cells[..., 1], 0, self.grid_cols - 1) * self.cell_size + self.cell_size // 2
+        pixels = frames[np.arange(n)[:, None], ys, xs]                 # (N, 8, 3)
+        return (color_mask(pixels, self.HOLE_COLOR) & valid).any(axis=1)
+
+    def analyze(self, frames: np.ndarray, max_steps_reached=None,
+                indices=None) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Perceive a batch and infer outcomes.
+
+        Args:
+            frames: (N, H, W, 3) uint8 frames, one per slot in `indices`
+            max_steps_reached: (N,) bool, episodes at their step limit
+            indices: Slots the frames belong to (default: all, in order)
+
+        Returns:
+            (observations, outcomes): per-frame dicts with the keys of
+            VideoPerceptionLayer.perceive and OutcomeInferenceModule.infer_outcome
+        """
+        n = len(frames)
+        indices = np.arange(self.num_envs) if indices is None else np.asarray(indices)
+        if max_steps_reached is None:
+            max_steps_reached = np.zeros(n, dtype=bool)
+
+        agent = self.locate(frames, self.AGENT_COLOR)
+        goal = self.locate(frames, self.GOAL_COLOR)
+        previous = self.previous_agent[indices]
+        danger = self._danger_nearby(frames, agent)
+
+        # Background colour of the agent's cell (top-left corner, clear of the agent)
+        visible = agent[:, 0] != NOT_FOUND
+        ys = np.where(visible, agent[:, 0], 0) * self.cell_size + 5
+        xs = np.where(visible, agent[:, 1], 0) * self.cell_size + 5
+        ys = np.clip(ys, 0, frames.shape[1] - 1)
+        xs = np.clip(xs, 0, frames.shape[2] - 1)
+        cell_pixels = frames[np.arange(n), ys, xs]
+        on_hole = color_mask(cell_pixels, self.HOLE_COLOR) & visible
+        on_goal = color_mask(cell_pixels, self.GOAL_COLOR) & visible
+
+        observations, outcomes = [], []
+        for i in range(n):
+            agent_pos = tuple(int(v) for v in agent[i]) if visible[i] else None
+            goal_pos = tuple(int(v) for v in goal[i]) if goal[i, 0] != NOT_FOUND else None
+            prev_pos = tuple(int(v) for v in previous[i]) if previous[i, 0] != NOT_FOUND else None
+
+            observations.append({
+                "agent_visible": agent_pos is not None,
+                "agent_position_inferred": agent_pos,
+                "goal_direction": _direction(agent_pos, goal_pos) if agent_pos and goal_pos else None,
+                "danger_nearby": bool(danger[i]),
+                "movement_detected": bool(agent_pos and prev_pos and prev_pos != agent_pos),
+            })
+
+            outcome = {"terminal": False, "progress": "neutral", "outcome": "ongoing"}
+            if agent_pos is None or on_hole[i]:
+                outcome.update(terminal=True, outcome="failure")
+            elif on_goal[i]:
+                outcome.update(terminal=True, outcome="success")
+            elif max_steps_reached[i]:
+                outcome.update(terminal=True, outcome="timeout")
+            elif goal_pos and prev_pos:
+                prev_distance = abs(prev_pos[0] - goal_pos[0]) + abs(prev_pos[1] - goal_pos[1])
+                curr_distance = abs(agent_pos[0] - goal_pos[0]) + abs(agent_pos[1] - goal_pos[1])
+                if curr_distance < prev_distance:
+                    outcome["progress"] = "positive"
+                elif curr_distance > prev_distance:
+                    outcome["progress"] = "negative"
+            outcomes.append(outcome)
+
+        self.previous_agent[indices] = agent
+        return observations, outcomes
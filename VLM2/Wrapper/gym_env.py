@@ -0,0 +1,67 @@
+"""
+Gymnasium Adapter
+Purpose: Expose FrozenLakeGame through the gym.Env / gymnasium.vector API
+for external training stacks. Unlike VideoBasedEnvironment this adapter is
+not frame-only: obs_type="state" returns the integer cell and the reward comes
+from the game. Use obs_type="rgb" for pixel observations.
+"""
+from World.video_renderer import FrozenLakeVideoRenderer, DEFAULT_MAP
+from World.frozenlake_game import FrozenLakeGame
+
+import os
+import sys
+import numpy as np
+from functools import partial
+
+# Vector env core is shared with VLM (1.Frozenlake/agent/updated/gym_vector_env.py)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../1.Frozenlake/agent/updated')))
+from gym_vector_env import FrozenLakeEnvAdapter, SharedMemoryVectorEnv
+
+
+class FrozenLakeGameEnv(FrozenLakeEnvAdapter):
+    """gym.Env adapter around FrozenLakeGame (action ids match: 0=LEFT, 1=DOWN, 2=RIGHT, 3=UP)."""
+
+    def __init__(self, map_desc=None, obs_type="state", cell_size=100, max_steps=100):
+        """
+        Args:
+            map_desc: Grid map description
+            obs_type: "state" (integer cell) or "rgb" (rendered frame)
+            cell_size: Pixel size of each cell
+            max_steps: Steps before an episode is truncated
+        """
+        if map_desc is None:
+            map_desc = DEFAULT_MAP
+        self.game = FrozenLakeGame(map_desc=map_desc)
+        self.renderer = FrozenLakeVideoRenderer(map_desc, cell_size)
+        self.renderer.capture = False
+        # Frame store handle -> pixel array
+        self._pixels = {}
+        frame_shape = (len(map_desc) * cell_size, len(map_desc[0]) * cell_size, 3)
+        super().__init__(len(map_desc), len(map_desc[0]), obs_type, frame_shape, max_steps)
+
+    def _reset_world(self):
+        return self.game.reset()
+
+    def _step_world(self, action):
+        (row, col), _ = self.game.step(action)
+        return (row, col), self.game.map_desc[row][col]
+
+    def _frame(self):
+        handle = self.renderer.frame_handle(*self.game.agent_pos)
+        pixels = self._pixels.get(handle)
+        if pixels is None:
+            pixels = self._pixels[handle] = np.asarray(self.renderer.frame_store[handle].convert('RGB'))
+        return pixels
+
+
+def make_vector_env(num_envs, map_desc=None, obs_type="state", cell_size=100, max_steps=100,
+                    context=None, copy=True):
+    """
+    Runs `num_envs` FrozenLakeGameEnv instances in subprocesses with shared-memory observations.
+
+    Returns:
+        SharedMemoryVectorEnv (gymnasium.vector API)
+    """
+    env_fn = partial(FrozenLakeGameEnv, map_desc=map_desc, obs_type=obs_type,
+                     cell_size=cell_size, max_steps=max_steps)
+    return SharedMemoryVectorEnv([env_fn] * num_envs, context=context, copy=copy)
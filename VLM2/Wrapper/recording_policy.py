@@ -0,0 +1,72 @@
+"""
+Recording Policy
+Purpose: Decide which episodes are kept as video.
+Episodes that are not recorded skip frame accumulation and MP4 encoding;
+perception still sees every frame.
+
+Specs (as accepted by RecordingPolicy.from_spec and `demo.py --record`):
+    always       every episode (default)
+    never        no episode
+    every:N      episodes 0, N, 2N, ...
+    first:K      the first K episodes
+    success      only episodes whose inferred outcome is 'success'
+    failure      only episodes whose inferred outcome is 'failure'
+"""
+
+RECORDING_MODES = ("always", "never", "every", "first", "success", "failure")
+
+
+class RecordingPolicy:
+    """Per-episode recording decision."""
+
+    def __init__(self, mode: str = "always", n: int = 1):
+        """
+        Args:
+            mode: One of RECORDING_MODES
+            n: Interval for 'every', count for 'first'
+        """
+        if mode not in RECORDING_MODES:
+            raise ValueError(f"Unknown recording mode '{mode}'. Choose from {RECORDING_MODES}.")
+        if mode in ("every", "first") and n < 1:
+            raise ValueError(f"Recording mode '{mode}' needs a positive count, got {n}.")
+        self.mode = mode
+        self.n = n
+
+    @classmethod
+    def from_spec(cls, spec) -> "RecordingPolicy":
+        """Builds a policy from a spec string ('every:10'), or passes a policy through."""
+        if isinstance(spec, RecordingPolicy):
+            return spec
+        if spec is None:
+            return cls()
+        mode, _, count = str(spec).partition(":")
+        if mode in ("every", "first"):
+            if not count.isdigit():
+                raise ValueError(f"Recording spec '{spec}' needs a count, e.g. '{mode}:10'.")
+            return cls(mode, int(count))
+        return cls(mode)
+
+    def captures_frames(self, episode_index: int) -> bool:
+        """
+        Whether frames must be kept while the episode runs.
+        Outcome-based modes keep them since the outcome is only known at the end.
+        """
+        if self.mode == "never":
+            return False
+        if self.mode == "every":
+            return episode_index % self.n == 0
+        if self.mode == "first":
+            return episode_index < self.n
+        return True
+
+    def should_encode(self, episode_index: int, final_outcome: str) -> bool:
+        """Whether the finished episode is written as a video."""
+        if not self.captures_frames(episode_index):
+            return False
+        if self.mode in ("success", "failure"):
+            return final_outcome == self.mode
+        return True
+
+    def __repr__(self):
+        return f"RecordingPolicy('{self.mode}:{self.n}')" if self.mode in ("every", "first") \
+            else f"RecordingPolicy('{self.mode}')"
@@ -0,0 +1,247 @@
+"""
+Vectorized Agent Interaction Loop
+Purpose: Run N video-based FrozenLake games in lockstep for batched training.
+Each step renders all N frames into one (N, H, W, 3) uint8 array and runs
+perception + outcome inference on the whole batch (Wrapper/batch_perception.py).
+Finished games are reset automatically.
+The agent receives ONLY frames and perception output, never the internal game state.
+"""
+from World.video_renderer import FrozenLakeVideoRenderer, DEFAULT_MAP
+from World.frame_store import FrameStore
+from World.frozenlake_game import FrozenLakeGame
+from Wrapper.batch_perception import BatchPerception
+from Wrapper.video_perception import summarize_observation
+from Memory.trajectory_memory import TrajectoryMemory, episode_lesson
+
+import os
+import sys
+import numpy as np
+from typing import Callable, Dict, List
+
+# Compact columnar trajectory storage (shared with 1.Frozenlake and VLM)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../1.Frozenlake/agent/updated')))
+from trajectory_buffer import TrajectoryBuffer
+from instrumentation import METRICS
+
+
+def per_env_agent(agent_fn: Callable) -> Callable:
+    """
+    Adapts a single-environment agent (frame, observation, memories) -> action
+    to the batched interface. Frames are passed as (H, W, 3) uint8 arrays.
+    """
+    def batched(frames: np.ndarray, observations: List[Dict], memories: List[List]) -> List[int]:
+        return [agent_fn(frames[i], observations[i], memories[i]) for i in range(len(observations))]
+    return batched
+
+
+class VectorVideoEnvironment:
+    """
+    N independent games behind one batched, frame-only interface.
+    All maps must have the same size so their frames stack into one array.
+    Episodes are not encoded to video; trajectories keep frame handles instead.
+    """
+
+    def __init__(self, num_envs=8, map_desc=None, cell_size=100, max_steps=50, frame_store=None):
+        """
+        Args:
+            num_envs: Number of games stepped together
+            map_desc: Grid map shared by all games, or a list of num_envs maps
+            cell_size: Pixel size of each cell
+            max_steps: Maximum steps per episode
+            frame_store: FrameStore for rendered frames (default: a new store shared by the games)
+        """
+        if map_desc is None:
+            map_desc = DEFAULT_MAP
+        maps = list(map_desc) if isinstance(map_desc[0], (list, tuple)) else [map_desc] * num_envs
+        if len(maps) != num_envs:
+            raise ValueError(f"Expected {num_envs} maps, got {len(maps)}.")
+        rows, cols = len(maps[0]), len(maps[0][0])
+        if any(len(m) != rows or len(m[0]) != cols for m in maps):
+            raise ValueError("All maps of a vector environment must have the same size.")
+
+        self.num_envs = num_envs
+        self.maps = maps
+        self.cell_size = cell_size
+        self.max_steps = max_steps
+
+        # Internal game engines (HIDDEN from agent)
+        self.games = [FrozenLakeGame(map_desc=m) for m in maps]
+
+        # One renderer per game; identical maps share frames through the frame store
+        self.frame_store = frame_store if frame_store is not None else FrameStore()
+        self.renderers = [FrozenLakeVideoRenderer(m, cell_size, self.frame_store) for m in maps]
+        for renderer in self.renderers:
+            renderer.capture = False
+        self.perception = BatchPerception(num_envs, cell_size, rows, cols)
+
+        # Memory system
+        self.memory = TrajectoryMemory(max_size=100, top_k=20)
+
+        # Batch buffers, reused every step
+        self.frames = np.zeros((num_envs, rows * cell_size, cols * cell_size, 3), dtype=np.uint8)
+        self.frame_handles = np.full(num_envs, -1, dtype=np.int64)
+        self.episode_steps = np.zeros(num_envs, dtype=np.int64)
+        self.episodes_started = 0
+
+        # Frame store handle -> pixel array (converted from PIL once)
+        self._pixels: Dict[int, np.ndarray] = {}
+
+    def _render(self, i: int, agent_pos):
+        """Writes game i's frame into slot i of the batch."""
+        handle = self.renderers[i].frame_handle(agent_pos[0], agent_pos[1])
+        pixels = self._pixels.get(handle)
+        if pixels is None:
+            pixels = self._pixels[handle] = np.asarray(self.frame_store[handle].convert('RGB'))
+        self.frames[i] = pixels
+        self.frame_handles[i] = handle
+
+    def _reset_envs(self, indices) -> List[Dict]:
+        """Resets the given games and returns the observations of their first frames."""
+        for i in indices:
+            self._render(i, self.games[i].reset())
+        self.episode_steps[indices] = 0
+        self.episodes_started += len(indices)
+        self.perception.reset(indices)
+        observations, _ = self.perception.analyze(self.frames[indices], indices=indices)
+        return observations
+
+    def reset(self):
+        """
+        Reset every game.
+
+        Returns:
+            (frames, observations): (N, H, W, 3) uint8 batch and per-game perception output
+        """
+        self.episodes_started = 0
+        observations = self._reset_envs(np.arange(self.num_envs))
+        return self.frames, observations
+
+    def step(self, actions) -> Dict:
+        """
+        Execute one action in every game.
+
+        Args:
+            actions: N action IDs (0=LEFT, 1=DOWN, 2=RIGHT, 3=UP)
+
+        Returns:
+            Dictionary containing:
+            - 'frames': (N, H, W, 3) batch; finished games already show their next
+              episode's first frame. The array is reused by the next step: copy to keep.
+            - 'observations': Perception output for 'frames'
+            - 'outcomes': Outcome inference of this step (before any reset)
+            - 'dones': (N,) bool, games whose episode ended on this step
+            - 'final_observations': Observation of the last frame for finished games, else None
+            - 'frame_handles': (N,) frame store handles of this step's frames (before any reset)
+            - 'episode_steps': (N,) steps taken so far in each game's episode (before any reset)
+        """
+        with METRICS.timer("env.step", loop="vlm2-vec"):
+            game_done = np.zeros(self.num_envs, dtype=bool)
+            with METRICS.timer("render", loop="vlm2-vec"):
+                for i, (game, action) in enumerate(zip(self.games, actions)):
+                    new_pos, game_done[i] = game.step(int(action))
+                    self._render(i, new_pos)
+
+            self.episode_steps += 1
+            max_steps_reached = self.episode_steps >= self.max_steps
+            with METRICS.timer("perception", loop="vlm2-vec"):
+                observations, outcomes = self.perception.analyze(self.frames, max_steps_reached)
+
+            dones = game_done | np.array([o['terminal'] for o in outcomes], dtype=bool)
+            frame_handles = self.frame_handles.copy()
+            episode_steps = self.episode_steps.copy()
+
+            final_observations = [None] * self.num_envs
+            finished = np.flatnonzero(dones)
+            if len(finished):
+                reset_observations = self._reset_envs(finished)
+                for i, observation in zip(finished, reset_observations):
+                    final_observations[i] = observations[i]
+                    observations[i] = observation
+        METRICS.count("steps", self.num_envs, loop="vlm2-vec")
+
+        return {
+            'frames': self.frames,
+            'observations': observations,
+            'outcomes': outcomes,
+            'dones': dones,
+            'final_observations': final_observations,
+            'frame_handles': frame_handles,
+            'episode_steps': episode_steps,
+        }
+
+    def _new_buffer(self) -> TrajectoryBuffer:
+        return TrajectoryBuffer(
+            message_fields=('observation', 'outcome', 'progress'),
+            frame_source=self.frame_store
+        )
+
+    def run_episodes(self, agent_fn: Callable, num_episodes: int) -> List[Dict]:
+        """
+        Run episodes across all games until `num_episodes` have finished.
+
+        Args:
+            agent_fn: Function that takes (frames, observations, memories) for the
+                      whole batch and returns N actions (see per_env_agent)
+            num_episodes: Episodes to complete
+
+        Returns:
+            Episode summaries in completion order (same keys as
+            VideoBasedEnvironment.run_episode_with_agent, 'video_path' is None)
+        """
+        frames, observations = self.reset()
+        buffers = [self._new_buffer() for _ in range(self.num_envs)]
+        start_positions = [obs['agent_position_inferred'] for obs in observations]
+        # Games that start after the quota is handed out run on but are not recorded
+        counted = [i < num_episodes for i in range(self.num_envs)]
+        launched = sum(counted)
+        results = []
+
+        while len(results) < num_episodes:
+            summaries = [summarize_observation(obs) for obs in observations]
+            with METRICS.timer("memory.retrieve", loop="vlm2-vec"):
+                memories = [self.memory.retrieve_relevant(s, k=3) for s in summaries]
+            with METRICS.timer("agent.generate", agent="vlm2-vec"):
+                actions = agent_fn(frames, observations, memories)
+
+            step_result = self.step(actions)
+
+            for i in range(self.num_envs):
+                done = step_result['dones'][i]
+                step_obs = step_result['final_observations'][i] if done else step_result['observations'][i]
+                step_outcome = step_result['outcomes'][i]
+                if counted[i]:
+                    buffers[i].append(
+                        int(actions[i]),
+                        position=step_obs['agent_position_inferred'],
+                        frame=int(step_result['frame_handles'][i]),
+                        observation=summarize_observation(step_obs),
+                        outcome=step_outcome['outcome'],
+                        progress=step_outcome['progress']
+                    )
+                if not done:
+                    continue
+
+                if counted[i]:
+                    results.append(self._finish_episode(buffers[i], start_positions[i]))
+                buffers[i] = self._new_buffer()
+                start_positions[i] = step_result['observations'][i]['agent_position_inferred']
+                counted[i] = launched < num_episodes
+                launched += counted[i]
+
+            frames, observations = step_result['frames'], step_result['observations']
+
+        return results
+
+    def _finish_episode(self, episode_data: TrajectoryBuffer, start_position) -> Dict:
+        """Stores the episode's lesson in memory and builds its summary."""
+        METRICS.count("episodes", loop="vlm2-vec")
+        final_outcome, last_situation, last_action = episode_lesson(episode_data)
+        self.memory.add_episode_lesson(final_outcome, last_situation, last_action)
+
+        return {
+            'video_path': None,
+            'final_outcome': final_outcome,
+            'steps': len(episode_data),
+            'start_position': start_position,  # Inferred from the first frame
+            'episode_data': episode_data
+        }
@@ -6,14 +6,22 @@ The agent receives ONLY frames, never the internal game state.
 from World.video_renderer import FrozenLakeVideoRenderer, DEFAULT_MAP
 from World.video_builder import EpisodeVideoBuilder
 from World.frozenlake_game import FrozenLakeGame
-from Wrapper.video_perception import VideoPerceptionLayer
+from Wrapper.video_perception import VideoPerceptionLayer, summarize_observation
+from Wrapper.recording_policy import RecordingPolicy
 from Verifier.action_inference import ActionInferenceModule
 from Verifier.outcome_inference import OutcomeInferenceModule
-from Memory.trajectory_memory import TrajectoryMemory
+from Memory.trajectory_memory import TrajectoryMemory, episode_lesson
 
-from typing import Dict, List, Callable
+import os
+import sys
+from typing import Dict, List, Callable, Optional
 from PIL import Image
 
+# Compact columnar trajectory storage (shared with 1.Frozenlake and VLM)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../1.Frozenlake/agent/updated')))
+from trajectory_buffer import TrajectoryBuffer
+from instrumentation import METRICS
+
 
 class VideoBasedEnvironment:
     """
@@ -21,12 +29,14 @@ class VideoBasedEnvironment:
     Agents see ONLY video frames, never internal state.
     """
     
-    def __init__(self, map_desc=None, cell_size=100, max_steps=50):
+    def __init__(self, map_desc=None, cell_size=100, max_steps=50, recording=None):
         """
         Args:
             map_desc: Grid map description
             cell_size: Pixel size of each cell
             max_steps: Maximum steps per episode
+            recording: RecordingPolicy or spec ('always', 'never', 'every:N',
+                       'first:K', 'success', 'failure'); default records every episode
         """
         if map_desc is None:
             map_desc = DEFAULT_MAP
@@ -41,6 +51,7 @@ class VideoBasedEnvironment:
         # Video and perception modules
         self.renderer = FrozenLakeVideoRenderer(map_desc, cell_size)
         self.video_builder = EpisodeVideoBuilder(fps=2)
+        self.recording = RecordingPolicy.from_spec(recording)
         self.perception = VideoPerceptionLayer(cell_size, len(map_desc), len(map_desc[0]))
         self.action_inference = ActionInferenceModule(cell_size)
         self.outcome_inference = OutcomeInferenceModule(cell_size)
@@ -63,8 +74,8 @@ class VideoBasedEnvironment:
         # Reset internal game
         agent_pos = self.game.reset()
         
-        # Reset modules
-        self.renderer.reset()
+        # Reset modules (unrecorded episodes keep no frames)
+        self.renderer.reset(capture=self.recording.captures_frames(self.current_episode))
         self.perception.reset()
         
         # Render initial frame
@@ -89,22 +100,27 @@ class VideoBasedEnvironment:
             - 'outcome': Outcome inference
             - 'done': Whether episode is terminal
         """
-        # Execute action in internal game
-        new_pos, game_done = self.game.step(action)
-        
-        # Render new frame
-        current_frame = self.renderer.add_frame(new_pos[0], new_pos[1])
-        
-        # Perceive from frame
-        observation = self.perception.perceive(current_frame)
-        
-        # Infer outcome
-        max_steps_reached = (self.current_step + 1 >= self.max_steps)
-        outcome = self.outcome_inference.infer_outcome(
-            current_frame, 
-            self.previous_frame,
-            max_steps_reached
-        )
+        with METRICS.timer("env.step", loop="vlm2"):
+            # Execute action in internal game
+            new_pos, game_done = self.game.step(action)
+            
+            # Render new frame
+            with METRICS.timer("render", loop="vlm2"):
+                current_frame = self.renderer.add_frame(new_pos[0], new_pos[1])
+            
+            # Perceive from frame
+            with METRICS.timer("perception", loop="vlm2"):
+                observation = self.perception.perceive(current_frame)
+            
+            # Infer outcome
+            max_steps_reached = (self.current_step + 1 >= self.max_steps)
+            with METRICS.timer("outcome_inference", loop="vlm2"):
+                outcome = self.outcome_inference.infer_outcome(
+                    current_frame, 
+                    self.previous_frame,
+                    max_steps_reached
+                )
+        METRICS.count("steps", loop="vlm2")
         
         self.current_step += 1
         self.previous_frame = current_frame
@@ -116,15 +132,21 @@ class VideoBasedEnvironment:
             'done': outcome['terminal'] or game_done
         }
     
-    def finish_episode(self) -> str:
+    def finish_episode(self, final_outcome: str = None) -> Optional[str]:
         """
-        Finish current episode and create video.
+        Finish current episode and create its video if the recording policy keeps it.
+        
+        Args:
+            final_outcome: Inferred outcome, for outcome-based recording policies
         
         Returns:
-            Path to episode video
+            Path to episode video, or None if the episode was not recorded
         """
-        frames = self.renderer.get_frames()
-        video_path = self.video_builder.build_video(frames, self.current_episode)
+        video_path = None
+        if self.recording.should_encode(self.current_episode, final_outcome) and self.renderer.episode_frames:
+            frames = self.renderer.get_frames()
+            with METRICS.timer("video.encode", loop="vlm2"):
+                video_path = self.video_builder.build_video(frames, self.current_episode)
         
         self.current_episode += 1
         
@@ -140,22 +162,9 @@ class VideoBasedEnvironment:
         Returns:
             Natural language description
         """
-        parts = []
-        
-        if observation.get('agent_visible'):
-            parts.append("Agent visible")
-        
-        if observation.get('goal_direction'):
-            parts.append(f"Goal is {observation['goal_direction']}")
-        
-        if observation.get('danger_nearby'):
-            parts.append("Danger nearby")
-        
-        if observation.get('movement_detected'):
-            parts.append("Movement detected")
-        
-        return ", ".join(parts) if parts else "No clear observation"
+        return summarize_observation(observation)
     
+    @METRICS.timed("episode.run", loop="vlm2")
     def run_episode_with_agent(self, agent_fn: Callable, max_steps=None) -> Dict:
         """
         Run a full episode with an agent function.
@@ -174,64 +183,94 @@ class VideoBasedEnvironment:
         frame = self.reset()
         done = False
         
-        episode_data = {
-            'frames': [],
-            'actions': [],
-            'observations': [],
-            'outcomes': []
-        }
+        # Frames are stored as handles into the shared, deduplicated frame store;
+        # observation summaries and outcomes are interned strings.
+        episode_data = TrajectoryBuffer(
+            message_fields=('observation', 'outcome', 'progress'),
+            frame_source=self.renderer.frame_store
+        )
         
         step_count = 0
+        start_position = None
         
         while not done and step_count < max_steps:
             # Get observation from frame
             observation = self.perception.perceive(frame)
             obs_summary = self.get_observation_summary(observation)
+            if step_count == 0:
+                start_position = observation['agent_position_inferred']
             
             # Retrieve relevant memories
-            relevant_memories = self.memory.retrieve_relevant(obs_summary, k=3)
+            with METRICS.timer("memory.retrieve", loop="vlm2"):
+                relevant_memories = self.memory.retrieve_relevant(obs_summary, k=3)
             
             # Agent chooses action based on frame and memory
-            action = agent_fn(frame, observation, relevant_memories)
+            with METRICS.timer("agent.generate", agent="vlm2"):
+                action = agent_fn(frame, observation, relevant_memories)
             
             # Execute action
             step_result = self.step(action)
             
             # Store data
-            episode_data['frames'].append(step_result['frame'])
-            episode_data['actions'].append(action)
-            episode_data['observations'].append(step_result['observation'])
-            episode_data['outcomes'].append(step_result['outcome'])
+            step_obs = step_result['observation']
+            step_outcome = step_result['outcome']
+            episode_data.append(
+                action,
+                position=step_obs['agent_position_inferred'],
+                frame=self.renderer.last_handle,
+                observation=self.get_observation_summary(step_obs),
+                outcome=step_outcome['outcome'],
+                progress=step_outcome['progress']
+            )
             
             frame = step_result['frame']
             done = step_result['done']
             step_count += 1
         
-        # Create episode video
-        video_path = self.finish_episode()
+        METRICS.count("episodes", loop="vlm2")
         
         # Determine final outcome
-        final_outcome = episode_data['outcomes'][-1] if episode_data['outcomes'] else {'outcome': 'unknown'}
+        final_outcome, last_situation, last_action = episode_lesson(episode_data)
+        
+        # Create episode video (if the recording policy keeps this episode)
+        video_path = self.finish_episode(final_outcome)
         
         # Store valuable experience in memory
-        if final_outcome['outcome'] == 'success':
-            self.memory.add_experience(
-                situation=self.get_observation_summary(episode_data['observations'][-1]),
-                action=f"Action {episode_data['actions'][-1]}",
-                outcome='success',
-                lesson="Successfully reached the goal"
-            )
-        elif final_outcome['outcome'] == 'failure' and episode_data['observations']:
-            self.memory.add_experience(
-                situation=self.get_observation_summary(episode_data['observations'][-1]),
-                action=f"Action {episode_data['actions'][-1]}",
-                outcome='failure',
-                lesson="Avoid this action in this situation"
-            )
+        self.memory.add_episode_lesson(final_outcome, last_situation, last_action)
         
         return {
             'video_path': video_path,
-            'final_outcome': final_outcome['outcome'],
+            'final_outcome': final_outcome,
             'steps': step_count,
-            'episode_data': episode_data
+            'start_position': start_position,  # Inferred from the first frame
+            'episode_data': episode_data,
+            # Memory update, repeated by replay_cached_episode
+            'last_situation': last_situation,
+            'last_action': last_action
+        }
+    
+    def replay_cached_episode(self, entry: Dict) -> Dict:
+        """
+        Stands in for run_episode_with_agent with a result from the evaluation cache
+        (agent/updated/eval_cache.py): nothing is simulated, rendered or encoded,
+        but memory and the episode counter advance exactly as if it had run.
+        
+        Args:
+            entry: Cached result (final_outcome, steps, start_position,
+                   last_situation, last_action)
+        
+        Returns:
+            Episode summary dictionary ('episode_data' and 'video_path' are None)
+        """
+        self.memory.add_episode_lesson(entry['final_outcome'], entry.get('last_situation'), entry.get('last_action'))
+        self.current_episode += 1
+        start_position = entry.get('start_position')
+        return {
+            'video_path': None,
+            'final_outcome': entry['final_outcome'],
+            'steps': entry['steps'],
+            'start_position': tuple(start_position) if start_position else None,
+            'episode_data': None,
+            'last_situation': entry.get('last_situation'),
+            'last_action': entry.get('last_action')
         }
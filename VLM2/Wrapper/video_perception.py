@@ -9,6 +9,33 @@ from PIL import Image
 from typing import Dict, Tuple, Optional
 
 
+def summarize_observation(observation: Dict) -> str:
+    """
+    Convert observation dict to natural language summary.
+    
+    Args:
+        observation: Perception output
+    
+    Returns:
+        Natural language description
+    """
+    parts = []
+    
+    if observation.get('agent_visible'):
+        parts.append("Agent visible")
+    
+    if observation.get('goal_direction'):
+        parts.append(f"Goal is {observation['goal_direction']}")
+    
+    if observation.get('danger_nearby'):
+        parts.append("Danger nearby")
+    
+    if observation.get('movement_detected'):
+        parts.append("Movement detected")
+    
+    return ", ".join(parts) if parts else "No clear observation"
+
+
 class VideoPerceptionLayer:
     """Infers observations from video frames using only visual analysis."""
     
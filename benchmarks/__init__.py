@@ -0,0 +1 @@
+# Benchmark suite for the FrozenLake hot paths (run with `python -m benchmarks`)
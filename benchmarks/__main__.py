@@ -0,0 +1,64 @@
+"""
+Runs the hot-path benchmarks.
+
+Usage (from the repository root):
+    python -m benchmarks                                  # full run, prints a table
+    python -m benchmarks --quick --output results.json    # 4x4/16x16 maps, short timings
+    python -m benchmarks --save-baseline baseline.json
+    python -m benchmarks --baseline baseline.json --fail-on-regression
+    python -m benchmarks --only vlm2
+"""
+import argparse
+import sys
+
+from benchmarks import hot_paths  # noqa: F401  (registers the benchmarks)
+from benchmarks.harness import (BENCHMARKS, Benchmark, compare_to_baseline, load_results,
+                                print_comparison, run_benchmarks, save_results)
+
+QUICK_MAP_SIZES = [4, 16]
+
+
+def _quick(benchmarks):
+    """Restricts map-size cases to small maps."""
+    quick = []
+    for bench in benchmarks:
+        params = [p for p in bench.params if p.get("size", 0) in QUICK_MAP_SIZES or "size" not in p]
+        quick.append(Benchmark(bench.name, bench.unit, bench.setup, params))
+    return quick
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FrozenLake hot-path benchmarks")
+    parser.add_argument("--quick", action="store_true", help="Small maps and short timings")
+    parser.add_argument("--only", type=str, default=None, help="Run benchmarks whose name contains this")
+    parser.add_argument("--min-time", type=float, default=None, help="Minimum seconds per case")
+    parser.add_argument("--output", type=str, default=None, help="Write results JSON here")
+    parser.add_argument("--save-baseline", type=str, default=None, help="Write results as a baseline")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against this baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 on any regression")
+    args = parser.parse_args(argv)
+
+    benchmarks = _quick(BENCHMARKS) if args.quick else BENCHMARKS
+    min_time = args.min_time if args.min_time is not None else (0.1 if args.quick else 0.5)
+
+    report = run_benchmarks(benchmarks, min_time=min_time, selected=args.only)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            save_results(report, path)
+            print(f"Results saved to {path}")
+
+    if args.baseline:
+        comparison = compare_to_baseline(report, load_results(args.baseline), args.threshold)
+        report["comparison"] = comparison
+        print_comparison(comparison)
+        if args.output:
+            save_results(report, args.output)
+        if args.fail_on_regression and any(row["regression"] for row in comparison):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
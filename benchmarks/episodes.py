@@ -0,0 +1,257 @@
+"""
+End-to-end episode throughput for the four loops, with mock agents and fixed seeds:
+
+    frozenlake          agent/train_loop.py run_episode + MockLLMAgent
+    frozenlake-updated  agent/updated/train_loop_updated.py run_episode + QwenAgentUpdated(mock=True)
+    vlm                 VLM/Client/run_agent.py run_agent + mock_vlm_model
+    vlm2                VideoBasedEnvironment.run_episode_with_agent + simple_heuristic_agent
+    vlm2-vector         VectorVideoEnvironment.run_episodes (8 games) + simple_heuristic_agent
+
+Stage times are measured by wrapping the stage methods of the live objects for the
+duration of the run (the loops themselves are unchanged). Times are exclusive: a
+stage nested in another (e.g. rendering inside VideoBasedEnvironment.step) is not
+counted twice. Whatever is not covered by a stage is reported as "other".
+
+Usage (from the repository root):
+    python -m benchmarks.episodes --episodes 50 --output episodes.json
+    python -m benchmarks.episodes --only vlm2 --baseline episodes_baseline.json
+"""
+import argparse
+import contextlib
+import functools
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from benchmarks.harness import (compare_to_baseline, import_from, load_results, print_comparison,
+                                save_results)
+
+
+class StageTimer:
+    """Accumulates exclusive wall time per stage for wrapped callables."""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._child_time: List[float] = []
+        self._patches = contextlib.ExitStack()
+
+    def wrap(self, fn: Callable, stage: str) -> Callable:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            self._child_time.append(0.0)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.totals[stage] += elapsed - self._child_time.pop()
+                self.calls[stage] += 1
+                if self._child_time:
+                    self._child_time[-1] += elapsed
+        return timed
+
+    def patch(self, owner, attr: str, stage: str):
+        """Times owner.attr (class method or module function) until close()."""
+        if attr in vars(owner):
+            self._patches.callback(setattr, owner, attr, vars(owner)[attr])
+        else:
+            # Inherited: drop the override to restore
+            self._patches.callback(delattr, owner, attr)
+        setattr(owner, attr, self.wrap(getattr(owner, attr), stage))
+
+    def close(self):
+        self._patches.close()
+
+    def breakdown(self, wall_time: float) -> Dict[str, float]:
+        """Fraction of wall time per stage, plus "other" for the uncovered rest."""
+        fractions = {stage: t / wall_time for stage, t in sorted(self.totals.items())}
+        fractions["other"] = max(0.0, 1.0 - sum(fractions.values()))
+        return fractions
+
+
+# --- Loops: each sets up (untimed) and returns a callable that runs the episodes ---
+
+def run_frozenlake(episodes: int, seed: int, timer: StageTimer, workdir: str):
+    train_loop = import_from("1.Frozenlake", "agent.train_loop")
+    mock_llm = import_from("1.Frozenlake", "agent.mock_llm")
+    random.seed(seed)
+    env = train_loop.load_environment()
+    agent = mock_llm.MockLLMAgent(policy="random")
+
+    timer.patch(type(env), "step", "environment")
+    timer.patch(type(env.parser), "parse", "parsing")
+    timer.patch(type(agent), "generate", "agent")
+    timer.patch(train_loop.ConversationBuffer, "render", "prompt")
+    timer.patch(train_loop.ConversationBuffer, "add_turn", "prompt")
+    timer.patch(type(env.rubric), "calculate_score", "scoring")
+
+    def run():
+        for _ in range(episodes):
+            train_loop.run_episode(env, agent)
+    return run
+
+
+def run_frozenlake_updated(episodes: int, seed: int, timer: StageTimer, workdir: str):
+    loop = import_from("1.Frozenlake", "agent.updated.train_loop_updated")
+    random.seed(seed)
+    env = loop.load_environment_updated()
+    agent = loop.QwenAgentUpdated(mock=True)
+    memory = loop.TrajectoryMemory(filepath=os.path.join(workdir, "memory.json"), k=5)
+
+    timer.patch(type(env), "step", "environment")
+    timer.patch(type(env.parser), "parse", "parsing")
+    timer.patch(type(agent), "generate", "agent")
+    timer.patch(loop.RewardAccumulator, "step", "scoring")
+    timer.patch(loop.TrajectoryBuffer, "append", "trajectory")
+    for attr in ("get_top_k", "render_icl_block", "update_q_table", "add_episode", "get_lessons"):
+        timer.patch(loop.TrajectoryMemory, attr, "memory")
+    timer.patch(type(env), "evolve_system_prompt", "prompt")
+
+    def run():
+        # Same per-episode work as train_loop()
+        for i in range(episodes):
+            ep_data = loop.run_episode(env, agent, memory)
+            memory.update_q_table(ep_data)
+            if ep_data["score"] > 0:
+                memory.add_episode(ep_data)
+            if (i + 1) % 3 == 0:
+                env.evolve_system_prompt(memory)
+    return run
+
+
+def run_vlm(episodes: int, seed: int, timer: StageTimer, workdir: str):
+    run_agent_module = import_from("VLM", "Client.run_agent")
+    random.seed(seed)
+
+    timer.patch(run_agent_module.FrozenLakeWorld, "step", "environment")
+    timer.patch(run_agent_module.FrozenLakeRenderer, "render", "rendering")
+    timer.patch(run_agent_module.VLMWrapper, "build_prompt", "prompt")
+    timer.patch(run_agent_module.VLMWrapper, "parse_action", "parsing")
+    timer.patch(run_agent_module.TrajectoryMemory, "get_q_values", "memory")
+    timer.patch(run_agent_module.TrajectoryMemory, "update_step", "memory")
+    timer.patch(run_agent_module.TrajectoryBuffer, "append", "trajectory")
+    timer.patch(run_agent_module, "mock_vlm_model", "agent")
+    memory_file = os.path.join(workdir, "memory.json")
+    return lambda: run_agent_module.run_agent(episodes=episodes, memory_file=memory_file)
+
+
+def run_vlm2(episodes: int, seed: int, timer: StageTimer, workdir: str):
+    demo = import_from("VLM2", "Client.demo")
+    random.seed(seed)
+    env = demo.VideoBasedEnvironment()
+
+    timer.patch(type(env.game), "step", "environment")
+    timer.patch(type(env.renderer), "add_frame", "rendering")
+    timer.patch(type(env.perception), "perceive", "perception")
+    timer.patch(type(env.outcome_inference), "infer_outcome", "perception")
+    timer.patch(type(env.memory), "retrieve_relevant", "memory")
+    timer.patch(type(env.memory), "add_experience", "memory")
+    timer.patch(type(env.video_builder), "build_video", "encoding")
+    agent_fn = timer.wrap(demo.simple_heuristic_agent, "agent")
+
+    def run():
+        for _ in range(episodes):
+            env.run_episode_with_agent(agent_fn, max_steps=50)
+    return run
+
+
+def run_vlm2_vector(episodes: int, seed: int, timer: StageTimer, workdir: str):
+    demo = import_from("VLM2", "Client.demo")
+    vector_environment = import_from("VLM2", "Wrapper.vector_environment")
+    random.seed(seed)
+    env = vector_environment.VectorVideoEnvironment(num_envs=8)
+
+    timer.patch(type(env.games[0]), "step", "environment")
+    timer.patch(type(env), "_render", "rendering")
+    timer.patch(type(env.perception), "analyze", "perception")
+    timer.patch(type(env.memory), "retrieve_relevant", "memory")
+    timer.patch(type(env.memory), "add_experience", "memory")
+    agent_fn = timer.wrap(vector_environment.per_env_agent(demo.simple_heuristic_agent), "agent")
+    return lambda: env.run_episodes(agent_fn, episodes)
+
+
+LOOPS = {
+    "frozenlake": run_frozenlake,
+    "frozenlake-updated": run_frozenlake_updated,
+    "vlm": run_vlm,
+    "vlm2": run_vlm2,
+    "vlm2-vector": run_vlm2_vector,
+}
+
+
+def run_loop(name: str, episodes: int = 20, seed: int = 0) -> Dict:
+    """
+    Runs `episodes` episodes of one loop and returns throughput and stage breakdown.
+    Loop output is discarded; files (Q-tables, videos) go to a temporary directory.
+    """
+    timer = StageTimer()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_episodes_") as workdir, \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # Loops write relative paths (videos/, trajectory_memory.json)
+        os.chdir(workdir)
+        try:
+            run = LOOPS[name](episodes, seed, timer, workdir)
+            start = time.perf_counter()
+            run()
+            wall = time.perf_counter() - start
+        finally:
+            timer.close()
+            os.chdir(cwd)
+
+    return {
+        "name": f"episodes.{name}",
+        "params": {"episodes": episodes, "seed": seed},
+        "unit": "episodes/s",
+        "ops": episodes,
+        "seconds": round(wall, 6),
+        "ops_per_sec": episodes / wall if wall else 0.0,
+        "peak_memory_bytes": 0,
+        "stage_seconds": {stage: round(t, 6) for stage, t in sorted(timer.totals.items())},
+        "stage_calls": dict(sorted(timer.calls.items())),
+        "stage_fractions": timer.breakdown(wall),
+    }
+
+
+def print_result(result: Dict):
+    print(f"{result['name']:<28} {result['ops_per_sec']:>10,.1f} episodes/s  ({result['seconds']:.2f}s)")
+    for stage, fraction in sorted(result["stage_fractions"].items(), key=lambda kv: -kv[1]):
+        print(f"    {stage:<14} {fraction:>7.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end episode throughput benchmark")
+    parser.add_argument("--episodes", type=int, default=20, help="Episodes per loop")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", type=str, default=None, choices=list(LOOPS), help="Run a single loop")
+    parser.add_argument("--output", type=str, default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against this baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in ([args.only] if args.only else LOOPS):
+        result = run_loop(name, args.episodes, args.seed)
+        print_result(result)
+        results.append(result)
+
+    report = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0]},
+        "results": results,
+    }
+    if args.baseline:
+        report["comparison"] = compare_to_baseline(report, load_results(args.baseline), args.threshold)
+        print_comparison(report["comparison"])
+    if args.output:
+        save_results(report, args.output)
+        print(f"Results saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Benchmark harness: registration, timing, peak memory, JSON output and baseline comparison.
+"""
+import gc
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Top-level package names that exist in more than one project tree
+_PROJECT_PACKAGES = {"World", "Wrapper", "Memory", "Verifier", "Client", "Evaluation",
+                     "wrapper", "agent", "verifier"}
+
+
+def import_from(project: str, module_name: str):
+    """
+    Imports `module_name` with `project` (e.g. "VLM2") as the import root.
+
+    The projects reuse package names (each has a `World/`), so cached project
+    packages are swapped out for the duration of the import and restored after.
+    The returned module keeps references to the dependencies it loaded.
+    """
+    root = os.path.join(REPO_ROOT, project)
+    is_project = lambda name: name.split(".")[0] in _PROJECT_PACKAGES
+    saved = {name: sys.modules.pop(name) for name in list(sys.modules) if is_project(name)}
+    sys.path.insert(0, root)
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        sys.path.remove(root)
+        for name in [n for n in sys.modules if is_project(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+class Benchmark:
+    """
+    One benchmark case.
+
+    `setup(**params)` builds the state and returns a callable `op()` that performs
+    one operation (one step, one frame, one lookup...). Timing excludes setup.
+    """
+    def __init__(self, name: str, unit: str, setup: Callable, params: List[Dict]):
+        self.name = name
+        self.unit = unit
+        self.setup = setup
+        self.params = params
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, unit: str, params: Optional[List[Dict]] = None):
+    """Decorator registering a setup function as a benchmark."""
+    def decorator(setup):
+        BENCHMARKS.append(Benchmark(name, unit, setup, params or [{}]))
+        return setup
+    return decorator
+
+
+def result_key(result: Dict) -> str:
+    """Stable identifier of a result (name + params) for baseline comparison."""
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def _time_op(op: Callable, min_time: float, max_ops: int) -> Dict:
+    """Runs op() in growing batches until min_time elapsed; returns ops and seconds."""
+    op()  # Warm up (first-call caches, lazy imports)
+    ops = 0
+    batch = 1
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time and ops < max_ops:
+        for _ in range(batch):
+            op()
+        ops += batch
+        elapsed = time.perf_counter() - start
+        batch = min(batch * 2, max_ops - ops) or 1
+    return {"ops": ops, "seconds": elapsed}
+
+
+def _peak_memory(bench: Benchmark, params: Dict, ops: int) -> int:
+    """Peak traced allocation (bytes) for setup plus `ops` operations."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        op = bench.setup(**params)
+        for _ in range(ops):
+            op()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_benchmarks(benchmarks: List[Benchmark], min_time: float = 0.5, max_ops: int = 1_000_000,
+                   memory_ops: int = 50, selected: Optional[str] = None, verbose: bool = True) -> Dict:
+    """
+    Runs the given benchmarks.
+
+    Args:
+        min_time: Minimum measured seconds per case.
+        max_ops: Upper bound on operations per case.
+        memory_ops: Operations run under tracemalloc for the peak-memory figure.
+        selected: Only run benchmarks whose name contains this substring.
+
+    Returns:
+        dict: {"meta": {...}, "results": [...]} ready for JSON.
+    """
+    results = []
+    for bench in benchmarks:
+        if selected and selected not in bench.name:
+            continue
+        for params in bench.params:
+            op = bench.setup(**params)
+            timing = _time_op(op, min_time, max_ops)
+            del op
+            peak = _peak_memory(bench, params, min(memory_ops, timing["ops"]))
+            result = {
+                "name": bench.name,
+                "params": params,
+                "unit": bench.unit,
+                "ops": timing["ops"],
+                "seconds": round(timing["seconds"], 6),
+                "ops_per_sec": timing["ops"] / timing["seconds"] if timing["seconds"] else 0.0,
+                "peak_memory_bytes": peak,
+            }
+            results.append(result)
+            if verbose:
+                print(f"{result_key(result):<55} {result['ops_per_sec']:>14,.1f} {bench.unit:<10} "
+                      f"peak {peak / 1024:>10,.1f} KiB")
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "min_time": min_time,
+        },
+        "results": results,
+    }
+
+
+def save_results(report: Dict, filepath: str):
+    with open(filepath, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def load_results(filepath: str) -> Dict:
+    with open(filepath, "r") as f:
+        return json.load(f)
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, threshold: float = 0.2) -> List[Dict]:
+    """
+    Compares throughput with a saved baseline.
+
+    Args:
+        threshold: Relative slowdown counted as a regression (0.2 = 20% fewer ops/sec).
+
+    Returns:
+        list: One entry per case present in both reports, with ratio and regression flag.
+    """
+    base = {result_key(r): r for r in baseline["results"]}
+    comparison = []
+    for result in report["results"]:
+        key = result_key(result)
+        if key not in base or not base[key]["ops_per_sec"]:
+            continue
+        ratio = result["ops_per_sec"] / base[key]["ops_per_sec"]
+        comparison.append({
+            "key": key,
+            "baseline_ops_per_sec": base[key]["ops_per_sec"],
+            "ops_per_sec": result["ops_per_sec"],
+            "ratio": ratio,
+            "memory_ratio": (result["peak_memory_bytes"] / base[key]["peak_memory_bytes"]
+                             if base[key]["peak_memory_bytes"] else None),
+            "regression": ratio < 1.0 - threshold,
+        })
+    return comparison
+
+
+def print_comparison(comparison: List[Dict]):
+    print(f"\n{'case':<55} {'baseline':>14} {'current':>14} {'ratio':>7}")
+    for row in comparison:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['key']:<55} {row['baseline_ops_per_sec']:>14,.1f} {row['ops_per_sec']:>14,.1f} "
+              f"{row['ratio']:>6.2f}x{flag}")
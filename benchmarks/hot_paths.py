@@ -0,0 +1,201 @@
+"""
+Micro-benchmarks for the per-step hot paths of all three projects.
+
+Map-size cases use generated square maps (S top-left, G bottom-right, ~10% holes).
+Renderer cell sizes shrink on large maps so a 256x256 frame stays ~1024 px wide.
+"""
+import os
+import random
+import tempfile
+
+from benchmarks.harness import benchmark, import_from
+
+MAP_SIZES = [4, 16, 64, 256]
+MEMORY_SIZES = [10, 100, 1000]
+Q_TABLE_SIZES = [16, 256, 4096]
+
+ACTIONS = ["LEFT", "DOWN", "RIGHT", "UP"]
+
+SHORT_RESPONSE = "I should move toward the goal.\n<action>RIGHT</action>"
+LONG_RESPONSE = ("Let me think about the board carefully. " * 60) + "<action>DOWN</action>"
+
+
+def make_map(size: int, hole_ratio: float = 0.1, seed: int = 0):
+    """Square map with S at (0, 0), G at (size-1, size-1) and random holes."""
+    rng = random.Random(seed)
+    rows = []
+    for r in range(size):
+        row = []
+        for c in range(size):
+            if (r, c) == (0, 0):
+                row.append("S")
+            elif (r, c) == (size - 1, size - 1):
+                row.append("G")
+            else:
+                row.append("H" if rng.random() < hole_ratio else "F")
+        rows.append("".join(row))
+    return rows
+
+
+def cell_size_for(size: int) -> int:
+    return max(4, 400 // size)
+
+
+def _size_params(sizes):
+    return [{"size": s} for s in sizes]
+
+
+# --- 1.Frozenlake ---
+
+@benchmark("frozenlake.world_step", "steps/s", _size_params(MAP_SIZES))
+def world_step(size):
+    world_module = import_from("1.Frozenlake", "World.frozenlake_world")
+    world = world_module.FrozenLakeWorld(make_map(size))
+    world.reset()
+    rng = random.Random(0)
+
+    def op():
+        if world.terminated:
+            world.reset()
+        world.step(ACTIONS[rng.randrange(4)])
+    return op
+
+
+@benchmark("frozenlake.xml_parse", "parses/s", [{"response": "short"}, {"response": "long"}])
+def xml_parse(response):
+    parser_module = import_from("1.Frozenlake", "wrapper.action_parser")
+    parser = parser_module.XMLParser(fields={"answer": "action"})
+    text = SHORT_RESPONSE if response == "short" else LONG_RESPONSE
+    return lambda: parser.parse(text)
+
+
+@benchmark("frozenlake.q_update_step", "updates/s", [{"states": n} for n in Q_TABLE_SIZES])
+def q_update_step(states):
+    memory_module = import_from("1.Frozenlake", "agent.updated.trajectory_memory_updated")
+    # Removed once `op` (which holds it) is released by the harness
+    tmp_dir = tempfile.TemporaryDirectory(prefix="bench_q_")
+    memory = memory_module.TrajectoryMemory(filepath=os.path.join(tmp_dir.name, "memory.json"))
+    side = max(1, int(states ** 0.5))
+    for i in range(states):
+        memory.q_table[str((i // side, i % side))] = {a: 0.0 for a in ACTIONS}
+    rng = random.Random(0)
+
+    def op():
+        i = rng.randrange(states)
+        state = (i // side, i % side)
+        memory.update_step(state, ACTIONS[i % 4], -0.1, (state[0], state[1] + 1), False)
+    op.tmp_dir = tmp_dir
+    return op
+
+
+# --- VLM ---
+
+@benchmark("vlm.render", "frames/s", _size_params(MAP_SIZES))
+def vlm_render(size):
+    world_module = import_from("VLM", "World.frozenlake_world")
+    renderer_module = import_from("VLM", "World.frozenlake_renderer")
+    world = world_module.FrozenLakeWorld(make_map(size))
+    world.reset()
+    renderer = renderer_module.FrozenLakeRenderer(tile_size=cell_size_for(size))
+    return lambda: renderer.render(world)
+
+
+@benchmark("vlm.build_prompt", "prompts/s", [{"frame_key": "cell"}, {"frame_key": "content"}])
+def vlm_build_prompt(frame_key):
+    world_module = import_from("VLM", "World.frozenlake_world")
+    renderer_module = import_from("VLM", "World.frozenlake_renderer")
+    wrapper_module = import_from("VLM", "Wrapper.vlm_wrapper")
+    world = world_module.FrozenLakeWorld()
+    obs = world.reset()
+    renderer = renderer_module.FrozenLakeRenderer()
+    wrapper = wrapper_module.VLMWrapper(renderer)
+    frame = renderer.render(world)
+    # Two equal but distinct frame objects: every call goes through the encoder
+    # lookup (content hash for frame_key="content") instead of the identity shortcut
+    frames = [frame, frame.copy()]
+    # Alternating Q-values: every call rebuilds the prompt (no whole-prompt reuse)
+    q_values = [{"LEFT": 0.1, "DOWN": 0.6, "RIGHT": -0.7, "UP": 0.0},
+                {"LEFT": 0.1, "DOWN": 0.7, "RIGHT": -0.7, "UP": 0.0}]
+    key = (tuple(world.grid_map), obs["position"]) if frame_key == "cell" else None
+    feedback = "EVALUATION: Good move. (+0.1 Score) You moved CLOSER."
+    calls = [0]
+
+    def op():
+        calls[0] += 1
+        return wrapper.build_prompt(obs, q_values[calls[0] & 1], frames[calls[0] & 1], feedback, frame_key=key)
+    return op
+
+
+# --- VLM2 ---
+
+@benchmark("vlm2.render_frame", "frames/s", _size_params(MAP_SIZES))
+def vlm2_render_frame(size):
+    renderer_module = import_from("VLM2", "World.video_renderer")
+    renderer = renderer_module.FrozenLakeVideoRenderer(make_map(size), cell_size=cell_size_for(size))
+    rng = random.Random(0)
+    return lambda: renderer.render_frame(rng.randrange(size), rng.randrange(size))
+
+
+@benchmark("vlm2.add_frame", "frames/s", _size_params(MAP_SIZES))
+def vlm2_add_frame(size):
+    """Frame-store path used by the environment: cache hits after the first visit."""
+    renderer_module = import_from("VLM2", "World.video_renderer")
+    store_module = import_from("VLM2", "World.frame_store")
+    renderer = renderer_module.FrozenLakeVideoRenderer(make_map(size), cell_size=cell_size_for(size),
+                                                       frame_store=store_module.FrameStore())
+    cells = [(r, c) for r in range(min(size, 4)) for c in range(min(size, 4))]
+    rng = random.Random(0)
+
+    def op():
+        if len(renderer.episode_frames) >= 100:
+            renderer.reset()
+        renderer.add_frame(*cells[rng.randrange(len(cells))])
+    return op
+
+
+@benchmark("vlm2.perceive", "frames/s", _size_params(MAP_SIZES))
+def vlm2_perceive(size):
+    renderer_module = import_from("VLM2", "World.video_renderer")
+    perception_module = import_from("VLM2", "Wrapper.video_perception")
+    cell = cell_size_for(size)
+    renderer = renderer_module.FrozenLakeVideoRenderer(make_map(size), cell_size=cell)
+    rng = random.Random(0)
+    frames = [renderer.render_frame(rng.randrange(size), rng.randrange(size)) for _ in range(4)]
+    perception = perception_module.VideoPerceptionLayer(cell_size=cell, grid_rows=size, grid_cols=size)
+    state = {"i": 0}
+
+    def op():
+        state["i"] += 1
+        perception.perceive(frames[state["i"] % len(frames)])
+    return op
+
+
+def _filled_memory(module, size):
+    memory = module.TrajectoryMemory(max_size=size, top_k=size)
+    rng = random.Random(0)
+    for i in range(size):
+        outcome = "success" if i % 5 == 0 else "failure"
+        situation = (f"Agent at cell {i}. Goal is {rng.choice(['down', 'right', 'down-right'])}. "
+                     f"{'Danger nearby.' if i % 3 == 0 else 'Area looks safe.'}")
+        memory.add_experience(situation, ACTIONS[i % 4], outcome, f"Lesson {i}")
+    return memory
+
+
+@benchmark("vlm2.memory_retrieve", "lookups/s", [{"experiences": n} for n in MEMORY_SIZES])
+def vlm2_memory_retrieve(experiences):
+    memory_module = import_from("VLM2", "Memory.trajectory_memory")
+    memory = _filled_memory(memory_module, experiences)
+    query = "Agent at cell 7. Goal is down-right. Danger nearby."
+    return lambda: memory.retrieve_relevant(query, k=5)
+
+
+@benchmark("vlm2.memory_add", "updates/s", [{"experiences": n} for n in MEMORY_SIZES])
+def vlm2_memory_add(experiences):
+    memory_module = import_from("VLM2", "Memory.trajectory_memory")
+    memory = _filled_memory(memory_module, experiences)
+    state = {"i": 0}
+
+    def op():
+        state["i"] += 1
+        memory.add_experience(f"Agent at cell {state['i']}. Goal is down.", "DOWN", "failure", "Lesson")
+    return op